@@ -1,13 +1,64 @@
 #app.py
-from flask import Flask, render_template, request, jsonify
+from flask import (Flask, render_template, request, jsonify, Response, abort, g,
+                   stream_with_context)
 import logging
 import os
-from process_ecology import process, u_list
+import metrics
+import profiling
+from calibration import calibrate, parse_calibration
+from jobs import JobQueue, QueueFull
+from process_ecology import (solve, process, save_run, save_charts, render_artifact, summarize,
+                             solve_series, render_series, summarize_series, start_render_pool,
+                             result_cache, artifacts, u_list, CHARTS_FILE, EXPORT_FILE,
+                             SERIES_FILE)
+from result_cache import make_key
+from schema import ValidationError, as_lists, parse_payload
+import streaming
+from surrogate import DEFAULT_TOLERANCE, SLICE_C, load_surrogate
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'
 
-os.makedirs('static/images', exist_ok=True)
+# Очередь расчетов с графиками: POST /jobs сразу возвращает номер задачи
+job_queue = JobQueue(workers=int(os.environ.get('ECOLOGY_JOB_WORKERS', 2)),
+                     max_pending=int(os.environ.get('ECOLOGY_JOB_QUEUE', 16)))
+
+# Суррогатная модель для /predict (строится заранее: python surrogate.py); без файла - None
+surrogate = load_surrogate(os.environ.get('ECOLOGY_SURROGATE', 'surrogate.npz'))
+
+
+@app.before_request
+def start_timing():
+    g.timing = metrics.start_request()
+
+@app.teardown_request
+def finish_timing(exc):
+    # У потоковых ответов (stream_with_context) teardown вызывается повторно
+    timing = g.pop("timing", None)
+    if timing is not None:
+        metrics.finish_request(timing, request.endpoint or "unknown")
+
+def error_response(endpoint, e):
+    """Ответ об ошибке: запись в лог с трассировкой и счетчик ошибок по типу"""
+    logging.exception(f"Error in {endpoint}: {e}")
+    metrics.ERRORS.inc(endpoint=endpoint, error=type(e).__name__)
+    return jsonify({"status": "Ошибка", "error": f"{type(e).__name__}: {e}"})
+
+def invalid_response(endpoint, e):
+    """Ответ 400 на некорректные входные данные: без трассировки, до любого расчета"""
+    logging.warning(f"Invalid input in {endpoint}: {e}")
+    metrics.ERRORS.inc(endpoint=endpoint, error=type(e).__name__)
+    response = jsonify({"status": "Ошибка", "error": str(e)})
+    response.status_code = 400
+    return response
+
+def parse_request(endpoint):
+    """Входные данные запроса (schema.parse_payload) или ответ 400 вторым значением"""
+    try:
+        return parse_payload(request.get_json(silent=True)), None
+    except ValidationError as e:
+        return None, invalid_response(endpoint, e)
+
 
 @app.route('/')
 def main():
@@ -50,23 +101,275 @@ def get_initial_equations():
 
 @app.route('/draw_graphics', methods=['POST'])
 def draw_graphics():
+    inputs, invalid = parse_request("draw_graphics")
+    if invalid is not None:
+        return invalid
+
+    # X-Profile (только при отладке): весь process() без кэша под профилировщиком,
+    # профиль - в файлах запуска и первые функции - в ответе
+    profile_top = profiling.requested_top(request.headers, app.debug)
+    if profile_top:
+        return profiled_draw_graphics(inputs, profile_top)
+
     try:
-        data = request.get_json()
-        
-        time_value = data.get("time_value", "0.0")
-        
-        process(
-            data["initial_equations"], 
-            data["faks"], 
-            data["equations"], 
-            data["restrictions"],
-            time_value
+        time_value = inputs["time_value"]
+        result = solve(*as_lists(inputs), time_value, inputs["method"])
+
+        # Графики запуска строятся при первом запросе /runs/<run_id>/<имя>;
+        # при output="json" сразу готовятся данные для отрисовки на клиенте
+        run_id = save_run(result)
+        if inputs["output"] == "json":
+            save_charts(result, run_id)
+
+        return jsonify({"status": "Выполнено", "time_used": time_value, "run_id": run_id,
+                        "timings": metrics.request_timings(g.timing)})
+    except Exception as e:
+        return error_response("draw_graphics", e)
+
+def profiled_draw_graphics(inputs, top):
+    """/draw_graphics под профилировщиком; ошибки - тем же ответом, что и без него"""
+    try:
+        result, profile = profiling.profile_call(
+            process,
+            *as_lists(inputs),
+            inputs["time_value"],
+            inputs["output"],
+            inputs["method"],
+            use_cache=False,
+            top=top,
         )
-        
-        return jsonify({"status": "Выполнено", "time_used": time_value})
+        run_id = result["run_id"]
+        profiling.save_profile(artifacts, run_id, profile)
+        return jsonify({"status": "Выполнено", "time_used": inputs["time_value"],
+                        "run_id": run_id, "timings": metrics.request_timings(g.timing),
+                        "profile": profile["top"]})
+    except Exception as e:
+        return error_response("draw_graphics", e)
+
+def run_draw_job(inputs):
+    """Задача очереди: расчет и все графики (или charts.json) в новом запуске"""
+    timing = metrics.start_request()
+    try:
+        result = process(*as_lists(inputs), inputs["time_value"], inputs["output"],
+                         inputs["method"])
+        return {"run_id": result["run_id"], "timings": metrics.request_timings(timing)}
+    finally:
+        metrics.finish_request(timing, "job")
+
+def job_key(inputs):
+    """Ключ объединения одинаковых задач: входные данные после разбора"""
+    key = make_key(*as_lists(inputs), inputs["time_value"], inputs["method"])
+    return f"{key}:{inputs['output']}"
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Расчет с графиками в очереди: 202 и номер задачи сразу, состояние - GET /jobs/<job_id>.
+    Такой же незавершенный расчет не ставится повторно - возвращается его задача.
+    429, если очередь заполнена; 400, если данные некорректны
+    """
+    inputs, invalid = parse_request("jobs")
+    if invalid is not None:
+        return invalid
+    try:
+        job, created = job_queue.submit(job_key(inputs), run_draw_job, inputs)
+    except QueueFull as e:
+        response = jsonify({"status": "Очередь заполнена", "error": str(e)})
+        response.status_code = 429
+        response.headers["Retry-After"] = "2"
+        return response
+    except Exception as e:
+        response = error_response("jobs", e)
+        response.status_code = 500
+        return response
+
+    response = jsonify(dict(job, created_now=created))
+    response.status_code = 202
+    response.headers["Location"] = f"/jobs/{job['job_id']}"
+    return response
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Состояние задачи: queued, running, done (run_id и разбивка времени в result) или failed"""
+    job = job_queue.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job)
+
+@app.route('/solve', methods=['POST'])
+def solve_only():
+    """
+    Расчет без построения графиков: траектория, конечные значения и суммарные потери.
+    Необязательный C - возрастающие точки из [0, 1], в которых нужны значения
+    (по умолчанию - адаптивная сетка, как для графиков)
+    """
+    inputs, invalid = parse_request("solve")
+    if invalid is not None:
+        return invalid
+    try:
+        time_value = inputs["time_value"]
+        result = solve(*as_lists(inputs), time_value, inputs["method"], C=inputs["C"])
+
+        response = summarize(result)
+        response.update({"status": "Выполнено", "time_used": time_value,
+                         "timings": metrics.request_timings(g.timing)})
+        return jsonify(response)
+    except Exception as e:
+        return error_response("solve", e)
+
+@app.route('/series', methods=['POST'])
+def series():
+    """
+    Расчет по сетке времени: данные - как у /solve, но вместо time_value -
+    time_values (не меньше двух возрастающих моментов). Ответ - поверхности
+    data_sol [T x C x 5] и total_loss [T x C]; при output="png" также
+    run_id с тепловыми картами (SERIES_FILE)
+    """
+    inputs, invalid = parse_request("series")
+    if invalid is not None:
+        return invalid
+    if inputs["time_values"] is None:
+        return invalid_response("series", ValidationError("Не задано поле time_values"))
+    try:
+        result = solve_series(*as_lists(inputs), inputs["time_values"], inputs["method"],
+                              C=inputs["C"])
+        response = summarize_series(result)
+        if inputs["output"] == "png":
+            response["run_id"] = render_series(result)
+            response["image"] = SERIES_FILE
+        response.update({"status": "Выполнено", "timings": metrics.request_timings(g.timing)})
+        return jsonify(response)
     except Exception as e:
-        logging.error(f"Error in draw_graphics: {e}")
-        return jsonify({"status": "Ошибка"})
+        return error_response("series", e)
+
+@app.route('/stream', methods=['POST'])
+def stream():
+    """
+    Результаты длинного расчета по мере готовности: по событию на каждое решение
+    (id, final_values, total_loss), в конце - событие done.
+    Данные - как у /solve, плюс либо time_values (сетка времени), либо
+    parameters и samples (перебор параметров, sweep.evaluate).
+    Формат - NDJSON или Server-Sent Events (Accept: text/event-stream)
+    """
+    inputs, invalid = parse_request("stream")
+    if invalid is not None:
+        return invalid
+    try:
+        if inputs["time_values"] is not None:
+            events = streaming.series_events(inputs)
+        else:
+            params, samples, method = streaming.parse_sweep(request.get_json())
+            events = streaming.sweep_events(inputs, params, samples, method)
+    except ValidationError as e:
+        return invalid_response("stream", e)
+
+    mimetype = request.accept_mimetypes.best_match([streaming.NDJSON, streaming.SSE],
+                                                   streaming.NDJSON)
+    body = streaming.FORMATS[mimetype](streaming.guarded(events, "stream"))
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    """
+    Cf1-Cf5 на срезах лепестковых диаграмм: суррогатной моделью, если набор в области
+    ее обучения и оценка ошибки не больше tolerance, иначе решателем (source и reason).
+    Данные - как у /solve, плюс необязательный tolerance
+    """
+    inputs, invalid = parse_request("predict")
+    if invalid is not None:
+        return invalid
+    try:
+        tolerance = float(request.get_json().get("tolerance", DEFAULT_TOLERANCE))
+        if not tolerance >= 0:
+            raise ValueError(tolerance)
+    except (TypeError, ValueError):
+        return invalid_response("predict",
+                                ValidationError("Допуск должен быть неотрицательным числом"))
+    try:
+        response = {"C": SLICE_C.tolist(), "error": None}
+        if surrogate is None:
+            outcome = "unavailable"
+        else:
+            with metrics.stage("surrogate"):
+                prediction = surrogate.predict(inputs)
+            response["error"] = prediction["error"]
+            if not prediction["inside"]:
+                outcome = "out_of_domain"
+            elif prediction["error"] > tolerance:
+                outcome = "above_tolerance"
+            else:
+                outcome = "surrogate"
+                response["slices"] = prediction["slices"].tolist()
+        metrics.SURROGATE.inc(outcome=outcome)
+
+        if outcome == "surrogate":
+            response["source"] = "surrogate"
+        else:
+            result = solve(*as_lists(inputs), inputs["time_value"], inputs["method"], C=SLICE_C)
+            response["slices"] = result["data_sol"].tolist()
+            response.update({"source": "solver", "reason": outcome})
+        response.update({"status": "Выполнено", "tolerance": tolerance,
+                         "timings": metrics.request_timings(g.timing)})
+        return jsonify(response)
+    except Exception as e:
+        return error_response("predict", e)
+
+@app.route('/calibrate', methods=['POST'])
+def calibrate_coefficients():
+    """
+    Подбор коэффициентов faks/equations по наблюдаемым траекториям:
+    parameters, bounds и observed {C, Cf}; остальное - как у /solve.
+    Число процессов задает сервер (ECOLOGY_CALIBRATION_WORKERS), стартов - не больше MAX_STARTS
+    """
+    inputs, invalid = parse_request("calibrate")
+    if invalid is not None:
+        return invalid
+    try:
+        options = parse_calibration(request.get_json())
+    except ValidationError as e:
+        return invalid_response("calibrate", e)
+    try:
+        initial_equations, faks, equations, _ = as_lists(inputs)
+        base = {"initial_equations": initial_equations, "faks": faks, "equations": equations,
+                "time_value": inputs["time_value"]}
+        response = calibrate(base, options["params"], options["bounds"], options["observed"],
+                             x0=options["x0"], starts=options["starts"], seed=options["seed"],
+                             weights=options["weights"], method=options["method"])
+        response["status"] = "Выполнено"
+        response["timings"] = metrics.request_timings(g.timing)
+        return jsonify(response)
+    except Exception as e:
+        return error_response("calibrate", e)
+
+@app.route('/cache_stats')
+def cache_stats():
+    """Состояние кэша результатов: число записей, объем, попадания и промахи"""
+    return jsonify(result_cache.stats())
+
+@app.route('/metrics')
+def get_metrics():
+    """Время этапов и запросов, счетчики решателя и ошибок в формате Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/runs/<run_id>/<name>')
+def get_run_artifact(run_id, name):
+    """Изображение, charts.json или export.npz запуска; при первом обращении они строятся"""
+    if name == CHARTS_FILE:
+        mimetype = 'application/json'
+    elif name.endswith('.png'):
+        mimetype = 'image/png'
+    elif name in (profiling.PROFILE_FILE, EXPORT_FILE):
+        mimetype = 'application/octet-stream'
+    elif name == profiling.PROFILE_REPORT:
+        mimetype = 'text/plain; charset=utf-8'
+    else:
+        abort(404)
+    data = render_artifact(run_id, name)
+    if data is None:
+        abort(404)
+    return Response(data, mimetype=mimetype,
+                    headers={"Cache-Control": "private, max-age=3600"})
 
 @app.route('/graphic')
 def get_graphic():
@@ -82,28 +385,19 @@ def get_disturbances():
 
 @app.route('/clear_images', methods=['POST'])
 def clear_images():
-    """Очистка старых изображений"""
+    """Удаление запусков, срок хранения которых истек"""
     try:
-        images_to_clear = [
-            'static/images/figure_eco.png',
-            'static/images/disturbances_eco.png',
-            'static/images/diagram_eco.png',
-            'static/images/diagram_eco2.png',
-            'static/images/diagram_eco3.png',
-            'static/images/diagram_eco4.png',
-            'static/images/diagram_eco5.png'
-        ]
-        
-        for img_path in images_to_clear:
-            if os.path.exists(img_path):
-                os.remove(img_path)
-                logging.info(f"Removed: {img_path}")
-        
-        return jsonify({"status": "Images cleared"})
+        removed = artifacts.collect_garbage()
+        logging.info(f"Removed runs: {removed}")
+        return jsonify({"status": "Images cleared", "removed": removed})
     except Exception as e:
         logging.error(f"Error clearing images: {e}")
         return jsonify({"status": "Error clearing images"})
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
+    # ECOLOGY_RENDER_WORKERS > 0 - графики строятся в пуле из стольких процессов
+    render_workers = int(os.environ.get('ECOLOGY_RENDER_WORKERS', 0))
+    if render_workers > 0:
+        start_render_pool(render_workers)
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,113 @@
+# artifacts.py
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+RUN_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+ARTIFACT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+class ArtifactStore:
+    """
+    Хранилище результатов расчетов на диске: у каждого запуска свой
+    идентификатор и свой каталог root/<run_id>/ с изображениями и данными.
+    Каталоги, к которым не обращались дольше ttl секунд, удаляются
+    при сборке мусора. Диск общий для всех процессов сервера, поэтому
+    запуск, созданный одним процессом, может обслуживать другой.
+    """
+
+    def __init__(self, root='runs', ttl=3600, gc_interval=60):
+        self.root = root
+        self.ttl = ttl
+        self.gc_interval = gc_interval
+        self._last_gc = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _run_dir(self, run_id):
+        if not RUN_ID_PATTERN.match(run_id or ''):
+            raise KeyError(f"Некорректный идентификатор запуска: {run_id}")
+        return os.path.join(self.root, run_id)
+
+    def path(self, run_id, name):
+        if not ARTIFACT_NAME_PATTERN.match(name or '') or name.startswith('.'):
+            raise KeyError(f"Некорректное имя файла: {name}")
+        return os.path.join(self._run_dir(run_id), name)
+
+    def create_run(self):
+        """Создание нового запуска; попутно удаляются устаревшие"""
+        self.maybe_collect_garbage()
+        run_id = uuid.uuid4().hex
+        os.makedirs(self._run_dir(run_id))
+        return run_id
+
+    def exists(self, run_id):
+        try:
+            return os.path.isdir(self._run_dir(run_id))
+        except KeyError:
+            return False
+
+    def touch(self, run_id):
+        """Продление жизни запуска"""
+        try:
+            os.utime(self._run_dir(run_id))
+        except (KeyError, OSError):
+            pass
+
+    def write(self, run_id, name, data):
+        """Атомарная запись файла: сначала во временный файл, затем переименование"""
+        target = self.path(run_id, name)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def read(self, run_id, name):
+        """Содержимое файла или None, если его нет"""
+        try:
+            with open(self.path(run_id, name), 'rb') as fh:
+                return fh.read()
+        except (KeyError, OSError):
+            return None
+
+    def write_json(self, run_id, name, obj):
+        self.write(run_id, name, json.dumps(obj).encode('utf-8'))
+
+    def read_json(self, run_id, name):
+        data = self.read(run_id, name)
+        return None if data is None else json.loads(data)
+
+    def collect_garbage(self, now=None):
+        """Удаление запусков старше ttl; возвращает число удаленных"""
+        now = time.time() if now is None else now
+        removed = 0
+        for run_id in os.listdir(self.root):
+            if not RUN_ID_PATTERN.match(run_id):
+                continue
+            run_dir = os.path.join(self.root, run_id)
+            try:
+                if now - os.path.getmtime(run_dir) > self.ttl:
+                    shutil.rmtree(run_dir, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def maybe_collect_garbage(self):
+        """Сборка мусора не чаще одного раза в gc_interval секунд"""
+        with self._lock:
+            now = time.time()
+            if now - self._last_gc < self.gc_interval:
+                return 0
+            self._last_gc = now
+        return self.collect_garbage(now)
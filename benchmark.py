@@ -0,0 +1,272 @@
+# benchmark.py
+"""
+Замеры времени расчета и построения графиков на воспроизводимых наборах
+параметров (utils.random_parameters). Результаты пишутся в JSON, чтобы
+сравнивать их между коммитами:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import matplotlib
+import numpy as np
+import scipy
+from scipy.integrate import odeint
+
+import process_ecology
+from artifacts import ArtifactStore
+from functions import compile_pend, pend
+from process_ecology import (RENDER_FILES, cast_to_float, create_disturbances_graphic,
+                             create_graphic, process, result_cache, solve)
+from radar_diagram import RadarDiagram
+from utils import random_parameters
+
+logger = logging.getLogger(__name__)
+
+XM = [1.0, 1.0, 1.0, 1.0, 1.0]
+
+
+def _arguments(params):
+    initial_equations, faks, equations, restrictions = cast_to_float(
+        params["initial_equations"], params["faks"], params["equations"], params["restrictions"]
+    )
+    return initial_equations, faks, equations, restrictions, float(params["time_value"])
+
+
+# Каждый замер: функция (params, workdir) -> (вызов без аргументов, число вызовов в одном замере).
+# Подготовка (решение для графиков, компиляция) в замер не входит
+
+def bench_pend(params, workdir):
+    initial_equations, faks, equations, _, time_value = _arguments(params)
+    x = np.array(initial_equations)
+    return lambda: pend(x, 0.5, faks, equations, XM, time_value), 1000
+
+
+def bench_compiled_pend(params, workdir):
+    initial_equations, faks, equations, _, time_value = _arguments(params)
+    rhs = compile_pend(faks, equations, XM, time_value)
+    x = np.array(initial_equations)
+    return lambda: rhs(x, 0.5), 1000
+
+
+def bench_odeint(params, workdir):
+    initial_equations, faks, equations, _, time_value = _arguments(params)
+    C = np.linspace(0, 1, 100)
+    return lambda: odeint(pend, initial_equations, C, args=(faks, equations, XM, time_value)), 1
+
+
+def bench_solve(params, workdir):
+    def run():
+        result_cache.clear()
+        solve(params["initial_equations"], params["faks"], params["equations"],
+              params["restrictions"], params["time_value"])
+    return run, 1
+
+
+def _solved(params):
+    result_cache.clear()
+    return solve(params["initial_equations"], params["faks"], params["equations"],
+                 params["restrictions"], params["time_value"])
+
+
+def bench_create_graphic(params, workdir):
+    result = _solved(params)
+    filename = os.path.join(workdir, "figure.png")
+    return lambda: create_graphic(result["C"], result["data_sol"], filename), 1
+
+
+def bench_create_disturbances_graphic(params, workdir):
+    result = _solved(params)
+    filename = os.path.join(workdir, "disturbances.png")
+    return lambda: create_disturbances_graphic(result["C"], result["faks"],
+                                               result["time_value"], filename=filename), 1
+
+
+def bench_radar_draw(params, workdir):
+    result = _solved(params)
+    filename = os.path.join(workdir, "diagram.png")
+
+    def run():
+        RadarDiagram().draw(filename, result["initial_equations"], result["data_sol"][-1],
+                            "Текущие", "Характеристики при C = 1.0", result["restrictions"])
+    return run, 1
+
+
+def bench_process(params, workdir):
+    def run():
+        result_cache.clear()
+        process(params["initial_equations"], params["faks"], params["equations"],
+                params["restrictions"], params["time_value"])
+    return run, 1
+
+
+def bench_draw_graphics(params, workdir):
+    """Запрос /draw_graphics и все изображения страниц результатов через тестовый клиент"""
+    from app import app
+    client = app.test_client()
+    names = [name for files in RENDER_FILES.values() for name in files
+             if name != "diagrams.png"]
+
+    def run():
+        result_cache.clear()
+        response = client.post('/draw_graphics', json=params).get_json()
+        for name in names:
+            client.get(f"/runs/{response['run_id']}/{name}")
+    return run, 1
+
+
+CASES = {
+    "pend": bench_pend,
+    "compiled_pend": bench_compiled_pend,
+    "odeint": bench_odeint,
+    "solve": bench_solve,
+    "create_graphic": bench_create_graphic,
+    "create_disturbances_graphic": bench_create_disturbances_graphic,
+    "radar_draw": bench_radar_draw,
+    "process": bench_process,
+    "draw_graphics": bench_draw_graphics,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _summary(times, number):
+    return {
+        "number": number,
+        "runs": len(times),
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "times": times,
+    }
+
+
+def run_benchmarks(cases=None, sets=3, repeat=3, warmup=1, seed=0):
+    """
+    Замеры для наборов параметров random_parameters(seed), ..., random_parameters(seed + sets - 1).
+    Для каждого замера и набора - warmup прогонов без учета и repeat замеров;
+    время - в секундах на один вызов
+    """
+    cases = list(CASES) if cases is None else cases
+    parameter_sets = [random_parameters(seed + n) for n in range(sets)]
+    results = {}
+
+    # Изображения и запуски пишутся во временный каталог, а не в static/images и runs
+    with tempfile.TemporaryDirectory() as workdir:
+        process_ecology.artifacts = ArtifactStore(os.path.join(workdir, "runs"))
+        for name in cases:
+            times, number = [], 1
+            for params in parameter_sets:
+                run, number = CASES[name](params, workdir)
+                for _ in range(warmup):
+                    run()
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    for _ in range(number):
+                        run()
+                    times.append((time.perf_counter() - started) / number)
+            results[name] = _summary(times, number)
+            logger.info(f"{name}: медиана {results[name]['median'] * 1e3:.3f} мс")
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "matplotlib": matplotlib.__version__,
+            "seed": seed,
+            "sets": sets,
+            "repeat": repeat,
+            "warmup": warmup,
+        },
+        "cases": results,
+    }
+
+
+def compare(current, baseline, threshold=1.2):
+    """
+    Сравнение медиан с прошлым результатом: строки (замер, было, стало, отношение)
+    и список замеров, замедлившихся больше чем в threshold раз
+    """
+    rows, regressions = [], []
+    for name, case in current["cases"].items():
+        previous = baseline["cases"].get(name)
+        if previous is None:
+            continue
+        ratio = case["median"] / previous["median"]
+        rows.append((name, previous["median"], case["median"], ratio))
+        if ratio > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры времени расчета и построения графиков")
+    parser.add_argument("--output", default="benchmark.json", help="файл результатов (JSON)")
+    parser.add_argument("--cases", help="замеры через запятую: " + ", ".join(CASES))
+    parser.add_argument("--sets", type=int, default=3, help="число наборов параметров")
+    parser.add_argument("--repeat", type=int, default=3, help="замеров на набор")
+    parser.add_argument("--warmup", type=int, default=1, help="прогонов без учета на набор")
+    parser.add_argument("--seed", type=int, default=0, help="seed первого набора параметров")
+    parser.add_argument("--compare", help="прошлый результат для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="допустимое замедление медианы при сравнении")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    cases = None
+    if args.cases:
+        cases = [name.strip() for name in args.cases.split(",")]
+        unknown = [name for name in cases if name not in CASES]
+        if unknown:
+            parser.error(f"неизвестные замеры: {', '.join(unknown)}")
+
+    results = run_benchmarks(cases, args.sets, args.repeat, args.warmup, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"{'замер':<30}{'медиана, мс':>14}{'мин, мс':>12}")
+    for name, case in results["cases"].items():
+        print(f"{name:<30}{case['median'] * 1e3:>14.3f}{case['min'] * 1e3:>12.3f}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.threshold)
+        print(f"\n{'замер':<30}{'было, мс':>12}{'стало, мс':>12}{'отношение':>12}")
+        for name, before, after, ratio in rows:
+            mark = "  !" if name in regressions else ""
+            print(f"{name:<30}{before * 1e3:>12.3f}{after * 1e3:>12.3f}{ratio:>12.2f}{mark}")
+        if regressions:
+            print(f"\nЗамедление больше чем в {args.threshold} раза: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
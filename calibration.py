@@ -0,0 +1,244 @@
+# calibration.py
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy.optimize import least_squares
+
+from schema import ValidationError
+from sensitivity import SENSITIVITY_PARAMETERS, forward_sensitivities
+from solvers import IVP_METHODS
+from sweep import (apply_values, base_values, latin_hypercube, parameter_name,
+                   parse_parameter, prepare_base)
+
+logger = logging.getLogger(__name__)
+
+# Невязка в точках, где решатель не дошел до конца отрезка (Cf в [0, 1], поэтому 1 - наихудшая)
+FAILED_RESIDUAL = 1.0
+
+# Число стартов на запрос /calibrate и процессов калибровки на сервере (1 - в процессе сервера);
+# число процессов клиент не задает
+MAX_STARTS = 8
+CALIBRATION_WORKERS = int(os.environ.get('ECOLOGY_CALIBRATION_WORKERS', 1))
+
+
+def prepare_observed(observed, weights=None):
+    """
+    Наблюдения: словарь C [n] и Cf [n x 5]; пропуски - None или NaN.
+    weights - веса компонент Cf1-Cf5 (по умолчанию единичные).
+    Возвращает сетку расчета (0 и точки наблюдений), индексы наблюдений в ней,
+    значения, маску известных значений и веса
+    """
+    C = np.asarray(observed["C"], dtype=float)
+    values = np.array([[np.nan if v is None else v for v in row] for row in observed["Cf"]],
+                      dtype=float)
+    if C.ndim != 1 or values.shape != (len(C), 5):
+        raise ValueError("Наблюдения: нужны C [n] и Cf [n x 5]")
+    if len(C) == 0 or C.min() < 0 or C.max() > 1:
+        raise ValueError("Наблюдения: C должны лежать в [0, 1]")
+
+    grid = np.unique(np.concatenate([[0.0], C]))
+    mask = np.isfinite(values)
+    if not mask.any():
+        raise ValueError("Наблюдения не содержат значений")
+    weights = np.ones(5) if weights is None else np.asarray(weights, dtype=float)
+    return {
+        "grid": grid,
+        "index": np.searchsorted(grid, C),
+        "values": values,
+        "mask": mask,
+        "weights": np.broadcast_to(weights, values.shape)[mask],
+    }
+
+
+def parse_calibration(data):
+    """
+    Параметры калибровки из тела запроса /calibrate (остальное - schema.parse_payload):
+    parameters, bounds, observed, x0, starts (не больше MAX_STARTS), seed, weights
+    и method (из IVP_METHODS, по умолчанию LSODA). Возвращает аргументы calibrate
+    """
+    params = data.get("parameters")
+    if not isinstance(params, list) or not params:
+        raise ValidationError("Не заданы калибруемые коэффициенты (parameters)")
+    try:
+        params = [parse_parameter(p) for p in params]
+    except (TypeError, ValueError) as e:
+        raise ValidationError(str(e))
+    unknown = [parameter_name(p) for p in params if p not in SENSITIVITY_PARAMETERS]
+    if unknown:
+        raise ValidationError(f"Коэффициенты не входят в модель: {', '.join(unknown)}")
+
+    try:
+        bounds = np.array(data.get("bounds"), dtype=float)
+        x0 = None if data.get("x0") is None else np.array(data["x0"], dtype=float)
+        weights = None if data.get("weights") is None else np.array(data["weights"], dtype=float)
+    except (TypeError, ValueError):
+        raise ValidationError("bounds, x0 и weights должны быть числами")
+    if bounds.shape != (len(params), 2) or not np.isfinite(bounds).all() \
+            or (bounds[:, 0] > bounds[:, 1]).any():
+        raise ValidationError("Для каждого коэффициента нужны конечные границы (min, max)")
+    if x0 is not None and (x0.shape != (len(params),) or not np.isfinite(x0).all()):
+        raise ValidationError(f"x0 - {len(params)} конечных значений")
+    if weights is not None and (weights.shape != (5,) or not np.isfinite(weights).all()):
+        raise ValidationError("weights - 5 конечных весов Cf1-Cf5")
+
+    starts = data.get("starts", 4)
+    if not isinstance(starts, int) or isinstance(starts, bool) or not 1 <= starts <= MAX_STARTS:
+        raise ValidationError(f"starts - целое число от 1 до {MAX_STARTS}")
+    seed = data.get("seed")
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        raise ValidationError("seed - неотрицательное целое число")
+    method = data.get("method", "LSODA")
+    if method not in IVP_METHODS:
+        raise ValidationError(f"Неизвестный метод {method!r}, допустимы: {', '.join(IVP_METHODS)}")
+
+    observed = data.get("observed")
+    try:
+        prepare_observed(observed, weights)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValidationError(f"Некорректные наблюдения (observed): {e}")
+    return {"params": params, "bounds": bounds.tolist(), "observed": observed,
+            "x0": x0, "starts": starts, "seed": seed, "weights": weights, "method": method}
+
+
+class _Residuals:
+    """
+    Невязки модели и наблюдений и их матрица Якоби по калибруемым
+    коэффициентам. Оба значения дает одно решение forward_sensitivities,
+    оно запоминается для последней точки (least_squares запрашивает их по очереди)
+    """
+
+    def __init__(self, base, params, observed, method):
+        self.base = base
+        self.params = params
+        self.columns = [SENSITIVITY_PARAMETERS.index(p) for p in params]
+        self.observed = observed
+        self.method = method
+        self.rhs_evaluations = 0
+        self._key = None
+
+    def _evaluate(self, theta):
+        key = theta.tobytes()
+        if key == self._key:
+            return
+        faks, equations = apply_values(self.base, self.params, theta)
+        solution = forward_sensitivities(self.base["initial_equations"], faks, equations,
+                                         self.base["time_value"], method=self.method,
+                                         C=self.observed["grid"])
+        self.rhs_evaluations += solution["nfev"]
+
+        observed = self.observed
+        mask = observed["mask"]
+        model = solution["data_sol"][observed["index"]][mask]
+        jac = solution["sensitivities"][observed["index"]][:, :, self.columns][mask]
+
+        residuals = (model - observed["values"][mask]) * observed["weights"]
+        jac = jac * observed["weights"][:, None]
+        failed = ~np.isfinite(residuals)
+        residuals[failed] = FAILED_RESIDUAL
+        jac[failed] = 0.0
+
+        self._key = key
+        self._residuals = residuals
+        self._jac = np.nan_to_num(jac)
+
+    def residuals(self, theta):
+        self._evaluate(theta)
+        return self._residuals
+
+    def jacobian(self, theta):
+        self._evaluate(theta)
+        return self._jac
+
+
+def _fit(base, params, observed, bounds, start, method, max_nfev, tolerance):
+    """Одна подгонка least_squares (trf с границами) из начальной точки start"""
+    started = time.perf_counter()
+    problem = _Residuals(base, params, observed, method)
+    lo, hi = np.array(bounds, dtype=float).T
+    fit = least_squares(problem.residuals, np.clip(start, lo, hi), jac=problem.jacobian,
+                        bounds=(lo, hi), method="trf", x_scale="jac", max_nfev=max_nfev,
+                        ftol=tolerance, xtol=tolerance, gtol=tolerance)
+    return {
+        "start": np.asarray(start, dtype=float).tolist(),
+        "values": fit.x.tolist(),
+        "cost": float(fit.cost),
+        "iterations": int(fit.njev),
+        "nfev": int(fit.nfev),
+        "rhs_evaluations": problem.rhs_evaluations,
+        "status": int(fit.status),
+        "success": bool(fit.success),
+        "message": fit.message,
+        "time": time.perf_counter() - started,
+    }
+
+
+def calibrate(base, params, bounds, observed, x0=None, starts=4, seed=None, weights=None,
+              method="LSODA", max_nfev=100, tolerance=1e-8, workers=None):
+    """
+    Подбор коэффициентов params (как в sweep: "faks[3][0]", "equations[2][1]", ...)
+    в пределах bounds [(min, max), ...] по наблюдаемым траекториям observed
+    (см. prepare_observed). Минимизируется сумма квадратов невязок Cf;
+    матрица Якоби - чувствительности из forward_sensitivities.
+
+    Первая подгонка стартует из x0 (теплый старт, например результат
+    прошлой калибровки) или из значений base; остальные starts - 1 - из
+    точек латинского гиперкуба в bounds. Подгонки идут параллельно в
+    workers процессах (по умолчанию CALIBRATION_WORKERS, 1 - в текущем
+    процессе), выбирается лучшая
+    """
+    base = prepare_base(base)
+    params = [parse_parameter(p) for p in params]
+    unknown = [parameter_name(p) for p in params if p not in SENSITIVITY_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Коэффициенты не входят в модель: {', '.join(unknown)}")
+    if len(bounds) != len(params):
+        raise ValueError("Для каждого коэффициента нужны границы (min, max)")
+    observed = prepare_observed(observed, weights)
+
+    first = base_values(base, params) if x0 is None else np.asarray(x0, dtype=float)
+    points = [first]
+    if starts > 1:
+        points.extend(latin_hypercube(bounds, starts - 1, seed))
+
+    started = time.perf_counter()
+    workers = min(workers or CALIBRATION_WORKERS, len(points))
+    args = (observed, bounds)
+    options = (method, max_nfev, tolerance)
+    if workers == 1:
+        fits = [_fit(base, params, *args, point, *options) for point in points]
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {executor.submit(_fit, base, params, *args, point, *options): n
+                       for n, point in enumerate(points)}
+            fits = [None] * len(points)
+            for future in as_completed(futures):
+                fits[futures[future]] = future.result()
+    elapsed = time.perf_counter() - started
+
+    best = min(fits, key=lambda fit: fit["cost"])
+    faks, equations = apply_values(base, params, best["values"])
+    n_observations = int(observed["mask"].sum())
+
+    logger.info(f"Калибровка {len(params)} коэффициентов: {len(fits)} стартов, "
+                f"итераций {sum(f['iterations'] for f in fits)}, {elapsed:.2f} с")
+    return {
+        "parameters": [parameter_name(p) for p in params],
+        "values": best["values"],
+        "cost": best["cost"],
+        "rmse": float(np.sqrt(2 * best["cost"] / n_observations)),
+        "iterations": best["iterations"],
+        "nfev": best["nfev"],
+        "success": best["success"],
+        "message": best["message"],
+        "faks": faks,
+        "equations": equations,
+        "starts": fits,
+        "solve_time": sum(fit["time"] for fit in fits),
+        "time": elapsed,
+    }
+
@@ -0,0 +1,340 @@
+# export.py
+"""
+Выгрузка результатов расчетов в двоичном столбцовом виде.
+
+Архив - каталог, в котором каждый столбец лежит в своем файле .npy.
+Столбцы записей (первая ось - номер записи):
+    final_values          Cf1-Cf5 в последней точке сетки (C = 1) [N x 5]
+    final_loss            суммарные потери в этой точке [N]
+    initial_equations     [N x 5]
+    faks                  [N x 14 x 2]
+    equations             [N x 12 x 3], недостающие коэффициенты - NaN (как в process_batch)
+    restrictions          [N x 5], NaN - не заданы
+    time_value            [N]
+    grid_end              конец точек записи в столбцах точек [N] (int64)
+Столбцы точек (первая ось - точка; точки записи k - с grid_end[k - 1] по grid_end[k]):
+    C                     сетка концентрации записи
+    data_sol              траектории Cf1-Cf5 [M x 5]
+    total_loss            суммарные потери в каждой точке C [M]
+Сетка своя у каждой записи, поэтому в один архив пишутся и траектории solve
+(адаптивная сетка), и process_batch (100 точек), и результаты перебора
+(одна точка C = 1).
+
+Записи дописываются в конец (append): данные - в конец файла, затем
+заголовок .npy с новой длиной; grid_end пишется последним, по нему считается
+число полных записей, поэтому после сбоя архив остается корректным с прежним
+числом записей. Дописывать в архив должен один процесс.
+Читается архив с отображением в память (open_archive), без загрузки целиком.
+
+Один расчет можно выгрузить в NPZ (save_npz), архив - в Parquet или
+Arrow IPC (pyarrow)
+"""
+import ast
+import io
+import os
+
+import numpy as np
+
+from functions import calculate_total_losses
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+except ImportError:
+    pa = None
+
+# Столбцы записей и точек: имя -> форма строки без первой оси
+RECORD_COLUMNS = {
+    "final_values": (5,),
+    "final_loss": (),
+    "initial_equations": (5,),
+    "faks": (14, 2),
+    "equations": (12, 3),
+    "restrictions": (5,),
+    "time_value": (),
+}
+POINT_COLUMNS = {
+    "C": (),
+    "data_sol": (5,),
+    "total_loss": (),
+}
+OFFSETS_COLUMN = "grid_end"
+
+# Заголовок .npy фиксированной длины: место под любое число записей,
+# чтобы при дописывании его можно было перезаписать на месте
+HEADER_SIZE = 128
+MAGIC = b'\x93NUMPY\x01\x00'
+
+
+def _header(dtype, shape):
+    header = repr({
+        'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        'fortran_order': False,
+        'shape': tuple(shape),
+    }).encode('latin1')
+    length = HEADER_SIZE - len(MAGIC) - 2
+    if len(header) >= length:
+        raise ValueError(f"Заголовок .npy не помещается в {HEADER_SIZE} байт: {shape}")
+    header = header.ljust(length - 1) + b'\n'
+    return MAGIC + length.to_bytes(2, 'little') + header
+
+
+def _read_header(fh):
+    fh.seek(0)
+    prefix = fh.read(HEADER_SIZE)
+    if prefix[:len(MAGIC)] != MAGIC or int.from_bytes(prefix[8:10], 'little') + 10 != HEADER_SIZE:
+        raise ValueError(f"Файл {fh.name} не является столбцом архива")
+    header = ast.literal_eval(prefix[10:].decode('latin1'))
+    return np.dtype(header['descr']), header['shape']
+
+
+def _check_column(path, values):
+    if os.path.exists(path):
+        with open(path, 'rb') as fh:
+            shape = _read_header(fh)[1]
+        if tuple(shape[1:]) != values.shape[1:]:
+            raise ValueError(f"{os.path.basename(path)}: форма записи {values.shape[1:]}, "
+                             f"в архиве {tuple(shape[1:])}")
+
+
+def write_column(path, values, start):
+    """
+    Запись values [n x ...] в столбец path с строки start (дальше файл обрезается):
+    данные, затем заголовок с длиной start + n. Файл создается при первой записи
+    """
+    values = np.ascontiguousarray(values)
+    start = int(start)
+    mode = 'r+b' if os.path.exists(path) else 'w+b'
+    with open(path, mode) as fh:
+        row = values.itemsize * int(np.prod(values.shape[1:]))
+        fh.seek(HEADER_SIZE + row * start)
+        fh.write(values.tobytes())
+        fh.truncate()
+        fh.flush()
+        os.fsync(fh.fileno())
+        fh.seek(0)
+        fh.write(_header(values.dtype, (start + len(values),) + values.shape[1:]))
+
+
+def _equations_array(equations, count):
+    """Коэффициенты функций (списки разной длины или массив) -> [n x 12 x 3] с NaN"""
+    if isinstance(equations, np.ndarray):
+        return np.asarray(equations, dtype=float)
+    packed = np.full((count, 12, 3), np.nan)
+    for n, eqs in enumerate(equations):
+        for i, coefficients in enumerate(eqs):
+            packed[n, i, :len(coefficients)] = coefficients[:3]
+    return packed
+
+
+def _grids(C, data_sol):
+    """
+    Сетки и траектории записей: общая сетка C [nC] и data_sol [N x nC x 5]
+    или списки сеток и траекторий [nC_k x 5] разной длины
+    """
+    if np.ndim(C) == 1 and np.ndim(data_sol) == 3:
+        C = np.asarray(C, dtype=float)
+        data_sol = np.asarray(data_sol, dtype=float)
+        grids, trajectories = [C] * len(data_sol), list(data_sol)
+    else:
+        grids = [np.asarray(c, dtype=float) for c in C]
+        trajectories = [np.asarray(d, dtype=float) for d in data_sol]
+        if len(grids) != len(trajectories):
+            raise ValueError("Число сеток C не совпадает с числом траекторий")
+    for c, d in zip(grids, trajectories):
+        if c.ndim != 1 or not len(c) or d.shape != (len(c), 5):
+            raise ValueError(f"data_sol: ожидается [{len(c)} x 5] на сетке C, получено {d.shape}")
+    return grids, trajectories
+
+
+def append(path, C, data_sol, initial_equations, faks, equations, time_value,
+           restrictions=None):
+    """
+    Дописывание N записей в архив path (каталог создается при первой записи).
+    C - общая сетка [nC] при data_sol [N x nC x 5] или N сеток своей длины
+    при списке траекторий. equations - массив [N x 12 x 3] с NaN или
+    N списков коэффициентов (как у solve). Суммарные потери в каждой точке C
+    считаются здесь. Возвращает число записей в архиве
+    """
+    grids, trajectories = _grids(C, data_sol)
+    n = len(trajectories)
+    points = np.concatenate(trajectories) if n else np.empty((0, 5))
+    finals = np.array([d[-1] for d in trajectories]).reshape(n, 5)
+
+    records = {
+        "final_values": finals,
+        "final_loss": calculate_total_losses(finals),
+        "initial_equations": np.asarray(initial_equations, dtype=float).reshape(n, 5),
+        "faks": np.asarray(faks, dtype=float).reshape(n, 14, 2),
+        "equations": _equations_array(equations, n),
+        "restrictions": (np.full((n, 5), np.nan) if restrictions is None
+                         else np.asarray(restrictions, dtype=float).reshape(n, 5)),
+        "time_value": np.broadcast_to(np.asarray(time_value, dtype=float), (n,)),
+    }
+    columns = {
+        "C": np.concatenate(grids) if n else np.empty(0),
+        "data_sol": points,
+        "total_loss": calculate_total_losses(points),
+    }
+    for name, shape in RECORD_COLUMNS.items():
+        if records[name].shape[1:] != shape:
+            raise ValueError(f"{name}: ожидается [N x {shape}], получено {records[name].shape}")
+    os.makedirs(path, exist_ok=True)
+    for name, values in {**records, **columns}.items():
+        _check_column(os.path.join(path, f"{name}.npy"), values)
+
+    # Столбцы пишутся с числа полных записей и их точек (хвост прерванной записи
+    # затирается), grid_end - последним: по нему считается число полных записей
+    start = archive_length(path)
+    offset = _point_count(path, start)
+    for name, values in columns.items():
+        write_column(os.path.join(path, f"{name}.npy"), values, offset)
+    for name, values in records.items():
+        write_column(os.path.join(path, f"{name}.npy"), values, start)
+    ends = offset + np.cumsum([len(c) for c in grids], dtype=np.int64)
+    write_column(os.path.join(path, f"{OFFSETS_COLUMN}.npy"), ends, start)
+    return start + n
+
+
+def append_result(path, result):
+    """Дописывание результата solve (одна запись на его сетке C)"""
+    return append(path, [result["C"]], [result["data_sol"]], [result["initial_equations"]],
+                  [result["faks"]], [result["equations"]], result["time_value"],
+                  [result["restrictions"]])
+
+
+def append_batch(path, initial_equations, faks, equations, time_value, data_sol):
+    """Дописывание пакетного расчета process_batch (траектории на сетке linspace(0, 1, 100))"""
+    return append(path, np.linspace(0, 1, data_sol.shape[1]), data_sol, initial_equations,
+                  faks, equations, time_value)
+
+
+def append_sweep(path, base, params, parts):
+    """
+    Дописывание результатов sweep.evaluate по мере готовности: у перебора есть только
+    конечные значения, поэтому сетка записи - одна точка C = 1. base, params - как у evaluate
+    """
+    from sweep import apply_values, parse_parameter, prepare_base
+
+    base = prepare_base(base)
+    params = [parse_parameter(p) for p in params]
+    for part in parts:
+        faks, equations = zip(*(apply_values(base, params, values) for values in part["values"]))
+        n = len(part["index"])
+        append(path, [1.0], np.asarray(part["final_values"])[:, None],
+               np.tile(base["initial_equations"], (n, 1)), faks, equations, base["time_value"])
+    return archive_length(path)
+
+
+def archive_length(path):
+    """Число полных записей архива (0, если архива еще нет)"""
+    try:
+        with open(os.path.join(path, f"{OFFSETS_COLUMN}.npy"), 'rb') as fh:
+            return _read_header(fh)[1][0]
+    except FileNotFoundError:
+        return 0
+
+
+def _point_count(path, n):
+    """Число точек первых n записей"""
+    if n == 0:
+        return 0
+    ends = np.load(os.path.join(path, f"{OFFSETS_COLUMN}.npy"), mmap_mode='r')
+    return int(ends[n - 1])
+
+
+def open_archive(path, mmap_mode='r'):
+    """
+    Столбцы архива: {имя: массив}, по умолчанию отображенные в память (без чтения
+    файлов целиком), и offsets [N + 1] - границы точек записей (точки записи k -
+    offsets[k]:offsets[k + 1]). Столбцы обрезаются до полных записей на случай,
+    если чтение совпало с дописыванием
+    """
+    n = archive_length(path)
+    ends = np.load(os.path.join(path, f"{OFFSETS_COLUMN}.npy"))[:n]
+    archive = {"offsets": np.concatenate([[0], ends]).astype(np.int64)}
+    for name in RECORD_COLUMNS:
+        archive[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)[:n]
+    for name in POINT_COLUMNS:
+        archive[name] = np.load(os.path.join(path, f"{name}.npy"),
+                                mmap_mode=mmap_mode)[:archive["offsets"][-1]]
+    return archive
+
+
+def trajectory(archive, k):
+    """Сетка C и траектория data_sol записи k архива (open_archive)"""
+    points = slice(archive["offsets"][k], archive["offsets"][k + 1])
+    return archive["C"][points], archive["data_sol"][points]
+
+
+def save_npz(result, file):
+    """Один результат solve в NPZ (путь или файловый объект): те же столбцы, что в архиве"""
+    data = result["data_sol"]
+    np.savez(file, C=result["C"], data_sol=data, total_loss=calculate_total_losses(data),
+             final_values=data[-1], final_loss=calculate_total_losses(data[-1]),
+             initial_equations=np.asarray(result["initial_equations"], dtype=float),
+             faks=np.asarray(result["faks"], dtype=float),
+             equations=_equations_array([result["equations"]], 1)[0],
+             restrictions=np.asarray(result["restrictions"], dtype=float),
+             time_value=float(result["time_value"]))
+
+
+def npz_bytes(result):
+    buffer = io.BytesIO()
+    save_npz(result, buffer)
+    return buffer.getvalue()
+
+
+def _flat_array(values):
+    """Столбец [n x ...] -> массив pyarrow: многомерные строки - списки фиксированной длины"""
+    values = np.asarray(values)
+    if values.ndim == 1:
+        return pa.array(values)
+    return pa.FixedSizeListArray.from_arrays(pa.array(values.reshape(-1)),
+                                             int(np.prod(values.shape[1:])))
+
+
+def to_arrow(path):
+    """
+    Архив как таблица pyarrow: строка - запись, столбцы точек (C, data_sol,
+    total_loss) - списки переменной длины со своей сеткой у каждой записи,
+    формы строк - в метаданных схемы
+    """
+    if pa is None:
+        raise RuntimeError("Для Parquet и Arrow нужен пакет pyarrow")
+    archive = open_archive(path)
+    offsets = pa.array(archive["offsets"], type=pa.int64())
+    columns = {name: _flat_array(archive[name]) for name in RECORD_COLUMNS}
+    for name in POINT_COLUMNS:
+        columns[name] = pa.LargeListArray.from_arrays(offsets, _flat_array(archive[name]))
+    shapes = {**RECORD_COLUMNS, **POINT_COLUMNS}
+    return pa.table(columns).replace_schema_metadata({"shapes": repr(shapes)})
+
+
+def from_arrow(table):
+    """Таблица to_arrow (или прочитанная из Parquet/Arrow) -> столбцы, как у open_archive"""
+    shapes = ast.literal_eval(table.schema.metadata[b"shapes"].decode())
+    archive = {}
+    for name in RECORD_COLUMNS:
+        column = table.column(name).combine_chunks()
+        values = column.flatten() if shapes[name] else column
+        archive[name] = values.to_numpy(zero_copy_only=False).reshape((-1,) + shapes[name])
+    lengths = []
+    for name in POINT_COLUMNS:
+        column = table.column(name).combine_chunks()
+        lengths = column.value_lengths().to_numpy(zero_copy_only=False)
+        values = column.flatten().flatten() if shapes[name] else column.flatten()
+        archive[name] = values.to_numpy(zero_copy_only=False).reshape((-1,) + shapes[name])
+    archive["offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    return archive
+
+
+def export_parquet(path, target):
+    """Архив path -> файл Parquet target"""
+    parquet.write_table(to_arrow(path), target)
+
+
+def export_arrow(path, target):
+    """Архив path -> файл Arrow IPC (Feather v2) target, читается с отображением в память"""
+    feather.write_feather(to_arrow(path), target, compression='uncompressed')
@@ -1,3 +1,5 @@
+import copy
+from bisect import bisect_right
 import numpy as np
 def pend(x, C, faks, f, xm, t=0.0, power=0.55):
     """
@@ -405,6 +407,15 @@ def calculate_total_loss(Cf_values, weights=None):
     return max(0.0, min(1.0, total_loss))
 
 
+def calculate_total_losses(Cf_values, weights=None):
+    """calculate_total_loss для массива [..., 5]: потери по последней оси, массив [...]"""
+    if weights is None:
+        weights = [0.2, 0.2, 0.2, 0.2, 0.2]
+    Cf_values = np.asarray(Cf_values, dtype=float)
+    n = min(Cf_values.shape[-1], len(weights))
+    return np.clip(Cf_values[..., :n] @ np.asarray(weights[:n], dtype=float), 0.0, 1.0)
+
+
 def normalize_values(values, max_values=None):
   
     if max_values is None:
@@ -422,3 +433,415 @@ def normalize_values(values, max_values=None):
     
     return normalized
 
+
+
+# === СКОМПИЛИРОВАННАЯ ПРАВАЯ ЧАСТЬ СИСТЕМЫ ===
+
+# Число коэффициентов и значения по умолчанию для f₁-f₁₂ (как в f*_default_norm)
+EQUATION_ARITY = np.array([2, 2, 3, 2, 2, 2, 2, 2, 2, 2, 3, 2])
+EQUATION_DEFAULTS = np.array([
+    [0.5, 0.5, 0.0],     # f₁
+    [0.3, 15.0, 0.0],    # f₂
+    [0.3, 0.4, 0.5],     # f₃
+    [0.7, 11.0, 0.0],    # f₄
+    [0.8, 9.0, 0.0],     # f₅
+    [0.8, 12.0, 0.0],    # f₆
+    [0.8, 11.0, 0.0],    # f₇
+    [0.7, 13.0, 0.0],    # f₈
+    [10.0, 5.0, 0.0],    # f₉
+    [0.55, 13.0, 0.0],   # f₁₀
+    [0.55, 12.0, 2.0],   # f₁₁
+    [0.5, 3.0, 0.0],     # f₁₂
+])
+
+# Линейные f₂, f₄, f₅, f₈, f₁₀, f₁₂ и номера их аргументов Cf
+LINEAR_FUNCS = np.array([1, 3, 4, 7, 9, 11])
+LINEAR_ARGS = np.array([3, 2, 3, 0, 2, 0])
+# Дробные f₆, f₇, f₁₁ (аргумент - Cf₅)
+RATIONAL_FUNCS = np.array([5, 6, 10])
+
+# Номера функций-сомножителей положительной и отрицательной частей уравнений 1-5
+# (номер 12 - фиктивная функция, тождественно равная 1)
+POSITIVE_FACTORS = np.array([[0, 1, 12], [3, 4, 12], [12, 12, 12], [7, 8, 9], [11, 12, 12]])
+NEGATIVE_FACTORS = np.array([2, 5, 6, 10, 12])
+
+# Маски сумм возмущений в уравнениях 1-5 (строка - уравнение, столбец - x1-x14)
+POSITIVE_MASK = np.zeros((5, 14))
+NEGATIVE_MASK = np.zeros((5, 14))
+for _row, _idx in enumerate([
+    (1, 4, 5, 7, 8, 9, 10, 11, 12, 13),
+    (1, 4, 9, 10, 12),
+    (1, 4, 5, 7, 8, 9, 10, 11, 12),
+    (1, 4, 5, 7, 8, 9, 10, 11, 12, 13),
+    (1, 5),
+]):
+    POSITIVE_MASK[_row, np.array(_idx) - 1] = 1.0
+for _row, _idx in enumerate([
+    (2, 3, 6, 14),
+    (2, 3, 5, 6),
+    (2, 3, 6, 14),
+    (2, 3, 6, 14),
+    (2, 3, 4, 6, 7, 8, 9, 10, 13, 14),
+]):
+    NEGATIVE_MASK[_row, np.array(_idx) - 1] = 1.0
+del _row, _idx
+
+# Нормирующие делители сумм в уравнениях 1-5
+POSITIVE_DIVISORS = np.array([10.0, 5.0, 9.0, 10.0, 2.0])
+NEGATIVE_DIVISORS = np.array([4.0, 4.0, 4.0, 4.0, 10.0])
+
+# Матрица [14 x 10]: возмущения (до деления на 10) -> нормированные суммы;
+# строки 0-5 - x1-x6 (зависят от t), строки 6-13 - x7-x14 (зависят от C)
+# (первые 5 столбцов - положительные, последние 5 - отрицательные)
+SUMS_MATRIX = np.hstack([
+    (POSITIVE_MASK / POSITIVE_DIVISORS[:, None]).T,
+    (NEGATIVE_MASK / NEGATIVE_DIVISORS[:, None]).T,
+]) / 10.0
+
+# Ограничение показателя экспоненты, чтобы не получать inf в базисе
+EXP_LIMIT = 700.0
+
+
+def pack_faks(faks):
+    """
+    Упаковка коэффициентов возмущений в массив [14 x 2] и вектор длин.
+    Недостающие коэффициенты заполняются нулями.
+    """
+    arr = np.zeros((14, 2))
+    lengths = np.zeros(14, dtype=int)
+    for i in range(min(14, len(faks))):
+        n = min(2, len(faks[i]))
+        arr[i, :n] = faks[i][:n]
+        lengths[i] = len(faks[i])
+    return arr, lengths
+
+
+def pack_equations(f):
+    """
+    Упаковка коэффициентов внутренних функций в массив [12 x 3] и вектор длин.
+    Недостающие коэффициенты заполняются нулями.
+    """
+    arr = np.zeros((12, 3))
+    lengths = np.zeros(12, dtype=int)
+    for i in range(min(12, len(f))):
+        n = min(3, len(f[i]))
+        arr[i, :n] = f[i][:n]
+        lengths[i] = len(f[i])
+    return arr, lengths
+
+
+class DisturbanceContext:
+    """
+    Возмущения x1-x14 для одного решения.
+
+    x1-x6 зависят только от t и вычисляются один раз при создании.
+    x7-x14 - отрезки вида clip(a·C + b, 0, 1) (a, b уже поделены на |a| + |b|),
+    поэтому нормированные суммы возмущений кусочно-линейны по C: для них
+    заранее строится таблица отрезков между точками излома.
+    Значения хранятся до деления на 10 (как fx_linear).
+
+    faks_arr, faks_len - результат pack_faks (допускается ведущая ось пакета)
+    """
+
+    def __init__(self, faks_arr, faks_len, t=0.0):
+        faks_arr = np.asarray(faks_arr, dtype=float)
+        faks_len = np.asarray(faks_len)
+        self.t = np.asarray(t, dtype=float)
+
+        # fx_linear(v, (a, b)) = clip((a·v + b) / (|a| + |b|), 0, 1), при нулевом знаменателе 0.5;
+        # в pend возмущение без двух коэффициентов равно 0
+        a = faks_arr[..., 0]
+        b = faks_arr[..., 1]
+        scale = np.abs(a) * 1.0 + np.abs(b)
+        degenerate = scale <= 0
+        missing = faks_len < 2
+        scale = np.where(degenerate | missing, 1.0, scale)
+        self.slope = np.where(degenerate | missing, 0.0, a / scale)
+        self.intercept = np.where(missing, 0.0, np.where(degenerate, 0.5, b / scale))
+
+        self._set_time(self.t)
+
+        self._breaks = None
+        if self.slope.ndim == 1:
+            self._init_segments()
+
+    @staticmethod
+    def _clip(values):
+        return np.minimum(np.maximum(values, 0.0), 1.0)
+
+    def _set_time(self, t):
+        self.t = t
+        self.time_values = self._clip(self.slope[..., :6] * t[..., None]
+                                      + self.intercept[..., :6])
+        self.base_sums = self.time_values @ SUMS_MATRIX[:6]
+
+    def at_time(self, t):
+        """
+        Тот же контекст в момент t (числа или массива [T] - тогда с осью пакета T).
+        Пересчитываются только x1-x6; коэффициенты и таблица отрезков x7-x14 общие
+        """
+        if self.slope.ndim != 1:
+            raise ValueError("at_time - только для контекста одного решения")
+        context = copy.copy(self)
+        context._set_time(np.asarray(t, dtype=float))
+        return context
+
+    def _init_segments(self):
+        # Точки излома: a·C + b = 0 и a·C + b = 1
+        slope = self.slope[6:]
+        intercept = self.intercept[6:]
+        active = slope != 0
+        breaks = np.concatenate([-intercept[active] / slope[active],
+                                 (1.0 - intercept[active]) / slope[active]])
+        breaks = np.unique(breaks)
+
+        # Представитель каждого отрезка между точками излома
+        probes = np.concatenate([breaks[:1] - 1.0, (breaks[:-1] + breaks[1:]) / 2,
+                                 breaks[-1:] + 1.0]) if len(breaks) else np.zeros(1)
+        raw = probes[:, None] * slope + intercept
+        linear = (raw > 0.0) & (raw < 1.0)
+        saturated = raw >= 1.0
+
+        weights = SUMS_MATRIX[6:]
+        self._segment_slope = (linear * slope) @ weights
+        # Без x1-x6: base_sums добавляется в sums, чтобы таблица не зависела от t
+        self._segment_intercept = (linear * intercept + saturated) @ weights
+        self._breaks = breaks.tolist()
+
+    @property
+    def breaks(self):
+        """Точки излома x7-x14 по C (только для одного решения, без оси пакета)"""
+        return self._breaks or []
+
+    def concentration_values(self, C):
+        """Значения x7-x14 при концентрации C (C может быть массивом точек)"""
+        C = np.asarray(C, dtype=float)[..., None]
+        return self._clip(self.slope[..., 6:] * C + self.intercept[..., 6:])
+
+    def sums(self, C):
+        """
+        Нормированные суммы возмущений: [положительные 1-5, отрицательные 1-5].
+        В точке излома таблица отрезков может дать отрицательный ноль порядка 1e-19
+        (слагаемые x7-x14 переходят через 0), а дробная степень от него - NaN;
+        суммы неотрицательны, как в pend
+        """
+        if self._breaks is not None:
+            i = bisect_right(self._breaks, C)
+            sums = self.base_sums + (self._segment_slope[i] * C + self._segment_intercept[i])
+        else:
+            sums = self.base_sums + self.concentration_values(C) @ SUMS_MATRIX[6:]
+        return np.maximum(sums, 0.0)
+
+
+class CompiledPend:
+    """
+    Правая часть системы pend, подготовленная один раз на решение.
+
+    Внутренние функции приводятся к общему виду
+        f = clip(num / max(D, lo) + c, 0, 1),
+    где num и D - линейные комбинации базиса
+        [Cf₁, ..., Cf₅, e^Cf₃, e^{-(scale·Cf₂ - shift)}, 1],
+    поэтому все функции, кроме ступенчатой f₃, считаются одним
+    умножением матрицы на вектор. Суммы возмущений берутся из
+    DisturbanceContext. Обнуление производных на границах [0, 1] и xm
+    совпадает с pend.
+
+    context - DisturbanceContext
+    f_arr, f_len - результат pack_equations
+    Массивы могут иметь ведущие оси пакета, тогда и x должен их иметь.
+    """
+
+    eps = 1e-4
+
+    def __init__(self, context, f_arr, f_len, xm, power=0.55):
+        self.context = context
+        self.power = power
+        self.xm = np.asarray(xm, dtype=float)
+        self.inv_xm = 1 / self.xm
+        self.upper = np.minimum(self.xm - self.eps, 1.0 - self.eps)
+        self._init_functions(np.asarray(f_arr, dtype=float), np.asarray(f_len))
+
+    def _init_functions(self, f_arr, f_len):
+        # Подстановка значений по умолчанию там, где коэффициентов не хватает
+        params = np.where((f_len >= EQUATION_ARITY)[..., None], f_arr, EQUATION_DEFAULTS)
+        shape = params.shape[:-2]
+
+        num = np.zeros(shape + (12, 8))
+        den = np.zeros(shape + (12, 8))
+        lo = np.full(shape + (12,), -np.inf)
+        c = np.zeros(shape + (12,))
+
+        # Линейные: (a·Cf + b) / (|a| + |b|), при нулевом знаменателе 0.5
+        a = params[..., LINEAR_FUNCS, 0]
+        b = params[..., LINEAR_FUNCS, 1]
+        denominator = np.abs(a) + np.abs(b)
+        degenerate = denominator <= 0
+        num[..., LINEAR_FUNCS, LINEAR_ARGS] = np.where(degenerate, 0.0, a)
+        num[..., LINEAR_FUNCS, 7] = np.where(degenerate, 0.5, b)
+        den[..., LINEAR_FUNCS, 7] = np.where(degenerate, 1.0, denominator)
+
+        # f₁: a·e^Cf₃ / (1 + b·(e^Cf₃ - 1))
+        num[..., 0, 5] = params[..., 0, 0]
+        den[..., 0, 5] = params[..., 0, 1]
+        den[..., 0, 7] = 1.0 - params[..., 0, 1]
+
+        # f₉: 1 / (1 + e^{-(scale·Cf₂ - shift)})
+        num[..., 8, 7] = 1.0
+        den[..., 8, 6] = 1.0
+        den[..., 8, 7] = 1.0
+        self.exp_k = np.stack([np.ones(shape), -params[..., 8, 0]], axis=-1)
+        self.exp_m = np.stack([np.zeros(shape), params[..., 8, 1]], axis=-1)
+
+        # Дробные: (a / max(0.01, Cf₅ + b) + c) / max_val, у f₆ и f₇ c = 0,
+        # при max_val <= 0 значение 0.5
+        a = params[..., RATIONAL_FUNCS, 0]
+        b = params[..., RATIONAL_FUNCS, 1]
+        ci = params[..., RATIONAL_FUNCS, 2] * np.array([0.0, 0.0, 1.0])
+        max_val = np.where(b > 0, a / np.where(b > 0, b, 1.0) + ci,
+                           np.array([10.0, 10.0, 0.0]) + (a / 0.01 + ci) * np.array([0.0, 0.0, 1.0]))
+        degenerate = max_val <= 0
+        max_val = np.where(degenerate, 1.0, max_val)
+        num[..., RATIONAL_FUNCS, 7] = np.where(degenerate, 0.0, a) / max_val
+        den[..., RATIONAL_FUNCS, 4] = 1.0
+        den[..., RATIONAL_FUNCS, 7] = b
+        lo[..., RATIONAL_FUNCS] = 0.01
+        c[..., RATIONAL_FUNCS] = np.where(degenerate, 0.5, ci / max_val)
+
+        # f₃ - ступенчатая, считается отдельно
+        den[..., 2, 7] = 1.0
+        self.f3_low = np.clip(params[..., 2, 0], 0.0, 1.0)
+        self.f3_threshold = params[..., 2, 1]
+        self.f3_high = np.clip(params[..., 2, 2], 0.0, 1.0)
+
+        self.basis_matrix = np.concatenate([num, den], axis=-2)
+        self.f_lo = lo
+        self.f_c = c
+
+    def with_context(self, context):
+        """Та же правая часть с другим контекстом (например, context.at_time): функции общие"""
+        rhs = copy.copy(self)
+        rhs.context = context
+        return rhs
+
+    def basis(self, x):
+        """Базис внутренних функций; первые 5 элементов - ограниченный вектор Cf"""
+        b = np.empty(np.shape(x)[:-1] + (8,))
+        x_safe = b[..., :5]
+        np.maximum(x, self.eps, out=x_safe)
+        np.minimum(x_safe, 1.0 - self.eps, out=x_safe)
+        exponent = x_safe[..., 2:0:-1] * self.exp_k + self.exp_m
+        np.exp(np.minimum(exponent, EXP_LIMIT), out=b[..., 5:7])
+        b[..., 7] = 1.0
+        return b
+
+    def internal_functions(self, b):
+        """
+        Значения f₁-f₁₂ по базису и дополнительная 13-я функция,
+        тождественно равная 1
+        """
+        nd = np.matmul(self.basis_matrix, b[..., None])[..., 0]
+        F = np.ones(b.shape[:-1] + (13,))
+        f = F[..., :12]
+        np.divide(nd[..., :12], np.maximum(nd[..., 12:], self.f_lo), out=f)
+        f += self.f_c
+        np.maximum(f, 0.0, out=f)
+        np.minimum(f, 1.0, out=f)
+        F[..., 2] = np.where(b[..., 4] < self.f3_threshold, self.f3_low, self.f3_high)
+        return F
+
+    def rate(self, x, C):
+        """Производные без обнуления на границах (для решателей с событиями)"""
+        x = np.asarray(x, dtype=float)
+
+        norm = np.minimum(self.context.sums(C) ** self.power, 1.0)
+
+        F = self.internal_functions(self.basis(x))
+        factors = F.take(POSITIVE_FACTORS, axis=-1)
+        gain_pos = factors[..., 0] * factors[..., 1] * factors[..., 2]
+        gain_neg = F.take(NEGATIVE_FACTORS, axis=-1)
+
+        return self.inv_xm * (gain_pos * norm[..., :5] - gain_neg * norm[..., 5:])
+
+    def rate_jacobian(self, x, C):
+        """
+        Матрица Якоби производных rate по Cf: J[..., i, j] = ∂rate_i/∂Cf_j.
+        Все внутренние функции дифференцируются аналитически; на изломах
+        (ограничение [eps, 1 - eps], clip значений, ступенька f₃)
+        берется производная с внутренней стороны, как у кусочной функции
+        """
+        x = np.asarray(x, dtype=float)
+
+        norm = np.minimum(self.context.sums(C) ** self.power, 1.0)
+
+        b = self.basis(x)
+        inside = (x > self.eps) & (x < 1.0 - self.eps)
+        exponent = b[..., 2:0:-1] * self.exp_k + self.exp_m
+        uncapped = exponent < EXP_LIMIT
+
+        # Производные базиса по Cf: [..., 8, 5]
+        db = np.zeros(b.shape + (5,))
+        db[..., range(5), range(5)] = inside
+        db[..., 5, 2] = b[..., 5] * self.exp_k[..., 0] * inside[..., 2] * uncapped[..., 0]
+        db[..., 6, 1] = b[..., 6] * self.exp_k[..., 1] * inside[..., 1] * uncapped[..., 1]
+
+        nd = np.matmul(self.basis_matrix, b[..., None])[..., 0]
+        dnd = np.matmul(self.basis_matrix, db)
+        numerator, denominator = nd[..., :12], nd[..., 12:]
+        d_numerator, d_denominator = dnd[..., :12, :], dnd[..., 12:, :]
+        active = denominator > self.f_lo
+        denominator = np.maximum(denominator, self.f_lo)
+        raw = numerator / denominator + self.f_c
+
+        dF = np.zeros(b.shape[:-1] + (13, 5))
+        dF[..., :12, :] = ((d_numerator * denominator[..., None]
+                            - numerator[..., None] * d_denominator * active[..., None])
+                           / denominator[..., None] ** 2)
+        dF[..., :12, :] *= ((raw > 0.0) & (raw < 1.0))[..., None]
+        dF[..., 2, :] = 0.0
+
+        F = self.internal_functions(b)
+        factors = F.take(POSITIVE_FACTORS, axis=-1)
+        d_factors = dF.take(POSITIVE_FACTORS, axis=-2)
+        d_gain_pos = (d_factors[..., 0, :] * (factors[..., 1] * factors[..., 2])[..., None]
+                      + d_factors[..., 1, :] * (factors[..., 0] * factors[..., 2])[..., None]
+                      + d_factors[..., 2, :] * (factors[..., 0] * factors[..., 1])[..., None])
+        d_gain_neg = dF.take(NEGATIVE_FACTORS, axis=-2)
+
+        return self.inv_xm[..., None] * (d_gain_pos * norm[..., :5, None]
+                                          - d_gain_neg * norm[..., 5:, None])
+
+    def jacobian(self, x, C):
+        """
+        Матрица Якоби правой части (с обнулением на границах) в формате
+        Dfun для odeint: строки компонент, удерживаемых на границе, нулевые
+        """
+        x = np.asarray(x, dtype=float)
+        dkdt = self.rate(x, C)
+        held = ((x >= self.upper) & (dkdt > 0.0)) | ((x <= self.eps) & (dkdt < 0.0))
+        return np.where(held[..., None], 0.0, self.rate_jacobian(x, C))
+
+    def __call__(self, x, C):
+        x = np.asarray(x, dtype=float)
+        dkdt = self.rate(x, C)
+
+        # Обнуление производных, выводящих характеристики за пределы xm и [0, 1]
+        dkdt -= (x >= self.upper) * np.maximum(dkdt, 0.0)
+        dkdt -= (x <= self.eps) * np.minimum(dkdt, 0.0)
+        return dkdt
+
+
+def build_disturbance_context(faks, t=0.0):
+    """Сборка DisturbanceContext из списка коэффициентов возмущений"""
+    faks_arr, faks_len = pack_faks(faks)
+    return DisturbanceContext(faks_arr, faks_len, t)
+
+
+def compile_pend(faks, f, xm, t=0.0, power=0.55, context=None):
+    """
+    Сборка CompiledPend из списков коэффициентов в формате pend.
+    Если context уже построен для этих faks и t, он используется повторно.
+    """
+    if context is None:
+        context = build_disturbance_context(faks, t)
+    f_arr, f_len = pack_equations(f)
+    return CompiledPend(context, f_arr, f_len, xm, power)
@@ -0,0 +1,63 @@
+# grid.py
+"""
+Сетки по концентрации C.
+
+Адаптивные решатели (odeint и методы solve_ivp) выбирают шаг сами, а значения
+в точках вывода получают интерполяцией, поэтому число вычислений правой части
+от числа точек вывода почти не зависит. Сетка для графиков строится так:
+решение выводится в точках мелкой сетки-кандидата, а в результат попадают
+только те из них, без которых ломаная графика отклоняется от решения больше
+чем на PLOT_TOLERANCE - точки сгущаются на изгибах и при выходе на насыщение,
+на прямых участках остаются редкими
+"""
+import numpy as np
+
+# Срезы лепестковых диаграмм
+DIAGRAM_C = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+
+# Сетка-кандидат: 2^k + 1 точек, чтобы середины отрезков были ее точками.
+# У rk4 каждая точка - шаг метода, поэтому сетка мельче не делается
+CANDIDATE_POINTS = 257
+RK4_CANDIDATE_POINTS = 65
+# Начальная сетка: каждая 16-я точка кандидата (17 точек), плюс срезы и изломы возмущений
+BASE_STRIDE = 16
+# Допустимое отклонение ломаной от решения (около пикселя на графике характеристик)
+PLOT_TOLERANCE = 1e-3
+
+
+def candidate_grid(method, breaks=()):
+    """
+    Сетка-кандидат для метода method: равномерная сетка и точки излома
+    возмущений x7-x14 (breaks) внутри (0, 1).
+    Возвращает C и индексы точек начальной сетки в нем
+    """
+    points = RK4_CANDIDATE_POINTS if method == "rk4" else CANDIDATE_POINTS
+    uniform = np.linspace(0, 1, points)
+    breaks = np.asarray(breaks, dtype=float)
+    C = np.union1d(uniform, breaks[(breaks > 0.0) & (breaks < 1.0)])
+    stride = max(1, BASE_STRIDE * (points - 1) // (CANDIDATE_POINTS - 1))
+    base = np.union1d(uniform[::stride], np.concatenate([DIAGRAM_C, breaks]))
+    return C, np.flatnonzero(np.isin(C, base))
+
+
+def select_points(C, data, base, tolerance=PLOT_TOLERANCE):
+    """
+    Индексы точек C, достаточных для графика data [len(C) x n]: начиная с base,
+    отрезки, на которых ломаная отклоняется от data больше чем на tolerance,
+    делятся пополам, пока отклонение не станет допустимым
+    """
+    keep = np.unique(np.concatenate([[0, len(C) - 1], base]))
+    positions = np.arange(len(C))
+    while True:
+        interval = np.searchsorted(keep, positions, side="right") - 1
+        interval = np.minimum(interval, len(keep) - 2)
+        left, right = keep[interval], keep[interval + 1]
+        weight = ((C - C[left]) / (C[right] - C[left]))[:, None]
+        chord = data[left] + weight * (data[right] - data[left])
+        deviation = np.abs(data - chord).max(axis=1)
+
+        worst = np.maximum.reduceat(deviation, keep[:-1])
+        split = (worst > tolerance) & (np.diff(keep) > 1)
+        if not split.any():
+            return keep
+        keep = np.union1d(keep, (keep[:-1][split] + keep[1:][split]) // 2)
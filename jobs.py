@@ -0,0 +1,109 @@
+# jobs.py
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+
+class QueueFull(Exception):
+    """Очередь заполнена - новую задачу нужно отправить позже"""
+
+
+class JobQueue:
+    """
+    Очередь задач в процессе сервера: пул из workers потоков и не больше
+    max_pending незавершенных задач (в очереди и выполняющихся).
+    Задачи с одинаковым ключом, пока первая не завершилась, объединяются в одну.
+    Завершенные задачи хранятся ttl секунд
+    """
+
+    def __init__(self, workers=2, max_pending=16, ttl=600):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _public(job):
+        return {name: value for name, value in job.items() if name != "key"}
+
+    def _purge(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished"] is not None and now - job["finished"] > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, key, function, *args, **kwargs):
+        """
+        Постановка function(*args, **kwargs) в очередь. Возвращает (задача, новая ли она);
+        если задача с тем же key еще не завершена - ее же. QueueFull, если очередь заполнена
+        """
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                metrics.JOBS.inc(event="deduplicated")
+                return self._public(self._jobs[job_id]), False
+            if len(self._inflight) >= self.max_pending:
+                metrics.JOBS.inc(event="rejected")
+                raise QueueFull(f"В очереди {len(self._inflight)} задач")
+
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "key": key,
+                "status": "queued",
+                "created": now,
+                "started": None,
+                "finished": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job["job_id"]] = job
+            self._inflight[key] = job["job_id"]
+            metrics.JOBS.inc(event="submitted")
+
+        self._executor.submit(self._run, job, function, args, kwargs)
+        return self._public(job), True
+
+    def _run(self, job, function, args, kwargs):
+        with self._lock:
+            job["status"] = "running"
+            job["started"] = time.time()
+        try:
+            result = function(*args, **kwargs)
+            status, error = "done", None
+        except Exception as e:
+            logger.exception(f"Задача {job['job_id']} завершилась ошибкой")
+            result, status, error = None, "failed", f"{type(e).__name__}: {e}"
+        with self._lock:
+            job.update(status=status, result=result, error=error, finished=time.time())
+            self._inflight.pop(job["key"], None)
+        metrics.JOBS.inc(event=status)
+
+    def get(self, job_id):
+        """Состояние задачи или None, если ее нет (или срок хранения истек)"""
+        with self._lock:
+            self._purge(time.time())
+            job = self._jobs.get(job_id)
+            return None if job is None else self._public(job)
+
+    def stats(self):
+        with self._lock:
+            counts = dict.fromkeys(JOB_STATUSES, 0)
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            counts["max_pending"] = self.max_pending
+            return counts
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
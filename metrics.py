@@ -0,0 +1,183 @@
+# metrics.py
+"""
+Счетчики и гистограммы времени этапов расчета в текстовом формате Prometheus.
+ECOLOGY_METRICS=0 отключает сбор: stage() возвращает пустой контекст,
+счетчики и гистограммы ничего не делают
+"""
+import contextlib
+import contextvars
+import os
+import threading
+import time
+
+ENABLED = os.environ.get('ECOLOGY_METRICS', '1') != '0'
+
+# Границы корзин гистограмм, секунды
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(zip(self.labels, key))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # Метки -> [число значений по корзинам (не накопленное), сумма, количество]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not ENABLED:
+            return
+        key = tuple(labels[name] for name in self.labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound),
+                     len(self.buckets))
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                pairs = list(zip(self.labels, key))
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', le)])} "
+                                 f"{cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(pairs)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(pairs)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("ecology_stage_seconds",
+                          "Время этапов расчета и построения графиков", ("stage",))
+REQUEST_SECONDS = Histogram("ecology_request_seconds",
+                            "Время обработки HTTP-запросов", ("endpoint",))
+RHS_EVALUATIONS = Counter("ecology_rhs_evaluations_total",
+                          "Вычисления правой части системы", ("method",))
+JACOBIAN_EVALUATIONS = Counter("ecology_jacobian_evaluations_total",
+                               "Вычисления матрицы Якоби", ("method",))
+SOLVER_STEPS = Counter("ecology_solver_steps_total", "Принятые шаги решателя", ("method",))
+SOLVES = Counter("ecology_solves_total", "Решения системы", ("method", "success"))
+ERRORS = Counter("ecology_errors_total", "Ошибки обработки запросов", ("endpoint", "error"))
+JOBS = Counter("ecology_jobs_total",
+               "События очереди задач: submitted, deduplicated, rejected, done, failed",
+               ("event",))
+SURROGATE = Counter("ecology_surrogate_total",
+                    "Ответы /predict: surrogate или причина расчета решателем "
+                    "(unavailable, out_of_domain, above_tolerance)", ("outcome",))
+
+REGISTRY = [STAGE_SECONDS, REQUEST_SECONDS, RHS_EVALUATIONS, JACOBIAN_EVALUATIONS,
+            SOLVER_STEPS, SOLVES, ERRORS, JOBS, SURROGATE]
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def record_solution(solution):
+    """Счетчики решателя по результату solvers.integrate"""
+    if not ENABLED:
+        return
+    method = solution["method"]
+    RHS_EVALUATIONS.inc(solution["nfev"], method=method)
+    JACOBIAN_EVALUATIONS.inc(solution["njev"], method=method)
+    if solution.get("steps") is not None:
+        SOLVER_STEPS.inc(solution["steps"], method=method)
+    SOLVES.inc(method=method, success=str(bool(solution["success"])).lower())
+
+
+# Разбивка времени текущего запроса по этапам: {этап: секунды} или None вне запроса
+_timings = contextvars.ContextVar('timings', default=None)
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        timings = _timings.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed
+        return False
+
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def stage(name):
+    """Контекст, замеряющий этап name: with stage("solve"): ..."""
+    return _Stage(name) if ENABLED else _NULL_STAGE
+
+
+def start_request():
+    """Начало сбора разбивки по этапам для текущего запроса; возвращает токен для finish_request"""
+    return _timings.set({}), time.perf_counter()
+
+
+def request_timings(token):
+    """Разбивка текущего запроса: этапы и общее время, секунды"""
+    _, started = token
+    return {
+        "stages": dict(_timings.get() or {}),
+        "total": time.perf_counter() - started,
+    }
+
+
+def finish_request(token, endpoint):
+    """Конец запроса: время запроса - в гистограмму, сбор разбивки прекращается"""
+    reset, started = token
+    REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    _timings.reset(reset)
@@ -3,29 +3,49 @@ import matplotlib
 matplotlib.use('Agg') 
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.integrate import odeint
+import io
+import json
 import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
-from functions import pend, calculate_total_loss, fx_linear  
+from functions import (build_disturbance_context, calculate_total_loss, calculate_total_losses,
+                       fx_linear, CompiledPend, DisturbanceContext)
+import metrics
+from artifacts import ArtifactStore
+from export import npz_bytes
+from grid import DIAGRAM_C, candidate_grid, select_points
 from radar_diagram import RadarDiagram
+from result_cache import ResultCache, make_key
+from schema import as_lists, parse_grid, parse_inputs, parse_time, parse_times
+from solvers import integrate, rk4
 
-data_sol = []
 logger = logging.getLogger(__name__)
 
-def fill_diagrams(data, initial_equations, restrictions):
-    radar = RadarDiagram()
-    
-    clipped_initial = np.clip(initial_equations, 0, 1.0)
-    clipped_data = np.clip(data, 0, 1.0)
-    clipped_restrictions = np.clip(restrictions, 0, 1.0)
+# Кэш результатов solve и построенных по ним изображений
+result_cache = ResultCache()
 
-    conc_indices = [
-        0,                    # C = 0
-        int(len(data) / 4),   # C = 0.25
-        int(len(data) / 2),   # C = 0.5
-        int(3 * len(data) / 4), # C = 0.75
-        -1                    # C = 1.0
-    ]
+# Каталоги запусков: у каждого расчета свои изображения и данные
+artifacts = ArtifactStore(os.environ.get('ECOLOGY_RUNS_DIR', 'runs'),
+                          ttl=float(os.environ.get('ECOLOGY_RUNS_TTL', 3600)))
+
+# pyplot хранит общее состояние, поэтому графики в одном процессе строятся по очереди
+render_lock = threading.Lock()
+
+def diagram_panels(data, C=None):
+    """
+    Срезы траектории для лепестковых диаграмм при C = 0, 0.25, 0.5, 0.75 и 1.0:
+    список (значения Cf1-Cf5, заголовок, показывать ли текущую линию).
+    C - сетка траектории (по умолчанию равномерная); точки срезов входят
+    в сетку solve, на других сетках значения интерполируются
+    """
+    if C is None:
+        C = np.linspace(0, 1, len(data))
+    clipped_data = np.clip(data, 0, 1.0)
+    slices = np.column_stack([np.interp(DIAGRAM_C, C, clipped_data[:, i])
+                              for i in range(clipped_data.shape[1])])
     
     titles = [
         "Характеристики при C = 0 (начальная концентрация)",
@@ -34,49 +54,70 @@ def fill_diagrams(data, initial_equations, restrictions):
         "Характеристики при C = 0.75",
         "Характеристики при C = 1.0 (максимальная концентрация)"
     ]
+
+    # На первой диаграмме текущие значения совпадают с начальными
+    return [(values, title, i > 0) for i, (values, title) in enumerate(zip(slices, titles))]
+
+def fill_diagrams(data, initial_equations, restrictions, filenames=None, C=None):
+    radar = RadarDiagram()
     
-    filenames = [
-        './static/images/diagram_eco.png',
-        './static/images/diagram_eco2.png',
-        './static/images/diagram_eco3.png',
-        './static/images/diagram_eco4.png',
-        './static/images/diagram_eco5.png'
-    ]
+    clipped_initial = np.clip(initial_equations, 0, 1.0)
+    clipped_restrictions = np.clip(restrictions, 0, 1.0)
+    
+    if filenames is None:
+        filenames = [
+            './static/images/diagram_eco.png',
+            './static/images/diagram_eco2.png',
+            './static/images/diagram_eco3.png',
+            './static/images/diagram_eco4.png',
+            './static/images/diagram_eco5.png'
+        ]
 
-    for i, (idx, title, fname) in enumerate(zip(conc_indices, titles, filenames)):
-        current_vals = clipped_data[idx]
-        
-        if i == 0:
-            radar.draw(
-                filename=fname,
-                initial_data=clipped_initial,
-                current_data=current_vals,
-                label="",
-                title=title,
-                restrictions=clipped_restrictions,
-                show_both_lines=False
-            )
-        else:
-            radar.draw(
-                filename=fname,
-                initial_data=clipped_initial,
-                current_data=current_vals,
-                label="",
-                title=title,
-                restrictions=clipped_restrictions,
-                show_both_lines=True
-            )
-
-def create_graphic(C, data):
+    for (current_vals, title, show_both_lines), fname in zip(diagram_panels(data, C), filenames):
+        radar.draw(
+            filename=fname,
+            initial_data=clipped_initial,
+            current_data=current_vals,
+            label="",
+            title=title,
+            restrictions=clipped_restrictions,
+            show_both_lines=show_both_lines
+        )
+
+def fill_diagram(data, initial_equations, restrictions, index, filename, C=None):
+    """Одна диаграмма из fill_diagrams (для построения по частям)"""
+    current_vals, title, show_both_lines = diagram_panels(data, C)[index]
+    RadarDiagram().draw(
+        filename=filename,
+        initial_data=np.clip(initial_equations, 0, 1.0),
+        current_data=current_vals,
+        label="",
+        title=title,
+        restrictions=np.clip(restrictions, 0, 1.0),
+        show_both_lines=show_both_lines
+    )
+
+def fill_diagrams_sprite(data, initial_equations, restrictions, filename, C=None):
+    """Все пять диаграмм одним PNG: панели в ряд, панель i - по ширине [i/5, (i+1)/5]"""
+    RadarDiagram().draw_panels(
+        filename=filename,
+        initial_data=np.clip(initial_equations, 0, 1.0),
+        panels=diagram_panels(data, C),
+        restrictions=np.clip(restrictions, 0, 1.0)
+    )
+
+CHARACTERISTIC_LABELS = [
+    "Cf₁ - Потери от заболеваемости населения",
+    "Cf₂ - Потери сельского хозяйства", 
+    "Cf₃ - Потери от изменения природной среды",
+    "Cf₄ - Потери от ухудшения качества жизни",
+    "Cf₅ - Потери предприятия"
+]
+
+def create_graphic(C, data, filename='./static/images/figure_eco.png'):
     fig, ax = plt.subplots(figsize=(20, 10))
     
-    labels = [
-        "Cf₁ - Потери от заболеваемости населения",
-        "Cf₂ - Потери сельского хозяйства", 
-        "Cf₃ - Потери от изменения природной среды",
-        "Cf₄ - Потери от ухудшения качества жизни",
-        "Cf₅ - Потери предприятия"
-    ]
+    labels = CHARACTERISTIC_LABELS
     
     line_labels = ["$Cf_{1}$", "$Cf_{2}$", "$Cf_{3}$", "$Cf_{4}$", "$Cf_{5}$"]
     
@@ -157,7 +198,7 @@ def create_graphic(C, data):
     ax.spines['right'].set_visible(False)
     
     plt.tight_layout(pad=3.0)
-    fig.savefig('./static/images/figure_eco.png', bbox_inches='tight', dpi=150)
+    fig.savefig(filename, bbox_inches='tight', dpi=150)
     plt.close(fig)
 
 
@@ -179,32 +220,73 @@ def cast_to_float(initial_equations, faks, equations, restrictions):
     return initial_equations, faks, equations, restrictions
 
 
-def process(initial_equations, faks, equations, restrictions, time_value=0.0):
-    global data_sol
+def solve(initial_equations, faks, equations, restrictions, time_value=0.0, method="odeint",
+          use_cache=True, C=None):
+    """
+    Решение системы без построения графиков
+    Возвращает словарь с сеткой C, траекторией data_sol и исходными данными,
+    по которому графики можно построить позже (render).
+    method - один из solvers.SOLVER_METHODS; для методов solve_ivp выход
+    на границы обрабатывается событиями. Число вычислений правой части - в nfev.
+    C - возрастающие точки из [0, 1], в которых нужны значения (решатель
+    интерполирует их сам); по умолчанию - адаптивная сетка для графиков
+    (grid.select_points), в которую входят срезы диаграмм grid.DIAGRAM_C.
+    use_cache=False - расчет заново, даже если результат есть в кэше.
+    Некорректные данные отклоняются до расчета (schema.ValidationError)
+    """
+    with metrics.stage("parse_inputs"):
+        inputs = parse_inputs(initial_equations, faks, equations, restrictions)
+        initial_equations, faks, equations, restrictions = as_lists(inputs)
+        time_value = parse_time(time_value)
+        if C is not None:
+            C = parse_grid(C)
 
-    initial_equations, faks, equations, restrictions = cast_to_float(
-        initial_equations, faks, equations, restrictions
-    )
-    time_value = float(time_value)
+    key = make_key(initial_equations, faks, equations, restrictions, time_value, method,
+                   None if C is None else C.tolist())
+    cached = result_cache.get(key) if use_cache else None
+    if cached is not None:
+        logger.info(f"Результат взят из кэша ({key[:12]})")
+        return cached
 
     logger.info(f"Параметры внутренних функций получены с интерфейса:")
     for i, eq_params in enumerate(equations):
         if eq_params:  
             logger.info(f"  f{i+1}: {eq_params}")
 
-    C = np.linspace(0, 1, 100)
-
     xm = [1.0, 1.0, 1.0, 1.0, 1.0] 
 
-    data_sol = odeint(pend, initial_equations, C, args=(faks, equations, xm, time_value))
-    
-  
-    data_sol = np.clip(data_sol, 0.0, 1.0) 
-    create_graphic(C, data_sol)
-    create_disturbances_graphic(C, faks, time_value)  
-    fill_diagrams(data_sol, initial_equations, restrictions)
+    # Возмущения x1-x6 считаются один раз для time_value, x7-x14 - по всей сетке C
+    with metrics.stage("compile"):
+        context = DisturbanceContext(inputs["faks"], np.full(14, 2), time_value)
+        rhs = CompiledPend(context, inputs["equations"], inputs["equation_lengths"], xm)
+
+    # Решение начинается с C = 0 (начальные значения), даже если эта точка не запрошена
+    if C is None:
+        points, base = candidate_grid(method, context.breaks)
+    else:
+        points = C if C[0] == 0.0 else np.concatenate([[0.0], C])
+    with metrics.stage("integrate"):
+        solution = integrate(rhs, initial_equations, points, method=method,
+                             rate=rhs.rate, lower=rhs.eps, upper=rhs.upper,
+                             jac=rhs.jacobian, rate_jac=rhs.rate_jacobian)
+    metrics.record_solution(solution)
+    if not solution["success"]:
+        logger.warning(f"Решатель {method}: {solution['message']}")
+    data_sol = np.clip(solution["y"], 0.0, 1.0)
+
+    if C is None:
+        # После сбоя решателя хвост траектории - NaN; для выбора точек он заменяется
+        # значением вне [0, 1], чтобы место сбоя осталось на сетке
+        with metrics.stage("grid"):
+            selected = select_points(points, np.nan_to_num(data_sol, nan=2.0), base)
+        C, data_sol = points[selected], data_sol[selected]
+    else:
+        data_sol = data_sol[len(points) - len(C):]
     
-    logger.info(f"Расчет завершен. Концентрация: {len(C)} точек, время t={time_value}.")
+    logger.info(f"Расчет завершен. Концентрация: {len(C)} точек из {len(points)}, "
+                f"время t={time_value}.")
+    logger.info(f"Метод {method}: вычислений правой части {solution['nfev']}, "
+                f"якобиана {solution['njev']}, переключений границ {len(solution['events'])}")
     logger.info(f"Начальные значения: {initial_equations}")
     logger.info(f"Конечные значения при C=1: {data_sol[-1]}")
     
@@ -213,6 +295,502 @@ def process(initial_equations, faks, equations, restrictions, time_value=0.0):
         value = fx_linear(time_value, faks[i])
         logger.info(f"  x{i+1}(t) = {value:.4f}")
 
+    result = {
+        "key": key,
+        "C": C,
+        "data_sol": data_sol,
+        "initial_equations": initial_equations,
+        "faks": faks,
+        "equations": equations,
+        "restrictions": restrictions,
+        "time_value": time_value,
+        "context": context,
+        "method": method,
+        "nfev": solution["nfev"],
+        "njev": solution["njev"],
+        "steps": solution["steps"],
+        "events": solution["events"],
+    }
+    # Траектория после сбоя решателя не кэшируется
+    if solution["success"]:
+        result_cache.put(key, result)
+    return result
+
+
+# Графики, которые строятся по результату solve: имя -> функция построения,
+# получающая результат и список файлов (путей или файловых объектов)
+RENDERERS = {
+    "graphic": lambda r, files: create_graphic(r["C"], r["data_sol"], files[0]),
+    "disturbances": lambda r, files: create_disturbances_graphic(
+        r["C"], r["faks"], r["time_value"], r["context"], files[0]),
+    "diagrams": lambda r, files: fill_diagrams(r["data_sol"], r["initial_equations"],
+                                               r["restrictions"], files, r["C"]),
+    "diagrams_sprite": lambda r, files: fill_diagrams_sprite(
+        r["data_sol"], r["initial_equations"], r["restrictions"], files[0], r["C"]),
+}
+
+# Имена файлов запуска, которые записывает каждая функция построения
+RENDER_FILES = {
+    "graphic": ["figure.png"],
+    "disturbances": ["disturbances.png"],
+    "diagrams": ["diagram1.png", "diagram2.png", "diagram3.png", "diagram4.png", "diagram5.png"],
+    "diagrams_sprite": ["diagrams.png"],
+}
+ARTIFACT_KINDS = {name: kind for kind, names in RENDER_FILES.items() for name in names}
+
+
+def save_run(result):
+    """Создание запуска в artifacts и сохранение в нем входных данных, сетки и траектории"""
+    with metrics.stage("save_run"):
+        run_id = artifacts.create_run()
+        artifacts.write_json(run_id, "inputs.json", {
+            "initial_equations": result["initial_equations"],
+            "faks": result["faks"],
+            "equations": result["equations"],
+            "restrictions": result["restrictions"],
+            "time_value": result["time_value"],
+            "method": result["method"],
+        })
+        for name in ("C", "data_sol"):
+            buffer = io.BytesIO()
+            np.save(buffer, result[name])
+            artifacts.write(run_id, f"{name}.npy", buffer.getvalue())
+    return run_id
+
+
+def load_run(run_id):
+    """Результат расчета, сохраненный save_run, или None"""
+    inputs = artifacts.read_json(run_id, "inputs.json")
+    data = artifacts.read(run_id, "data_sol.npy")
+    if inputs is None or data is None:
+        return None
+
+    inputs.setdefault("method", "odeint")
+    key = make_key(inputs["initial_equations"], inputs["faks"], inputs["equations"],
+                   inputs["restrictions"], inputs["time_value"], inputs["method"])
+    # Запуски, сохраненные до адаптивной сетки, - на равномерной сетке из 100 точек
+    grid = artifacts.read(run_id, "C.npy")
+    data_sol = np.load(io.BytesIO(data))
+    C = np.linspace(0, 1, len(data_sol)) if grid is None else np.load(io.BytesIO(grid))
+
+    result = dict(inputs)
+    result.update({
+        "key": key,
+        "C": C,
+        "data_sol": data_sol,
+        "context": build_disturbance_context(inputs["faks"], inputs["time_value"]),
+    })
+    return result
+
+
+def render_images(result, kind, index=None):
+    """
+    Построение графиков вида kind в память: {имя файла: байты PNG}.
+    Для "diagrams" можно указать index - тогда строится только одна диаграмма
+    """
+    names = RENDER_FILES[kind]
+    if index is not None:
+        buffer = io.BytesIO()
+        with metrics.stage("render_diagram"), render_lock:
+            fill_diagram(result["data_sol"], result["initial_equations"],
+                         result["restrictions"], index, buffer, result["C"])
+        return {names[index]: buffer.getvalue()}
+
+    buffers = [io.BytesIO() for _ in names]
+    with metrics.stage(f"render_{kind}"), render_lock:
+        RENDERERS[kind](result, buffers)
+    return {name: buffer.getvalue() for name, buffer in zip(names, buffers)}
+
+
+# Пул процессов для параллельного построения (render_pool.RenderPool) или None
+render_pool = None
+
+
+def start_render_pool(workers=None):
+    """Запуск пула процессов построения графиков; далее render использует его"""
+    global render_pool
+    from render_pool import RenderPool
+
+    if render_pool is None:
+        render_pool = RenderPool(workers)
+    return render_pool
+
+
+def render(result, run_id, kinds=None, use_cache=True):
+    """
+    Построение графиков по результату solve в каталог запуска run_id
+    (по умолчанию - всех). Если изображения для этих входных данных
+    уже есть в кэше, они копируются без повторного построения
+    (use_cache=False - строятся всегда).
+    Если запущен render_pool, недостающие графики строятся в нем параллельно
+    """
+    key = result.get("key")
+    images = {}
+    missing = []
+    for kind in (kinds or RENDERERS):
+        names = RENDER_FILES[kind]
+        cached = [result_cache.get_image(key, name) if use_cache else None for name in names]
+        if any(image is None for image in cached):
+            missing.append(kind)
+        else:
+            images.update(zip(names, cached))
+
+    if missing:
+        if render_pool is not None:
+            with metrics.stage("render_pool"):
+                rendered = render_pool.render(result, missing)
+        else:
+            rendered = {}
+            for kind in missing:
+                rendered.update(render_images(result, kind))
+        for name, image in rendered.items():
+            result_cache.put_image(key, name, image)
+        images.update(rendered)
+
+    with metrics.stage("write_png"):
+        for name, image in images.items():
+            artifacts.write(run_id, name, image)
+
+
+def render_artifact(run_id, name):
+    """
+    Содержимое файла запуска; изображение, данные графиков или выгрузка NPZ
+    строятся при первом обращении. Возвращает None, если запуска или такого файла нет
+    """
+    data = artifacts.read(run_id, name)
+    if data is not None or not (name in ARTIFACT_KINDS or name in (CHARTS_FILE, EXPORT_FILE)):
+        return data
+
+    result = load_run(run_id)
+    if result is None:
+        return None
+    if name == CHARTS_FILE:
+        save_charts(result, run_id)
+    elif name == EXPORT_FILE:
+        with metrics.stage("export_npz"):
+            artifacts.write(run_id, EXPORT_FILE, npz_bytes(result))
+    else:
+        render(result, run_id, [ARTIFACT_KINDS[name]])
+    artifacts.touch(run_id)
+    return artifacts.read(run_id, name)
+
+
+# Данные графиков для построения на клиенте (вместо PNG)
+CHARTS_FILE = "charts.json"
+# Траектория, входные данные и потери в каждой точке C (export.save_npz)
+EXPORT_FILE = "export.npz"
+CHART_DIGITS = 4
+
+
+def _rounded(values):
+    return np.round(np.asarray(values, dtype=float), CHART_DIGITS).tolist()
+
+
+def chart_data(result):
+    """
+    Ряды, которые рисуют create_graphic, create_disturbances_graphic и
+    fill_diagrams, в виде словаря для JSON: характеристики Cf1-Cf5 от C,
+    возмущения x1-x14 и срезы для лепестковых диаграмм
+    """
+    C = result["C"]
+    data = result["data_sol"]
+    context = result["context"]
+    faks = result["faks"]
+    concentration_values = context.concentration_values(C)
+
+    return {
+        "C": _rounded(C),
+        "time_value": result["time_value"],
+        "characteristics": [
+            {"name": f"Cf{i + 1}", "label": label, "values": _rounded(np.clip(data[:, i], 0, 1.0))}
+            for i, label in enumerate(CHARACTERISTIC_LABELS)
+        ],
+        "time_disturbances": [
+            {"name": f"x{i + 1}", "value": round(float(context.time_values[i]), CHART_DIGITS)}
+            for i in range(min(6, len(faks))) if len(faks[i]) >= 2
+        ],
+        "concentration_disturbances": [
+            {"name": f"x{i + 1}", "values": _rounded(concentration_values[:, i - 6])}
+            for i in range(6, min(14, len(faks))) if len(faks[i]) >= 2
+        ],
+        "radar": {
+            "labels": ["Cf1", "Cf2", "Cf3", "Cf4", "Cf5"],
+            "initial": _rounded(np.clip(result["initial_equations"], 0, 1.0)),
+            "restrictions": _rounded(np.clip(result["restrictions"], 0, 1.0)),
+            "panels": [
+                {"title": title, "values": _rounded(values), "show_current": show_both_lines}
+                for values, title, show_both_lines in diagram_panels(data, C)
+            ],
+        },
+    }
+
+
+def save_charts(result, run_id):
+    """Запись chart_data в файл запуска charts.json (компактный JSON)"""
+    with metrics.stage("charts_json"):
+        payload = json.dumps(chart_data(result), ensure_ascii=False, separators=(',', ':'))
+        artifacts.write(run_id, CHARTS_FILE, payload.encode('utf-8'))
+
+
+def summarize(result):
+    """Числовые результаты расчета в виде, пригодном для JSON"""
+    data = result["data_sol"]
+    return {
+        "C": result["C"].tolist(),
+        "data_sol": data.tolist(),
+        "final_values": data[-1].tolist(),
+        "total_loss": calculate_total_loss(data[-1]),
+        "method": result.get("method", "odeint"),
+        "nfev": result.get("nfev"),
+        "njev": result.get("njev"),
+        "steps": result.get("steps"),
+    }
+
+
+def process(initial_equations, faks, equations, restrictions, time_value=0.0, output="png",
+            method="odeint", use_cache=True):
+    """
+    Расчет в новом запуске; run_id - в результате. При output="png" строятся
+    все графики, при output="json" - только charts.json для отрисовки на клиенте
+    """
+    result = solve(initial_equations, faks, equations, restrictions, time_value, method,
+                   use_cache)
+    run_id = save_run(result)
+    if output == "json":
+        save_charts(result, run_id)
+    else:
+        render(result, run_id, use_cache=use_cache)
+    return dict(result, run_id=run_id)
+
+def process_batch(initial_equations, faks, equations, time_value=0.0,
+                  equation_lengths=None, substeps=1):
+    """
+    Пакетный расчет N наборов параметров одним векторизованным решением
+    initial_equations - массив [N x 5]
+    faks - массив [N x 14 x 2]
+    equations - массив [N x 12 x 3], недостающие коэффициенты заполнены NaN
+    equation_lengths - число коэффициентов функций [N x 12] (по умолчанию - по NaN)
+    time_value - число или массив [N]
+    substeps - число шагов RK4 между соседними точками сетки
+    Возвращает траектории [N x 100 x 5] на сетке C = linspace(0, 1, 100)
+    """
+    initial_equations = np.asarray(initial_equations, dtype=float)
+    faks = np.asarray(faks, dtype=float)
+    equations = np.asarray(equations, dtype=float)
+
+    faks_len = np.sum(~np.isnan(faks), axis=-1)
+    if equation_lengths is None:
+        equation_lengths = np.sum(~np.isnan(equations), axis=-1)
+
+    C = np.linspace(0, 1, 100)
+    xm = np.ones(5)
+
+    context = DisturbanceContext(np.nan_to_num(faks), faks_len, time_value)
+    rhs = CompiledPend(context, np.nan_to_num(equations), equation_lengths, xm)
+    data = rk4(rhs, initial_equations, C, substeps)
+
+    logger.info(f"Пакетный расчет завершен: {len(initial_equations)} наборов.")
+    return np.clip(np.moveaxis(data, 0, 1), 0.0, 1.0)
+
+
+# Число процессов для solve_series (1 - моменты времени решаются в текущем процессе)
+SERIES_WORKERS = int(os.environ.get('ECOLOGY_SERIES_WORKERS', 1))
+
+
+def _solve_times(rhs, initial_equations, times, C, method):
+    """
+    Решения для части сетки времени: траектории [len(times) x len(C) x 5],
+    число вычислений правой части и номера моментов со сбоем решателя
+    """
+    data = np.empty((len(times), len(C), 5))
+    nfev = 0
+    failed = []
+    for k, t in enumerate(times):
+        rhs_t = rhs.with_context(rhs.context.at_time(t))
+        solution = integrate(rhs_t, initial_equations, C, method=method,
+                             rate=rhs_t.rate, lower=rhs_t.eps, upper=rhs_t.upper,
+                             jac=rhs_t.jacobian, rate_jac=rhs_t.rate_jacobian)
+        data[k] = solution["y"]
+        nfev += solution["nfev"]
+        if not solution["success"]:
+            failed.append(k)
+    return data, nfev, failed
+
+
+def _prepare_series(initial_equations, faks, equations, restrictions, time_values, method, C):
+    """
+    Общая для всех t часть расчета по сетке времени: разобранные данные, time_values,
+    C, правая часть при t = time_values[0], точки решения и начальная сетка (или None)
+    """
+    with metrics.stage("parse_inputs"):
+        inputs = parse_inputs(initial_equations, faks, equations, restrictions)
+        time_values = parse_times(time_values)
+        if C is not None:
+            C = parse_grid(C)
+
+    xm = [1.0, 1.0, 1.0, 1.0, 1.0]
+    with metrics.stage("compile"):
+        context = DisturbanceContext(inputs["faks"], np.full(14, 2), time_values[0])
+        rhs = CompiledPend(context, inputs["equations"], inputs["equation_lengths"], xm)
+
+    if C is None:
+        points, base = candidate_grid(method, context.breaks)
+    else:
+        points, base = (C if C[0] == 0.0 else np.concatenate([[0.0], C])), None
+    return inputs, time_values, C, rhs, points, base
+
+
+def iter_series(initial_equations, faks, equations, restrictions, time_values,
+                method="odeint", C=(1.0,)):
+    """
+    Решения по сетке времени по одному, по мере готовности: генератор
+    (номер, t, траектория [len(C) x 5], успех решателя). Подготовка общая,
+    как у solve_series; в памяти - только текущее решение.
+    По умолчанию C = (1.0,) - только конечные значения; C=None - сетка-кандидат
+    grid.candidate_grid (адаптивный выбор точек требует всех решений сразу)
+    """
+    inputs, time_values, C, rhs, points, _ = _prepare_series(
+        initial_equations, faks, equations, restrictions, time_values, method,
+        None if C is None else list(C))
+    if C is None:
+        C = points
+    initial = inputs["initial_equations"]
+    for k, t in enumerate(time_values):
+        rhs_t = rhs.with_context(rhs.context.at_time(t))
+        with metrics.stage("integrate"):
+            solution = integrate(rhs_t, initial, points, method=method,
+                                 rate=rhs_t.rate, lower=rhs_t.eps, upper=rhs_t.upper,
+                                 jac=rhs_t.jacobian, rate_jac=rhs_t.rate_jacobian)
+        metrics.record_solution(solution)
+        data = np.clip(solution["y"][len(points) - len(C):], 0.0, 1.0)
+        yield k, float(t), data, solution["success"]
+
+
+def solve_series(initial_equations, faks, equations, restrictions, time_values,
+                 method="odeint", C=None, workers=None):
+    """
+    Решение для сетки времени time_values (вместо одного time_value):
+    поверхность data_sol [T x len(C) x 5] и суммарные потери total_loss [T x len(C)].
+    Разбор данных, внутренние функции и таблица отрезков x7-x14 готовятся
+    один раз; для каждого t пересчитываются только x1-x6 (DisturbanceContext.at_time).
+    rk4 решает все моменты одним векторизованным расчетом, остальные методы -
+    по отдельности, при workers > 1 - в пуле процессов (по умолчанию SERIES_WORKERS).
+    C - как у solve; по умолчанию - общая для всех t адаптивная сетка
+    """
+    inputs, time_values, C, rhs, points, base = _prepare_series(
+        initial_equations, faks, equations, restrictions, time_values, method, C)
+    initial_equations, faks, equations, restrictions = as_lists(inputs)
+    context = rhs.context
+
+    workers = workers or SERIES_WORKERS
+    with metrics.stage("integrate"):
+        if method == "rk4":
+            batch = rhs.with_context(context.at_time(time_values))
+            y0 = np.broadcast_to(inputs["initial_equations"], (len(time_values), 5))
+            solution = integrate(batch, y0, points, method=method)
+            data = np.moveaxis(solution["y"], 0, 1)
+            nfev = solution["nfev"]
+            failed = np.flatnonzero(~np.isfinite(data).all(axis=(1, 2))).tolist()
+        elif workers == 1:
+            data, nfev, failed = _solve_times(rhs, initial_equations, time_values, points, method)
+        else:
+            chunks = np.array_split(np.arange(len(time_values)), min(workers, len(time_values)))
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = [executor.submit(_solve_times, rhs, initial_equations,
+                                           time_values[chunk], points, method)
+                           for chunk in chunks]
+                parts = [future.result() for future in futures]
+            data = np.concatenate([part[0] for part in parts])
+            nfev = sum(part[1] for part in parts)
+            failed = [int(chunk[k]) for chunk, part in zip(chunks, parts) for k in part[2]]
+    data = np.clip(data, 0.0, 1.0)
+    if failed:
+        logger.warning(f"Решатель {method}: сбой при t = {time_values[failed].tolist()}")
+
+    if C is None:
+        with metrics.stage("grid"):
+            # Сетка общая для всех t: точки выбираются по всем траекториям сразу
+            flat = np.moveaxis(data, 0, 1).reshape(len(points), -1)
+            selected = select_points(points, np.nan_to_num(flat, nan=2.0), base)
+        C, data = points[selected], data[:, selected]
+    else:
+        data = data[:, len(points) - len(C):]
+
+    logger.info(f"Расчет по времени завершен: {len(time_values)} моментов, "
+                f"{len(C)} точек концентрации, вычислений правой части {nfev}.")
+    return {
+        "C": C,
+        "time_values": time_values,
+        "data_sol": data,
+        "total_loss": calculate_total_losses(data),
+        "initial_equations": initial_equations,
+        "faks": faks,
+        "equations": equations,
+        "restrictions": restrictions,
+        "method": method,
+        "nfev": nfev,
+        "failed": failed,
+    }
+
+
+SERIES_FILE = "series.png"
+
+
+def create_series_graphic(C, time_values, data, filename):
+    """
+    Поверхности по сетке времени одним рисунком: тепловая карта суммарных
+    потерь и карты Cf1-Cf5 (ось x - C, ось y - t) с линиями уровня
+    """
+    surfaces = [("Суммарные потери", calculate_total_losses(data))]
+    surfaces += [(label, data[:, :, i]) for i, label in enumerate(CHARACTERISTIC_LABELS)]
+
+    fig, axes = plt.subplots(2, 3, figsize=(20, 11), sharex=True, sharey=True)
+    for ax, (title, values) in zip(axes.flat, surfaces):
+        mesh = ax.pcolormesh(C, time_values, values, shading='nearest', cmap='viridis',
+                             vmin=0.0, vmax=1.0)
+        # Цвет - в общей шкале [0, 1], линии уровня - по диапазону своей поверхности
+        contours = ax.contour(C, time_values, values, levels=8, colors='white',
+                              linewidths=0.8, alpha=0.8)
+        ax.clabel(contours, fontsize=8, fmt='%.3g')
+        ax.set_title(title, fontsize=12, fontweight='bold')
+        ax.tick_params(axis='both', which='major', labelsize=10)
+    for ax in axes[-1]:
+        ax.set_xlabel("C, концентрация", fontsize=11, fontweight='bold')
+    for ax in axes[:, 0]:
+        ax.set_ylabel("t, время", fontsize=11, fontweight='bold')
+
+    fig.colorbar(mesh, ax=axes, shrink=0.9, label="Значение")
+    fig.suptitle("Характеристики и суммарные потери от концентрации и времени",
+                 fontsize=16, fontweight='bold')
+    fig.savefig(filename, bbox_inches='tight', dpi=150)
+    plt.close(fig)
+
+
+def render_series(result):
+    """Запуск с рисунком create_series_graphic (SERIES_FILE); возвращает run_id"""
+    buffer = io.BytesIO()
+    with metrics.stage("render_series"), render_lock:
+        create_series_graphic(result["C"], result["time_values"], result["data_sol"], buffer)
+    run_id = artifacts.create_run()
+    artifacts.write(run_id, SERIES_FILE, buffer.getvalue())
+    return run_id
+
+
+def summarize_series(result):
+    """Числовые результаты solve_series в виде, пригодном для JSON"""
+    data = result["data_sol"]
+    return {
+        "C": result["C"].tolist(),
+        "time_values": result["time_values"].tolist(),
+        "data_sol": data.tolist(),
+        "total_loss": result["total_loss"].tolist(),
+        "final_values": data[:, -1].tolist(),
+        "method": result["method"],
+        "nfev": result["nfev"],
+        "failed": result["failed"],
+    }
+
 u_list = [
     "Cf₁ - Потери, связанные с ростом заболеваемости населения",
     "Cf₂ - Потери сельского хозяйства от воздействия атмосферных поллютантов",
@@ -221,7 +799,12 @@ u_list = [
     "Cf₅ - Потери предприятия, возникающие при регулировании атмосферных выбросов и оплате штрафов"
 ]
 
-def create_disturbances_graphic(C, faks, time_value=0.0):
+def create_disturbances_graphic(C, faks, time_value=0.0, context=None,
+                                filename='./static/images/disturbances_eco.png'):
+    if context is None:
+        context = build_disturbance_context(faks, time_value)
+    concentration_values = context.concentration_values(C)
+
     fig, axes = plt.subplots(3, 1, figsize=(16, 18))
     ax1, ax2, ax3 = axes
  
@@ -235,8 +818,7 @@ def create_disturbances_graphic(C, faks, time_value=0.0):
     
     for i in range(min(6, len(faks))):
         if len(faks[i]) >= 2:
-            value = fx_linear(time_value, faks[i])
-            value = max(0.0, min(1.0, value))
+            value = context.time_values[i]
         
             eq_str = " = a·t + b"
             
@@ -264,11 +846,7 @@ def create_disturbances_graphic(C, faks, time_value=0.0):
     curves_1 = []
     for i in range(6, min(10, len(faks))):
         if i < len(faks) and len(faks[i]) >= 2:
-            curve = []
-            for c_val in C:
-                value = fx_linear(c_val, faks[i])
-                value = max(0.0, min(1.0, value))
-                curve.append(value)
+            curve = concentration_values[:, i - 6]
             curves_1.append((i, curve))
     
     num_curves_1 = len(curves_1)
@@ -345,11 +923,7 @@ def create_disturbances_graphic(C, faks, time_value=0.0):
     curves_2 = []
     for i in range(10, min(14, len(faks))):
         if i < len(faks) and len(faks[i]) >= 2:
-            curve = []
-            for c_val in C:
-                value = fx_linear(c_val, faks[i])
-                value = max(0.0, min(1.0, value))
-                curve.append(value)
+            curve = concentration_values[:, i - 6]
             curves_2.append((i, curve))
 
     num_curves_2 = len(curves_2)
@@ -432,7 +1006,7 @@ def create_disturbances_graphic(C, faks, time_value=0.0):
         ax.axhline(y=1.0, color='black', linestyle='-', alpha=0.1, linewidth=0.5)
     
     plt.tight_layout()
-    fig.savefig('./static/images/disturbances_eco.png', bbox_inches='tight', dpi=150)
+    fig.savefig(filename, bbox_inches='tight', dpi=150)
     plt.close(fig)
   
     logger.info(f"Создан график возмущений. t={time_value:.2f}")
@@ -0,0 +1,92 @@
+# profiling.py
+"""
+Профилирование отдельных запросов по требованию (cProfile).
+Включается только в отладочном режиме Flask или при ECOLOGY_PROFILING=1;
+обычные запросы профилировщик не затрагивает
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_FILE = "profile.pstats"
+PROFILE_REPORT = "profile.txt"
+DEFAULT_TOP = 25
+MAX_TOP = 200
+
+
+def profiling_allowed(debug=False):
+    return debug or os.environ.get('ECOLOGY_PROFILING') == '1'
+
+
+def requested_top(headers, debug=False):
+    """
+    Число функций в отчете, если запрос просит профилирование (заголовок
+    X-Profile: 1 или X-Profile: <N>) и оно разрешено; иначе 0
+    """
+    value = headers.get(PROFILE_HEADER)
+    if not value or not profiling_allowed(debug):
+        return 0
+    try:
+        top = int(value)
+    except ValueError:
+        return 0
+    if top <= 0:
+        return 0
+    return min(DEFAULT_TOP if top == 1 else top, MAX_TOP)
+
+
+def _function_name(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def top_functions(stats, top=DEFAULT_TOP):
+    """Первые top функций по накопленному времени: вызовы, собственное и накопленное время"""
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    rows = []
+    for func in stats.fcn_list[:top]:
+        primitive_calls, calls, total_time, cumulative_time, _ = stats.stats[func]
+        rows.append({
+            "function": _function_name(func),
+            "calls": calls,
+            "primitive_calls": primitive_calls,
+            "tottime": total_time,
+            "cumtime": cumulative_time,
+        })
+    return rows
+
+
+def profile_call(function, *args, top=DEFAULT_TOP, **kwargs):
+    """
+    Вызов function(*args, **kwargs) под cProfile.
+    Возвращает результат и словарь профиля: stats (pstats.Stats),
+    data (байты в формате pstats, как у dump_stats), report (текст)
+    и top - первые функции по накопленному времени
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(function, *args, **kwargs)
+
+    report = io.StringIO()
+    stats = pstats.Stats(profiler, stream=report)
+    data = marshal.dumps(stats.stats)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    return result, {
+        "stats": stats,
+        "data": data,
+        "report": report.getvalue(),
+        "top": top_functions(stats, top),
+    }
+
+
+def save_profile(store, run_id, profile):
+    """
+    Запись профиля в файлы запуска: profile.pstats (открывается
+    pstats.Stats, snakeviz и т.п.) и profile.txt (текстовый отчет)
+    """
+    store.write(run_id, PROFILE_FILE, profile["data"])
+    store.write(run_id, PROFILE_REPORT, profile["report"].encode('utf-8'))
@@ -2,8 +2,9 @@
 
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from matplotlib.patches import Circle, RegularPolygon
 from matplotlib.path import Path
 from matplotlib.projections.polar import PolarAxes
@@ -13,12 +14,24 @@ from matplotlib.transforms import Affine2D
 
 
 class RadarDiagram:
+    # Зарегистрированные проекции: (num_vars, frame) -> (имя проекции, углы осей)
+    _projections = {}
+
     def radar_factory(self, num_vars, frame='circle'):
+        """
+        Регистрация проекции радара (один раз на процесс для каждой пары
+        num_vars, frame); возвращает углы осей. Имя проекции - в self.projection
+        """
+        key = (num_vars, frame)
+        if key in RadarDiagram._projections:
+            self.projection, theta = RadarDiagram._projections[key]
+            return theta
+
         theta = np.linspace(0, 2 * np.pi, num_vars, endpoint=False)
 
         class RadarAxes(PolarAxes):
 
-            name = 'radar'
+            name = f'radar_{frame}_{num_vars}'
             RESOLUTION = 1
 
             def __init__(self, *args, **kwargs):
@@ -66,16 +79,51 @@ class RadarDiagram:
                     raise ValueError("Unknown value for 'frame': %s" % frame)
 
         register_projection(RadarAxes)
+        RadarDiagram._projections[key] = (RadarAxes.name, theta)
+        self.projection = RadarAxes.name
         return theta
 
-    def draw(self, filename, initial_data, current_data, label, title, restrictions=None, show_both_lines=True):
+    def __init__(self):
+        self._template = None
+        self._template_key = None
+
+    def _setup_axes(self, ax, theta, initial_data, restrictions):
+        """
+        Неизменная часть диаграммы: линия и подписи пределов, начальные условия,
+        подписи осей. Возвращает изменяемые элементы
+        """
         N = len(initial_data)
-        theta = self.radar_factory(N, frame='polygon')
+        handles = []
+        if restrictions is not None and len(restrictions) == N:
+            ax.plot(theta, restrictions, color='green', linewidth=2, linestyle='--',
+                    alpha=0.7, label="Предельные значения")
+            handles.append(ax.lines[-1])
 
-        fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(projection='radar'))
-        fig.subplots_adjust(top=0.85, bottom=0.05)
+        ax.plot(theta, initial_data, color='red', linewidth=2, label="Начальные условия")
+        handles.append(ax.lines[-1])
+        ax.plot(theta, initial_data, color='blue', linewidth=2, label="Текущие характеристики")
+        current_line = ax.lines[-1]
+
+        var_labels = ["Cf1", "Cf2", "Cf3", "Cf4", "Cf5"]
+        ax.set_varlabels(var_labels)
+
+        if restrictions is not None and len(restrictions) == N:
+            for i in range(N):
+                angle = theta[i]
+                value = restrictions[i]
+                ax.text(angle, value * 1.02, f'{value:.2f}',
+                    color='green', fontsize=9, ha='center', va='bottom')
 
-    
+        return {
+            "ax": ax,
+            "theta": np.append(theta, theta[0]),
+            "current_line": current_line,
+            "handles": handles,
+        }
+
+    def _update_axes(self, parts, initial_data, current_data, restrictions, show_both_lines):
+        """Данные, которые меняются от диаграммы к диаграмме: текущая линия, предел оси, легенда"""
+        N = len(initial_data)
         max_vals = []
         for i in range(N):
             axis_max = 1.0  
@@ -93,34 +141,77 @@ class RadarDiagram:
             max_vals.append(axis_max)
         
       
-        ax.set_ylim(0, max(max_vals)) 
-    
-        if restrictions is not None and len(restrictions) == N:
-  
-            ax.plot(theta, restrictions, color='green', linewidth=2, linestyle='--', 
-                    alpha=0.7, label="Предельные значения")
-        
-        if show_both_lines:
-           
-            ax.plot(theta, initial_data, color='red', linewidth=2, label="Начальные условия")
- 
-            ax.plot(theta, current_data, color='blue', linewidth=2, label="Текущие характеристики")
-            
-            ax.legend(loc='upper right', bbox_to_anchor=(1.3, 1.0), fontsize='small')
-        else:
-            ax.plot(theta, initial_data, color='red', linewidth=2, label="Начальные условия")
-            ax.legend(loc='upper right', bbox_to_anchor=(1.3, 1.0), fontsize='small')
-
-        var_labels = ["Cf1", "Cf2", "Cf3", "Cf4", "Cf5"]
-        ax.set_varlabels(var_labels)
+        parts["ax"].set_ylim(0, max(max_vals))
+
+        current_line = parts["current_line"]
+        current_line.set_data(parts["theta"], np.append(current_data, current_data[0]))
+        current_line.set_visible(show_both_lines)
+        # Легенда строится заново (ax.legend заменяет прежнюю): текущие характеристики
+        # в ней только вместе с их линией
+        handles = parts["handles"] + ([current_line] if show_both_lines else [])
+        parts["ax"].legend(handles=handles, loc='upper right', bbox_to_anchor=(1.3, 1.0),
+                           fontsize='small')
+
+    def _build_template(self, initial_data, restrictions):
+        """
+        Заготовка рисунка для заданных начальных условий и пределов:
+        рамка, подписи осей, линия и подписи пределов и заголовок.
+        При отрисовке диаграмм меняются только данные линий, пределы оси, легенда и заголовок
+        """
+        theta = self.radar_factory(len(initial_data), frame='polygon')
+
+        fig = Figure(figsize=(10, 10))
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot(projection=self.projection)
+        fig.subplots_adjust(top=0.85, bottom=0.05)
 
-        if restrictions is not None and len(restrictions) == N:
-            for i in range(N):
-                angle = theta[i]
-                value = restrictions[i]
-                ax.text(angle, value * 1.02, f'{value:.2f}', 
-                    color='green', fontsize=9, ha='center', va='bottom')
+        template = self._setup_axes(ax, theta, initial_data, restrictions)
+        template.update({
+            "fig": fig,
+            "renderer": canvas.get_renderer(),
+            "title": fig.text(0.5, 0.965, "", horizontalalignment='center', color='black',
+                              weight='bold', size='large'),
+        })
+        return template
+
+    def _get_template(self, initial_data, restrictions):
+        key = (tuple(initial_data), None if restrictions is None else tuple(restrictions))
+        if self._template_key != key:
+            self._template = self._build_template(initial_data, restrictions)
+            self._template_key = key
+        return self._template
 
-        fig.text(0.5, 0.965, title, horizontalalignment='center', color='black', weight='bold', size='large')
-        fig.savefig(filename, bbox_inches='tight')
-        plt.close(fig)
\ No newline at end of file
+    def draw(self, filename, initial_data, current_data, label, title, restrictions=None, show_both_lines=True):
+        template = self._get_template(initial_data, restrictions)
+        self._update_axes(template, initial_data, current_data, restrictions, show_both_lines)
+        template["title"].set_text(title)
+
+        # Границы рисунка без предварительной полной отрисовки, которую делает bbox_inches='tight'
+        fig = template["fig"]
+        bbox = fig.get_tightbbox(template["renderer"])
+        pad = matplotlib.rcParams['savefig.pad_inches']
+        fig.savefig(filename, bbox_inches=bbox.padded(pad))
+
+    def draw_panels(self, filename, initial_data, panels, restrictions=None, panel_size=8, dpi=75):
+        """
+        Все диаграммы одним изображением: панели одинакового размера
+        (panel_size дюймов) в ряд слева направо, одно кодирование PNG.
+        panels - список (current_data, title, show_both_lines).
+        Панель i занимает по ширине долю [i/n, (i+1)/n], поэтому ее можно
+        вырезать на клиенте как спрайт
+        """
+        n = len(panels)
+        theta = self.radar_factory(len(initial_data), frame='polygon')
+
+        fig = Figure(figsize=(panel_size * n, panel_size), dpi=dpi)
+        FigureCanvasAgg(fig)
+
+        for i, (current_data, title, show_both_lines) in enumerate(panels):
+            # Справа от оси остается место под легенду (bbox_to_anchor=1.3)
+            ax = fig.add_axes([(i + 0.1) / n, 0.05, 0.65 / n, 0.78], projection=self.projection)
+            parts = self._setup_axes(ax, theta, initial_data, restrictions)
+            self._update_axes(parts, initial_data, current_data, restrictions, show_both_lines)
+            fig.text((i + 0.5) / n, 0.95, title, horizontalalignment='center', color='black',
+                     weight='bold', size='large')
+
+        fig.savefig(filename, dpi=dpi)
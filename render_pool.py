@@ -0,0 +1,84 @@
+# render_pool.py
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Поля результата solve, которые передаются в процесс построения
+PAYLOAD_FIELDS = ["C", "data_sol", "initial_equations", "faks", "equations",
+                  "restrictions", "time_value"]
+
+# Графики, которые строятся по частям: вид -> число отдельных изображений
+SPLIT_KINDS = {"diagrams": 5}
+
+
+def _warm_up():
+    """
+    Инициализация процесса: импорт matplotlib и модулей расчета,
+    пробная отрисовка текста, чтобы шрифты были загружены до первого задания
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import process_ecology  # noqa: F401
+
+    fig, ax = plt.subplots()
+    ax.set_title("Cf₁ x₁₄")
+    ax.text(0.5, 0.5, "$x_{1}$", fontweight='bold')
+    fig.savefig(io.BytesIO())
+    plt.close(fig)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _render_job(payload, kind, index):
+    from functions import build_disturbance_context
+    from process_ecology import render_images
+
+    result = dict(payload, context=build_disturbance_context(payload["faks"], payload["time_value"]))
+    return render_images(result, kind, index)
+
+
+class RenderPool:
+    """
+    Пул процессов для построения графиков. В каждом процессе своя копия
+    pyplot, поэтому задания выполняются параллельно; результат - байты PNG.
+    Процессы запускаются сразу и прогреваются (_warm_up)
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or min(7, os.cpu_count() or 1)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_warm_up,
+        )
+        pids = {f.result() for f in [self._executor.submit(_ping) for _ in range(self.workers)]}
+        logger.info(f"Пул построения графиков запущен: {len(pids)} из {self.workers} процессов")
+
+    def jobs(self, kinds):
+        """Разбиение видов графиков на независимые задания (kind, index)"""
+        for kind in kinds:
+            if kind in SPLIT_KINDS:
+                for index in range(SPLIT_KINDS[kind]):
+                    yield kind, index
+            else:
+                yield kind, None
+
+    def render(self, result, kinds):
+        """Построение графиков видов kinds; возвращает {имя файла: байты PNG}"""
+        payload = {field: result[field] for field in PAYLOAD_FIELDS}
+        futures = [self._executor.submit(_render_job, payload, kind, index)
+                   for kind, index in self.jobs(kinds)]
+        images = {}
+        for future in futures:
+            images.update(future.result())
+        return images
+
+    def shutdown(self):
+        self._executor.shutdown()
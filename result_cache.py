@@ -0,0 +1,100 @@
+# result_cache.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def make_key(initial_equations, faks, equations, restrictions, time_value, method="odeint",
+             grid=None):
+    """
+    Ключ кэша - SHA-256 канонической JSON-записи входных данных
+    (после приведения к float в cast_to_float). Метод решения входит
+    в ключ, только если он отличается от odeint, точки C (grid) - только
+    если заданы явно, а не выбраны адаптивно
+    """
+    fields = [initial_equations, faks, equations, restrictions, time_value]
+    if method != "odeint":
+        fields.append(method)
+    if grid is not None:
+        fields.append({"C": grid})
+    payload = json.dumps(fields, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU-кэш результатов расчета: траектория и байты построенных изображений.
+    Вытеснение - по числу записей и по суммарному объему в байтах.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_size(entry):
+        return entry["result"]["data_sol"].nbytes + sum(len(b) for b in entry["images"].values())
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self.total_bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= self._entry_size(entry)
+
+    def get(self, key):
+        """Результат расчета по ключу или None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["result"]
+
+    def put(self, key, result):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= self._entry_size(old)
+            entry = {"result": result, "images": {}}
+            self._entries[key] = entry
+            self.total_bytes += self._entry_size(entry)
+            self._evict()
+
+    def get_image(self, key, name):
+        """Байты изображения name для записи key или None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return entry["images"].get(name)
+
+    def put_image(self, key, name, data):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            self.total_bytes += len(data) - len(entry["images"].get(name, b""))
+            entry["images"][name] = data
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
@@ -0,0 +1,207 @@
+# schema.py
+"""
+Разбор и проверка входных данных расчета за один проход.
+Запрос сразу превращается в массивы NumPy: начальные значения [5],
+возмущения [14 x 2], внутренние функции [12 x 3] с вектором длин и
+предельные значения [5]. Некорректный запрос отклоняется до решения
+и построения графиков (ValidationError)
+"""
+import math
+
+import numpy as np
+
+from functions import EQUATION_ARITY
+from solvers import SOLVER_METHODS
+
+INITIAL_COUNT = 5
+DISTURBANCE_COUNT = 14
+DISTURBANCE_ARITY = 2
+EQUATION_COUNT = 12
+OUTPUT_FORMATS = ("png", "json")
+MAX_GRID_POINTS = 10000
+MAX_TIME_POINTS = 1000
+
+
+class ValidationError(ValueError):
+    """Входные данные не проходят проверку; текст - для пользователя"""
+
+
+def _sequence(values, message):
+    if not isinstance(values, (list, tuple, np.ndarray)):
+        raise ValidationError(message)
+    return values
+
+
+def _floats(values, describe):
+    """
+    Плоский список -> float64. describe(i) - описание i-го значения для
+    сообщения об ошибке; ищется только если преобразование не удалось
+    """
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        for i, value in enumerate(values):
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                raise ValidationError(f"{describe(i)}: ожидается число, получено {value!r}")
+        raise
+
+
+def _in_unit_range(arr, message):
+    # NaN не проходит ни одно из сравнений, поэтому тоже отклоняется
+    bad = np.flatnonzero(~((arr >= 0.0) & (arr <= 1.0)))
+    if bad.size:
+        raise ValidationError(message.format(bad[0] + 1))
+
+
+def _finite(arr, describe):
+    bad = np.flatnonzero(~np.isfinite(arr))
+    if bad.size:
+        raise ValidationError(f"{describe(bad[0])}: ожидается конечное число")
+
+
+def _fak_coefficient(k):
+    return f"Коэффициент {k % 2 + 1} возмущения x{k // 2 + 1}"
+
+
+def parse_inputs(initial_equations, faks, equations, restrictions):
+    """
+    Проверка и приведение к массивам: те же правила, что в utils.validate_inputs.
+    У внутренней функции либо столько коэффициентов, сколько ей нужно,
+    либо ни одного (тогда используются значения по умолчанию, как f₉ с формы).
+    Возвращает словарь initial_equations [5], faks [14 x 2],
+    equations [12 x 3] (недостающие - нули), equation_lengths [12], restrictions [5]
+    """
+    _sequence(initial_equations, "Начальные значения должны быть списком")
+    if len(initial_equations) != INITIAL_COUNT:
+        raise ValidationError("Должно быть 5 начальных значений")
+    initial = _floats(initial_equations, lambda i: f"Начальное значение Cf{i + 1}")
+    _in_unit_range(initial, "Начальное значение Cf{} должно быть в диапазоне [0, 1]")
+
+    _sequence(restrictions, "Предельные значения должны быть списком")
+    if len(restrictions) != INITIAL_COUNT:
+        raise ValidationError("Должно быть 5 предельных значений")
+    limits = _floats(restrictions, lambda i: f"Предельное значение Cf{i + 1}")
+    _in_unit_range(limits, "Предельное значение Cf{} должно быть в диапазоне [0, 1]")
+
+    _sequence(faks, "Возмущения должны быть списком")
+    if len(faks) != DISTURBANCE_COUNT:
+        raise ValidationError("Должно быть 14 возмущений")
+    for i, fak in enumerate(faks):
+        if not isinstance(fak, (list, tuple, np.ndarray)) or len(fak) != DISTURBANCE_ARITY:
+            raise ValidationError(f"Возмущение x{i + 1} должно иметь 2 коэффициента (a и b)")
+    faks_arr = _floats([value for fak in faks for value in fak], _fak_coefficient)
+    _finite(faks_arr, _fak_coefficient)
+    faks_arr = faks_arr.reshape(DISTURBANCE_COUNT, DISTURBANCE_ARITY)
+
+    _sequence(equations, "Внутренние функции должны быть списком")
+    if len(equations) != EQUATION_COUNT:
+        raise ValidationError("Должно быть 12 внутренних функций")
+    lengths = np.zeros(EQUATION_COUNT, dtype=int)
+    flat = []
+    for i, eq in enumerate(equations):
+        arity = int(EQUATION_ARITY[i])
+        if not isinstance(eq, (list, tuple, np.ndarray)) or len(eq) not in (0, arity):
+            raise ValidationError(f"Функция f{i + 1} должна иметь {arity} коэффициента(ов)")
+        lengths[i] = len(eq)
+        flat.extend(eq)
+    owners = np.repeat(np.arange(EQUATION_COUNT), lengths)
+    values = _floats(flat, lambda k: f"Коэффициент функции f{owners[k] + 1}")
+    _finite(values, lambda k: f"Коэффициент функции f{owners[k] + 1}")
+    equations_arr = np.zeros((EQUATION_COUNT, EQUATION_ARITY.max()))
+    equations_arr[np.arange(EQUATION_ARITY.max()) < lengths[:, None]] = values
+
+    return {
+        "initial_equations": initial,
+        "faks": faks_arr,
+        "equations": equations_arr,
+        "equation_lengths": lengths,
+        "restrictions": limits,
+    }
+
+
+def parse_time(time_value):
+    try:
+        value = float(time_value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"Время должно быть числом, получено {time_value!r}")
+    if not math.isfinite(value):
+        raise ValidationError("Время должно быть конечным числом")
+    return value
+
+
+def parse_grid(values):
+    """Точки концентрации для solve: строго возрастающие числа из [0, 1] -> float64"""
+    _sequence(values, "Точки C должны быть списком")
+    if not 0 < len(values) <= MAX_GRID_POINTS:
+        raise ValidationError(f"Точек C должно быть от 1 до {MAX_GRID_POINTS}")
+    C = _floats(values, lambda i: f"Точка C{i + 1}")
+    _in_unit_range(C, "Точка C{} должна быть в диапазоне [0, 1]")
+    bad = np.flatnonzero(np.diff(C) <= 0)
+    if bad.size:
+        raise ValidationError(f"Точки C должны строго возрастать (C{bad[0] + 2})")
+    return C
+
+
+def parse_times(values):
+    """Сетка времени для solve_series: от 2 строго возрастающих конечных чисел -> float64"""
+    _sequence(values, "Моменты времени должны быть списком")
+    if not 2 <= len(values) <= MAX_TIME_POINTS:
+        raise ValidationError(f"Моментов времени должно быть от 2 до {MAX_TIME_POINTS}")
+    t = _floats(values, lambda i: f"Момент времени t{i + 1}")
+    _finite(t, lambda i: f"Момент времени t{i + 1}")
+    bad = np.flatnonzero(np.diff(t) <= 0)
+    if bad.size:
+        raise ValidationError(f"Моменты времени должны строго возрастать (t{bad[0] + 2})")
+    return t
+
+
+def parse_payload(data):
+    """
+    Разбор тела запроса /draw_graphics, /solve, /jobs: parse_inputs,
+    а также time_value (float), method (из solvers.SOLVER_METHODS),
+    output ("png" или "json"), C (parse_grid или None - адаптивная сетка)
+    и time_values (parse_times, для /series; иначе None)
+    """
+    if not isinstance(data, dict):
+        raise ValidationError("Тело запроса должно быть объектом JSON")
+    for name in ("initial_equations", "faks", "equations", "restrictions"):
+        if name not in data:
+            raise ValidationError(f"Не задано поле {name}")
+
+    inputs = parse_inputs(data["initial_equations"], data["faks"], data["equations"],
+                          data["restrictions"])
+    inputs["time_value"] = parse_time(data.get("time_value", "0.0"))
+
+    method = data.get("method", "odeint")
+    if method not in SOLVER_METHODS:
+        raise ValidationError(f"Неизвестный метод {method!r}, допустимы: "
+                              f"{', '.join(SOLVER_METHODS)}")
+    inputs["method"] = method
+
+    output = data.get("output", "png")
+    if output not in OUTPUT_FORMATS:
+        raise ValidationError(f"Неизвестный формат {output!r}, допустимы: png, json")
+    inputs["output"] = output
+
+    C = data.get("C")
+    inputs["C"] = None if C is None else parse_grid(C)
+
+    time_values = data.get("time_values")
+    inputs["time_values"] = None if time_values is None else parse_times(time_values)
+    return inputs
+
+
+def as_lists(inputs):
+    """
+    Списки float в формате pend (как после cast_to_float): initial_equations,
+    faks, equations (каждая функция - своей длины), restrictions
+    """
+    equations = inputs["equations"].tolist()
+    return (
+        inputs["initial_equations"].tolist(),
+        inputs["faks"].tolist(),
+        [row[:n] for row, n in zip(equations, inputs["equation_lengths"].tolist())],
+        inputs["restrictions"].tolist(),
+    )
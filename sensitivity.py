@@ -0,0 +1,261 @@
+# sensitivity.py
+import logging
+
+import numpy as np
+from scipy.integrate import solve_ivp
+
+from functions import (EQUATION_ARITY, EQUATION_DEFAULTS, CompiledPend, DisturbanceContext,
+                       pack_equations, pack_faks)
+from process_ecology import cast_to_float
+from solvers import MAX_SWITCHES
+
+logger = logging.getLogger(__name__)
+
+# Параметры, по которым считаются чувствительности: 14 пар коэффициентов
+# возмущений и все коэффициенты внутренних функций (по их числу в pend)
+SENSITIVITY_PARAMETERS = (
+    [("faks", i, j) for i in range(14) for j in range(2)]
+    + [("equations", i, j) for i in range(12) for j in range(EQUATION_ARITY[i])]
+)
+
+# Порог ступенчатой f₃: правая часть по нему кусочно-постоянна, его влияние - только скачок
+THRESHOLD_PARAMETER = SENSITIVITY_PARAMETERS.index(("equations", 2, 1))
+
+
+def parameter_names():
+    return [f"{group}[{i}][{j}]" for group, i, j in SENSITIVITY_PARAMETERS]
+
+
+class SensitivitySystem:
+    """
+    Система 5 уравнений pend, дополненная уравнениями чувствительности
+        S' = J·S + ∂f/∂θ,  S = ∂Cf/∂θ [5 x P].
+    J - аналитическая матрица Якоби CompiledPend, ∂f/∂θ - центральные
+    разности правой части по параметрам, вычисляемые одним пакетным
+    вызовом CompiledPend сразу для всех 2P возмущенных наборов.
+    Компоненты, удерживаемые на границе, имеют нулевые строки, как в pend.
+    """
+
+    def __init__(self, faks, equations, time_value=0.0, xm=None, step=1e-6):
+        xm = np.ones(5) if xm is None else np.asarray(xm, dtype=float)
+        faks_arr, faks_len = pack_faks(faks)
+        f_arr, f_len = pack_equations(equations)
+
+        # Коэффициенты, которых не хватает, заменяются значениями по умолчанию (как в pend),
+        # чтобы каждый параметр влиял на правую часть
+        f_arr = np.where((f_len >= EQUATION_ARITY)[:, None], f_arr, EQUATION_DEFAULTS)
+        f_len = np.maximum(f_len, EQUATION_ARITY)
+
+        self.rhs = CompiledPend(DisturbanceContext(faks_arr, faks_len, time_value),
+                                f_arr, f_len, xm)
+        self.n_params = len(SENSITIVITY_PARAMETERS)
+
+        # Наборы θ + step·e_k и θ - step·e_k
+        P = self.n_params
+        faks_batch = np.repeat(faks_arr[None], 2 * P, axis=0)
+        f_batch = np.repeat(f_arr[None], 2 * P, axis=0)
+        for k, (group, i, j) in enumerate(SENSITIVITY_PARAMETERS):
+            target = faks_batch if group == "faks" else f_batch
+            target[k, i, j] += step
+            target[P + k, i, j] -= step
+        self.step = step
+        self.perturbed = CompiledPend(
+            DisturbanceContext(faks_batch, np.repeat(faks_len[None], 2 * P, axis=0), time_value),
+            f_batch, np.repeat(f_len[None], 2 * P, axis=0), xm,
+        )
+
+    def parameter_derivatives(self, x, C):
+        """∂f/∂θ [5 x P] для правой части без обнуления на границах"""
+        values = self.perturbed.rate(np.broadcast_to(x, (2 * self.n_params, 5)), C)
+        derivatives = ((values[:self.n_params] - values[self.n_params:]) / (2 * self.step)).T
+        # Вне порога f₃ от него не зависит; вблизи порога разность дала бы размазанную
+        # дельта-функцию, которая повторно учла бы скачок из _jump
+        derivatives[:, THRESHOLD_PARAMETER] = 0.0
+        return derivatives
+
+    def augmented_rate(self, x, S, C, held):
+        """Производные x и S; строки удерживаемых на границе компонент нулевые"""
+        rhs = self.rhs
+        dkdt = rhs.rate(x, C)
+        dS = rhs.rate_jacobian(x, C) @ S + self.parameter_derivatives(x, C)
+        dkdt[held] = 0.0
+        dS[held] = 0.0
+        return dkdt, dS
+
+    def jacobian(self, x, C, held):
+        """
+        Блочно-диагональное приближение матрицы Якоби дополненной системы
+        (без вторых производных) - достаточно для итераций Ньютона неявных методов
+        """
+        J = self.rhs.rate_jacobian(x, C)
+        J[held] = 0.0
+        return np.kron(np.eye(1 + self.n_params), J)[self._order][:, self._order]
+
+    @property
+    def _order(self):
+        # Перестановка из порядка блоков [x, S[:, 0], S[:, 1], ...] в порядок [x, S по строкам]
+        if not hasattr(self, "_order_cache"):
+            P = self.n_params
+            rows = np.arange(5 * P).reshape(P, 5).T.ravel() + 5
+            self._order_cache = np.argsort(np.concatenate([np.arange(5), rows]))
+        return self._order_cache
+
+
+def _jump(S, f_before, f_after, g_x, g_theta):
+    """
+    Скачок чувствительностей при переключении правой части на поверхности g = 0:
+        S⁺ = S⁻ + (f⁻ - f⁺)·dτ/dθ,  dτ/dθ = -(g_x·S⁻ + g_θ) / (g_x·f⁻)
+    """
+    speed = g_x @ f_before
+    if abs(speed) < 1e-14:
+        return S
+    dtau = -(g_x @ S + g_theta) / speed
+    return S + np.outer(f_before - f_after, dtau)
+
+
+def forward_sensitivities(initial_equations, faks, equations, time_value=0.0,
+                          method="LSODA", step=1e-6, rtol=1e-8, atol=1e-10, C=None):
+    """
+    Траектория и чувствительности ∂Cf/∂θ по всем коэффициентам faks и equations
+    одним решением дополненной системы на сетке C (по умолчанию linspace(0, 1, 100);
+    другая сетка должна начинаться с 0 и возрастать).
+
+    Решение идет по участкам гладкости (solve_ivp с событиями): выход
+    на границы [eps, min(xm - eps, 1 - eps)] и их отпускание - как в
+    solvers.integrate, а также пересечение порога ступенчатой f₃. На стыках
+    чувствительности получают скачок по формуле _jump, поэтому они
+    совпадают с производными траектории, а не только правой части.
+
+    Возвращает словарь: C, data_sol [100 x 5], sensitivities [100 x 5 x P],
+    parameters (имена в порядке последней оси), nfev, events, success
+    """
+    initial_equations, faks, equations, _ = cast_to_float(
+        list(initial_equations), [list(f) for f in faks], [list(e) for e in equations], []
+    )
+    time_value = float(time_value)
+    C = np.linspace(0, 1, 100) if C is None else np.asarray(C, dtype=float)
+
+    system = SensitivitySystem(faks, equations, time_value)
+    rhs = system.rhs
+    P = system.n_params
+    lower = np.full(5, rhs.eps)
+    upper = np.broadcast_to(rhs.upper, (5,))
+    threshold = float(rhs.f3_threshold)
+
+    calls = [0]
+    x = np.array(initial_equations, dtype=float)
+    S = np.zeros((5, P))
+    d = rhs.rate(x, C[0])
+    held = np.zeros(5, dtype=bool)
+    held_side = np.zeros(5, dtype=int)
+    held_side[(x <= lower) & (d < 0)] = -1
+    held_side[(x >= upper) & (d > 0)] = 1
+    held[:] = held_side != 0
+
+    def fun(s, y):
+        calls[0] += 1
+        dkdt, dS = system.augmented_rate(y[:5], y[5:].reshape(5, P), s, held)
+        return np.concatenate([dkdt, dS.ravel()])
+
+    def jac(s, y):
+        return system.jacobian(y[:5], s, held)
+
+    def make_event(i, kind):
+        def event(s, y):
+            if kind == "lower":
+                return y[i] - lower[i] if not held[i] else 1.0
+            if kind == "upper":
+                return y[i] - upper[i] if not held[i] else -1.0
+            if not held[i]:
+                return 1.0
+            return -held_side[i] * rhs.rate(y[:5], s)[i]
+        event.terminal = True
+        event.direction = {"lower": -1, "upper": 1, "release": 1}[kind]
+        return event
+
+    def threshold_event(s, y):
+        return y[4] - threshold
+    threshold_event.terminal = True
+
+    events = [make_event(i, kind) for i in range(5) for kind in ("lower", "upper", "release")]
+    events.append(threshold_event)
+
+    result = np.empty((len(C), 5 + 5 * P))
+    result[0] = np.concatenate([x, S.ravel()])
+    switches = []
+    done = 1
+    start = C[0]
+    success, message = True, ""
+
+    while start < C[-1]:
+        if len(switches) > MAX_SWITCHES:
+            success, message = False, "Превышено число переключений"
+            break
+
+        sol = solve_ivp(fun, (start, C[-1]), np.concatenate([x, S.ravel()]), method=method,
+                        t_eval=C[done:], events=events,
+                        jac=jac if method in ("LSODA", "Radau", "BDF") else None,
+                        rtol=rtol, atol=atol)
+        k = len(sol.t)
+        if k:
+            result[done:done + k] = sol.y.T
+        done += k
+
+        if sol.status != 1:
+            success, message = bool(sol.success), sol.message
+            break
+
+        fired = [j for j, te in enumerate(sol.t_events) if len(te)]
+        start = min(sol.t_events[j][0] for j in fired)
+        j = next(j for j in fired if sol.t_events[j][0] == start)
+        y = sol.y_events[j][0]
+        x, S = y[:5].copy(), y[5:].reshape(5, P).copy()
+
+        f_before = fun(start, y)[:5]
+        if j == len(events) - 1:
+            # Пересечение порога f₃: правая часть до и после порога
+            below, above = x.copy(), x.copy()
+            below[4] = np.nextafter(threshold, -np.inf)
+            above[4] = threshold
+            f_below = np.where(held, 0.0, rhs.rate(below, start))
+            f_above = np.where(held, 0.0, rhs.rate(above, start))
+            f_before, f_after = (f_below, f_above) if f_before[4] > 0 else (f_above, f_below)
+            g_theta = np.zeros(P)
+            g_theta[THRESHOLD_PARAMETER] = -1.0
+            S = _jump(S, f_before, f_after, np.eye(5)[4], g_theta)
+            # Точка перезапуска - строго по ту сторону порога, чтобы событие не сработало повторно
+            x[4] = threshold + np.copysign(1e-12, f_before[4])
+            switches.append((float(start), 4, "f3"))
+        else:
+            i, kind = divmod(j, 3)
+            if kind < 2:
+                held_side[i] = -1 if kind == 0 else 1
+                x[i] = lower[i] if kind == 0 else upper[i]
+                f_after = f_before.copy()
+                f_after[i] = 0.0
+                S = _jump(S, f_before, f_after, np.eye(5)[i], np.zeros(P))
+            else:
+                held_side[i] = 0
+            held[:] = held_side != 0
+            switches.append((float(start), i, int(held_side[i])))
+
+        while done < len(C) and C[done] <= start:
+            result[done] = np.concatenate([x, S.ravel()])
+            done += 1
+
+    if done < len(C):
+        result[done:] = np.nan
+    if not success:
+        logger.warning(f"Чувствительности: {message}")
+
+    logger.info(f"Чувствительности по {P} параметрам: вычислений правой части {calls[0]}, "
+                f"переключений {len(switches)}")
+    return {
+        "C": C,
+        "data_sol": np.clip(result[:, :5], 0.0, 1.0),
+        "sensitivities": result[:, 5:].reshape(len(C), 5, P),
+        "parameters": parameter_names(),
+        "nfev": calls[0],
+        "events": switches,
+        "success": success,
+    }
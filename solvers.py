@@ -0,0 +1,280 @@
+# solvers.py
+import numpy as np
+from scipy.integrate import LSODA, RK45, Radau, odeint, solve_ivp
+
+
+def rk4(fun, y0, t, substeps=1):
+    """
+    Классический метод Рунге-Кутты 4-го порядка с постоянным шагом.
+    fun(y, t) - правая часть в формате odeint, y0 может иметь ведущие оси
+    пакета; между соседними точками t делается substeps шагов.
+    Возвращает массив [len(t), *y0.shape].
+    """
+    y = np.array(y0, dtype=float)
+    result = np.empty((len(t),) + y.shape)
+    result[0] = y
+
+    for i in range(len(t) - 1):
+        h = (t[i + 1] - t[i]) / substeps
+        tk = t[i]
+        for _ in range(substeps):
+            k1 = fun(y, tk)
+            k2 = fun(y + h / 2 * k1, tk + h / 2)
+            k3 = fun(y + h / 2 * k2, tk + h / 2)
+            k4 = fun(y + h * k3, tk + h)
+            y = y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+            tk = tk + h
+        result[i + 1] = y
+
+    return result
+
+
+# Доступные методы интегрирования
+SOLVER_METHODS = ("odeint", "RK45", "LSODA", "Radau", "rk4")
+IVP_METHODS = ("RK45", "LSODA", "Radau")
+IVP_SOLVERS = {"RK45": RK45, "LSODA": LSODA, "Radau": Radau}
+
+
+def _counting_solver(method, steps):
+    """Класс решателя solve_ivp, считающий принятые шаги в steps[0]"""
+    base = IVP_SOLVERS[method]
+
+    class CountingSolver(base):
+        def _step_impl(self):
+            success, message = super()._step_impl()
+            steps[0] += success
+            return success, message
+
+    return CountingSolver
+
+# Ограничение числа переключений границ на одно решение (защита от дребезга)
+MAX_SWITCHES = 500
+
+
+def integrate(fun, y0, t, method="odeint", rate=None, lower=None, upper=None,
+              jac=None, rate_jac=None, rtol=None, atol=None, substeps=1):
+    """
+    Решение системы y' = fun(y, t) в точках t выбранным методом.
+
+    fun - правая часть в формате odeint с обнулением производных на границах.
+    Для методов solve_ivp можно передать rate (та же правая часть без
+    обнуления) и границы lower, upper: тогда выход компоненты на границу
+    ловится событием, и компонента удерживается на ней, пока производная
+    не развернется внутрь. Так решатель не дробит шаг на разрыве производной.
+    jac(y, t) - матрица Якоби fun, rate_jac(y, t) - матрица Якоби rate;
+    без них неявные методы считают якобиан разностями.
+
+    Возвращает словарь: y [len(t), n], nfev и njev (число вычислений правой
+    части и якобиана), steps (число принятых шагов; для odeint после сбоя -
+    None), method, events - список (t, компонента, состояние) переключений,
+    success и message.
+    """
+    if method not in SOLVER_METHODS:
+        raise ValueError(f"Неизвестный метод: {method}. Доступны: {', '.join(SOLVER_METHODS)}")
+
+    t = np.asarray(t, dtype=float)
+    y0 = np.asarray(y0, dtype=float)
+
+    if method == "odeint":
+        kwargs = {} if rtol is None else {"rtol": rtol}
+        if atol is not None:
+            kwargs["atol"] = atol
+        # Счетчики odeint после аварийной остановки недостоверны, поэтому вызовы считаются здесь
+        calls = [0, 0]
+
+        def counted_fun(y, s):
+            calls[0] += 1
+            return fun(y, s)
+
+        def counted_jac(y, s):
+            calls[1] += 1
+            return jac(y, s)
+
+        y, info = odeint(counted_fun, y0, t, Dfun=None if jac is None else counted_jac,
+                         full_output=True, **kwargs)
+        success = info["message"] == "Integration successful."
+        return {
+            "y": y,
+            "nfev": calls[0],
+            "njev": calls[1],
+            "steps": int(info["nst"][-1]) if success else None,
+            "method": method,
+            "events": [],
+            "success": success,
+            "message": info["message"],
+        }
+
+    if method == "rk4":
+        y = rk4(fun, y0, t, substeps)
+        # Постоянный шаг не отслеживает ошибку: расходимость видна только по NaN/inf
+        success = bool(np.isfinite(y).all())
+        return {
+            "y": y,
+            "nfev": 4 * substeps * (len(t) - 1),
+            "njev": 0,
+            "steps": substeps * (len(t) - 1),
+            "method": method,
+            "events": [],
+            "success": success,
+            "message": "" if success else "Решение содержит NaN или бесконечность",
+        }
+
+    if rate is None or lower is None or upper is None:
+        ivp_jac = None if jac is None else (lambda s, y: jac(y, s))
+        steps = [0]
+        sol = solve_ivp(lambda s, y: fun(y, s), (t[0], t[-1]), y0,
+                        method=_counting_solver(method, steps),
+                        t_eval=t, jac=ivp_jac, **_tolerances(rtol, atol))
+        return {
+            "y": sol.y.T,
+            "nfev": int(sol.nfev),
+            "njev": int(sol.njev),
+            "steps": steps[0],
+            "method": method,
+            "events": [],
+            "success": bool(sol.success),
+            "message": sol.message,
+        }
+
+    return _integrate_with_events(rate, y0, t, method, np.broadcast_to(lower, y0.shape),
+                                  np.broadcast_to(upper, y0.shape), rate_jac, rtol, atol)
+
+
+# Допуски solve_ivp по умолчанию - как у odeint, чтобы методы сравнивались при равной точности
+DEFAULT_RTOL = 1.49012e-8
+DEFAULT_ATOL = 1.49012e-8
+
+
+def _tolerances(rtol, atol):
+    return {
+        "rtol": DEFAULT_RTOL if rtol is None else rtol,
+        "atol": DEFAULT_ATOL if atol is None else atol,
+    }
+
+
+def _integrate_with_events(rate, y0, t, method, lower, upper, jac, rtol, atol):
+    """
+    Гибридное интегрирование: свободные компоненты считаются по rate,
+    удерживаемые на границе (held = -1 снизу, +1 сверху) имеют нулевую
+    производную. События: выход свободной компоненты на границу и разворот
+    производной удерживаемой компоненты внутрь отрезка
+    """
+    n = len(y0)
+    held = np.zeros(n, dtype=int)
+    calls = [0]
+
+    # В nfev входят и вычисления rate в функциях событий
+    def counted_rate(x, s):
+        calls[0] += 1
+        return rate(x, s)
+
+    y = y0.copy()
+    d = counted_rate(y, t[0])
+    held[(y <= lower) & (d < 0)] = -1
+    held[(y >= upper) & (d > 0)] = 1
+
+    def rhs(s, x):
+        dx = counted_rate(x, s)
+        return np.where(held != 0, 0.0, dx)
+
+    def make_event(i, kind):
+        def event(s, x):
+            if kind == "lower":
+                return x[i] - lower[i] if held[i] == 0 else 1.0
+            if kind == "upper":
+                return x[i] - upper[i] if held[i] == 0 else -1.0
+            # Разворот производной удерживаемой компоненты
+            if held[i] == 0:
+                return 1.0
+            return -held[i] * counted_rate(x, s)[i]
+        event.terminal = True
+        event.direction = {"lower": -1, "upper": 1, "release": 1}[kind]
+        return event
+
+    events = [make_event(i, kind) for i in range(n) for kind in ("lower", "upper", "release")]
+
+    ivp_jac = None
+    if jac is not None:
+        def ivp_jac(s, x):
+            J = jac(x, s)
+            return np.where((held != 0)[:, None], 0.0, J)
+
+    result = np.empty((len(t), n))
+    result[0] = y
+    switches = []
+    steps = [0]
+    solver = _counting_solver(method, steps)
+    njev = 0
+    start = t[0]
+    done = 1
+    success, message = True, ""
+
+    while start < t[-1]:
+        if len(switches) > MAX_SWITCHES:
+            success, message = False, "Превышено число переключений границ"
+            break
+
+        sol = solve_ivp(rhs, (start, t[-1]), y, method=solver, t_eval=t[done:],
+                        events=events, jac=ivp_jac, **_tolerances(rtol, atol))
+        njev += int(sol.njev)
+        # При пустой t_eval (событие на последней точке сетки) sol.y - пустой список
+        k = len(sol.t)
+        if k:
+            result[done:done + k] = sol.y.T
+        done += k
+
+        if sol.status != 1:
+            success, message = bool(sol.success), sol.message
+            break
+
+        # Первое сработавшее событие (при одновременных - все в этой точке)
+        fired = [(j, te[0], ye[0]) for j, (te, ye) in enumerate(zip(sol.t_events, sol.y_events))
+                 if len(te)]
+        start = min(te for _, te, _ in fired)
+        # Состояние берется у первого события в этой точке один раз, все границы
+        # одновременных событий применяются к нему
+        y = next(ye for _, te, ye in fired if te == start).copy()
+        released = []
+        for j, te, _ in fired:
+            if te != start:
+                continue
+            i, kind = divmod(j, 3)
+            if kind == 0:
+                held[i] = -1
+                y[i] = lower[i]
+            elif kind == 1:
+                held[i] = 1
+                y[i] = upper[i]
+            else:
+                held[i] = 0
+                released.append(i)
+            switches.append((float(start), i, int(held[i])))
+        # Компоненты, дошедшие до границы в ту же точку, но без своего события
+        # (их корень чуть дальше start): иначе со старта за границей событие не сработает.
+        # Только что отпущенные компоненты не проверяются
+        free = held == 0
+        free[released] = False
+        d = counted_rate(y, start)
+        for i in np.flatnonzero(free & (((y <= lower) & (d < 0)) | ((y >= upper) & (d > 0)))):
+            held[i] = -1 if d[i] < 0 else 1
+            y[i] = lower[i] if d[i] < 0 else upper[i]
+            switches.append((float(start), i, int(held[i])))
+
+        # Точка сетки, совпавшая с событием, уже записана решателем
+        while done < len(t) and t[done] <= start:
+            result[done] = y
+            done += 1
+
+    if done < len(t):
+        result[done:] = np.nan
+
+    return {
+        "y": result,
+        "nfev": calls[0],
+        "njev": njev,
+        "steps": steps[0],
+        "method": method,
+        "events": switches,
+        "success": success,
+        "message": message,
+    }
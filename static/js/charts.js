@@ -0,0 +1,271 @@
+// charts.js - построение графиков в браузере по /runs/<run_id>/charts.json
+const Charts = (() => {
+    const characteristicColors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
+    const timeColors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b']
+    const concentrationColors1 = ['#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+    const concentrationColors2 = ['#ff1493', '#00ced1', '#ff7f0e', '#2ca02c']
+
+    let chartsPromise = null
+
+    // Режим вывода, выбранный на странице параметров: "png" или "client"
+    function mode() {
+        return sessionStorage.getItem("render_mode") || "png"
+    }
+
+    function load(runId) {
+        if (!chartsPromise) {
+            chartsPromise = fetch(`/runs/${runId}/charts.json`).then(response => {
+                if (!response.ok) throw new Error("charts.json: " + response.status)
+                return response.json()
+            })
+        }
+        return chartsPromise
+    }
+
+    // Холст вместо изображения; размер в CSS-пикселях, с учетом плотности экрана
+    function replaceImage(img, width, height) {
+        const canvas = document.createElement("canvas")
+        canvas.id = img.id
+        canvas.className = img.className
+        const ratio = window.devicePixelRatio || 1
+        canvas.width = width * ratio
+        canvas.height = height * ratio
+        canvas.style.width = "100%"
+        canvas.style.maxWidth = width + "px"
+        canvas.style.display = "block"
+        canvas.getContext("2d").scale(ratio, ratio)
+        canvas.logicalWidth = width
+        canvas.logicalHeight = height
+        img.replaceWith(canvas)
+        return canvas
+    }
+
+    // series: [{values, color, label, dash}], x - общая ось абсцисс, y в [0, 1]
+    function lineChart(canvas, x, series, options) {
+        const ctx = canvas.getContext("2d")
+        const width = canvas.logicalWidth
+        const height = canvas.logicalHeight
+        const margin = {left: 70, right: 20, top: 40, bottom: 55}
+        const plotWidth = width - margin.left - margin.right
+        const plotHeight = height - margin.top - margin.bottom
+        const px = value => margin.left + value * plotWidth
+        const py = value => margin.top + (1 - value) * plotHeight
+
+        ctx.fillStyle = "white"
+        ctx.fillRect(0, 0, width, height)
+
+        ctx.strokeStyle = "rgba(0, 0, 0, 0.15)"
+        ctx.fillStyle = "#333"
+        ctx.font = "12px sans-serif"
+        ctx.setLineDash([4, 4])
+        for (let i = 0; i <= 5; i++) {
+            const tick = i / 5
+            ctx.beginPath()
+            ctx.moveTo(px(0), py(tick))
+            ctx.lineTo(px(1), py(tick))
+            ctx.moveTo(px(tick), py(0))
+            ctx.lineTo(px(tick), py(1))
+            ctx.stroke()
+            ctx.textAlign = "right"
+            ctx.textBaseline = "middle"
+            ctx.fillText(tick.toFixed(1), px(0) - 6, py(tick))
+            ctx.textAlign = "center"
+            ctx.textBaseline = "top"
+            ctx.fillText(tick.toFixed(1), px(tick), py(0) + 6)
+        }
+        ctx.setLineDash([])
+        ctx.strokeStyle = "#333"
+        ctx.strokeRect(px(0), py(1), plotWidth, plotHeight)
+
+        for (const s of series) {
+            ctx.strokeStyle = s.color
+            ctx.lineWidth = 2.5
+            ctx.setLineDash(s.dash || [])
+            ctx.beginPath()
+            s.values.forEach((value, i) => {
+                const v = Math.min(Math.max(value, 0), 1)
+                if (i === 0) ctx.moveTo(px(x[i]), py(v))
+                else ctx.lineTo(px(x[i]), py(v))
+            })
+            ctx.stroke()
+        }
+        ctx.setLineDash([])
+        ctx.lineWidth = 1
+
+        ctx.fillStyle = "#000"
+        ctx.font = "bold 15px sans-serif"
+        ctx.textAlign = "center"
+        ctx.textBaseline = "top"
+        ctx.fillText(options.title || "", width / 2, 10)
+        ctx.font = "bold 13px sans-serif"
+        ctx.textBaseline = "bottom"
+        ctx.fillText(options.xlabel || "", px(0.5), height - 6)
+        ctx.save()
+        ctx.translate(16, py(0.5))
+        ctx.rotate(-Math.PI / 2)
+        ctx.textBaseline = "middle"
+        ctx.fillText(options.ylabel || "", 0, 0)
+        ctx.restore()
+
+        legend(ctx, series, options.legend === "left" ? px(0) + 10 : px(1) - 10, py(1) + 10,
+               options.legend === "left" ? "left" : "right")
+    }
+
+    function legend(ctx, series, x, y, align) {
+        ctx.font = "12px sans-serif"
+        const widths = series.map(s => ctx.measureText(s.label).width)
+        const boxWidth = Math.max(...widths, 0) + 40
+        const boxHeight = series.length * 18 + 8
+        const left = align === "left" ? x : x - boxWidth
+
+        ctx.fillStyle = "rgba(255, 255, 255, 0.9)"
+        ctx.strokeStyle = "gray"
+        ctx.fillRect(left, y, boxWidth, boxHeight)
+        ctx.strokeRect(left, y, boxWidth, boxHeight)
+        ctx.textAlign = "left"
+        ctx.textBaseline = "middle"
+        series.forEach((s, i) => {
+            const rowY = y + 13 + i * 18
+            ctx.strokeStyle = s.color
+            ctx.lineWidth = 2
+            ctx.setLineDash(s.dash || [])
+            ctx.beginPath()
+            ctx.moveTo(left + 6, rowY)
+            ctx.lineTo(left + 30, rowY)
+            ctx.stroke()
+            ctx.setLineDash([])
+            ctx.lineWidth = 1
+            ctx.fillStyle = "#000"
+            ctx.fillText(s.label, left + 35, rowY)
+        })
+    }
+
+    function drawCharacteristics(canvas, charts) {
+        lineChart(canvas, charts.C, charts.characteristics.map((s, i) => ({
+            values: s.values,
+            color: characteristicColors[i],
+            label: s.label,
+        })), {
+            title: "График характеристик от концентрации загрязняющих веществ",
+            xlabel: "C, концентрация загрязняющих веществ",
+            ylabel: "Значения характеристик",
+            legend: "left",
+        })
+    }
+
+    function drawDisturbances(canvases, charts) {
+        const concentration = charts.concentration_disturbances
+        const index = name => parseInt(name.slice(1), 10)
+
+        lineChart(canvases[0], [0, 1], charts.time_disturbances.map(s => ({
+            values: [s.value, s.value],
+            color: timeColors[index(s.name) - 1],
+            label: `${s.name}(t) = a·t + b`,
+        })), {
+            title: `Возмущения, зависящие от времени (t = ${Number(charts.time_value).toFixed(2)})`,
+            ylabel: "Значение возмущения",
+        })
+
+        lineChart(canvases[1], charts.C, concentration.filter(s => index(s.name) <= 10).map(s => ({
+            values: s.values,
+            color: concentrationColors1[index(s.name) - 7],
+            label: `${s.name}(C) = a·C + b`,
+        })), {
+            title: "Возмущения, зависящие от концентрации (x₇-x₁₀)",
+            ylabel: "Значение возмущения",
+        })
+
+        lineChart(canvases[2], charts.C, concentration.filter(s => index(s.name) > 10).map(s => ({
+            values: s.values,
+            color: concentrationColors2[index(s.name) - 11],
+            label: `${s.name}(C) = a·C + b`,
+        })), {
+            title: "Возмущения, зависящие от концентрации (x₁₁-x₁₄)",
+            xlabel: "C, концентрация загрязняющих веществ",
+            ylabel: "Значение возмущения",
+        })
+    }
+
+    // Лепестковая диаграмма: ось Cf1 направлена вверх, далее против часовой стрелки
+    function drawRadar(canvas, radar, panel) {
+        const ctx = canvas.getContext("2d")
+        const width = canvas.logicalWidth
+        const height = canvas.logicalHeight
+        const n = radar.labels.length
+        const cx = width / 2
+        const cy = height / 2 + 20
+        const radius = Math.min(width, height) / 2 - 60
+        const limit = Math.max(1, ...radar.restrictions, ...radar.initial, ...panel.values) * 1.1
+        const point = (i, value) => {
+            const angle = Math.PI / 2 + 2 * Math.PI * i / n
+            return [cx + Math.cos(angle) * radius * value / limit,
+                    cy - Math.sin(angle) * radius * value / limit]
+        }
+        const polygon = (values, color, dash) => {
+            ctx.strokeStyle = color
+            ctx.lineWidth = 2
+            ctx.setLineDash(dash || [])
+            ctx.beginPath()
+            values.forEach((value, i) => {
+                const [x, y] = point(i, value)
+                if (i === 0) ctx.moveTo(x, y)
+                else ctx.lineTo(x, y)
+            })
+            ctx.closePath()
+            ctx.stroke()
+            ctx.setLineDash([])
+            ctx.lineWidth = 1
+        }
+
+        ctx.fillStyle = "white"
+        ctx.fillRect(0, 0, width, height)
+
+        ctx.strokeStyle = "rgba(0, 0, 0, 0.15)"
+        ctx.fillStyle = "#333"
+        ctx.font = "11px sans-serif"
+        ctx.textAlign = "left"
+        ctx.textBaseline = "middle"
+        for (let tick = 0.2; tick < limit; tick += 0.2) {
+            ctx.beginPath()
+            ctx.arc(cx, cy, radius * tick / limit, 0, 2 * Math.PI)
+            ctx.stroke()
+            ctx.fillText(tick.toFixed(1), cx + 3, cy - radius * tick / limit)
+        }
+        polygon(new Array(n).fill(limit), "#000")
+        ctx.textAlign = "center"
+        ctx.font = "13px sans-serif"
+        radar.labels.forEach((label, i) => {
+            ctx.strokeStyle = "rgba(0, 0, 0, 0.15)"
+            ctx.beginPath()
+            ctx.moveTo(cx, cy)
+            ctx.lineTo(...point(i, limit))
+            ctx.stroke()
+            ctx.fillStyle = "#000"
+            ctx.fillText(label, ...point(i, limit * 1.12))
+        })
+
+        const series = [
+            {values: radar.restrictions, color: "green", dash: [6, 4], label: "Предельные значения"},
+            {values: radar.initial, color: "red", label: "Начальные условия"},
+        ]
+        if (panel.show_current) {
+            series.push({values: panel.values, color: "blue", label: "Текущие характеристики"})
+        }
+        series.forEach(s => polygon(s.values, s.color, s.dash))
+
+        ctx.fillStyle = "green"
+        ctx.font = "10px sans-serif"
+        radar.restrictions.forEach((value, i) => {
+            const [x, y] = point(i, value * 1.02)
+            ctx.fillText(value.toFixed(2), x, y - 6)
+        })
+
+        ctx.fillStyle = "#000"
+        ctx.font = "bold 14px sans-serif"
+        ctx.textBaseline = "top"
+        ctx.fillText(panel.title, width / 2, 8)
+        legend(ctx, series, width - 8, 30, "right")
+    }
+
+    return {mode, load, replaceImage, drawCharacteristics, drawDisturbances, drawRadar}
+})()
@@ -1,7 +1,6 @@
-const status = sessionStorage.getItem("status")
 const grid = document.querySelector('#diagrams-grid')
 
-if (status !== "Выполнено") {
+function showUnavailable() {
     grid.innerHTML = `
         <div class="no-data-message">
             <h3>Диаграммы не доступны</h3>
@@ -9,23 +8,64 @@ if (status !== "Выполнено") {
             <a href="/" class="btn-back">Вернуться к параметрам</a>
         </div>
     `
-} else {
+}
+
+function show(runId) {
     const diagrams = ['diagram1', 'diagram2', 'diagram3', 'diagram4', 'diagram5']
-    
-    diagrams.forEach((id, index) => {
-        const img = document.getElementById(id)
-        if (img) {
-            img.onerror = function() {
-                const container = this.parentElement
-                container.innerHTML = `
-                    <div style="color: #dc3545; padding: 20px;">
-                        <p>Диаграмма не сгенерирована</p>
-                    </div>
-                `
+
+    // Отдельные изображения - если общий спрайт diagrams.png не загрузился
+    function loadSeparate() {
+        diagrams.forEach((id, index) => {
+            const img = document.getElementById(id)
+            if (img) {
+                img.onerror = function() {
+                    const container = this.parentElement
+                    container.innerHTML = `
+                        <div style="color: #dc3545; padding: 20px;">
+                            <p>Диаграмма не сгенерирована</p>
+                        </div>
+                    `
+                }
+
+                img.src = `/runs/${runId}/${img.dataset.artifact}`
             }
-            
-          
-            img.src = img.src.split('?')[0] + '?t=' + new Date().getTime()
-        }
-    })
-}
\ No newline at end of file
+        })
+    }
+
+    // Все пять диаграмм одним запросом: панель index занимает 1/5 ширины спрайта
+    const spriteUrl = `/runs/${runId}/diagrams.png`
+    const sprite = new Image()
+    sprite.onload = function() {
+        diagrams.forEach((id, index) => {
+            const img = document.getElementById(id)
+            if (img) {
+                const panel = document.createElement("div")
+                panel.className = "diagram-img diagram-panel"
+                panel.id = id
+                panel.style.backgroundImage = `url(${spriteUrl})`
+                panel.style.backgroundPosition = `${index * 25}% 0`
+                img.replaceWith(panel)
+            }
+        })
+    }
+    sprite.onerror = loadSeparate
+
+    if (Charts.mode() === "client") {
+        Charts.load(runId).then(charts => {
+            diagrams.forEach((id, index) => {
+                const img = document.getElementById(id)
+                if (img) {
+                    Charts.drawRadar(Charts.replaceImage(img, 520, 560), charts.radar,
+                                     charts.radar.panels[index])
+                }
+            })
+        }).catch(() => {
+            sprite.src = spriteUrl
+        })
+    } else {
+        sprite.src = spriteUrl
+    }
+}
+
+// Если расчет еще в очереди, Jobs.runId дождется его завершения
+Jobs.runId().then(show).catch(showUnavailable)
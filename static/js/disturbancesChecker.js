@@ -1,8 +1,7 @@
-const status = sessionStorage.getItem("status")
 const element = document.getElementById("disturbances-image")
 const container = document.getElementById("disturbances-container")
 
-if (status !== "Выполнено") {
+function showUnavailable() {
     container.innerHTML = `
         <div class="no-data-message">
             <h3>График возмущений не доступен</h3>
@@ -10,8 +9,9 @@ if (status !== "Выполнено") {
             <a href="/" class="btn-back">Вернуться к параметрам</a>
         </div>
     `
-} else {
-  
+}
+
+function show(runId) {
     element.onload = function() {
         element.style.display = "block"
     }
@@ -26,5 +26,26 @@ if (status !== "Выполнено") {
         `
     }
 
-    element.src = element.src.split('?')[0] + '?t=' + new Date().getTime()
-}
\ No newline at end of file
+    const loadImage = () => {
+        element.src = `/runs/${runId}/${element.dataset.artifact}`
+    }
+
+    if (Charts.mode() === "client") {
+        Charts.load(runId).then(charts => {
+            // Три графика друг под другом, как на PNG
+            const canvases = [Charts.replaceImage(element, 1000, 380)]
+            for (let i = 0; i < 2; i++) {
+                const placeholder = document.createElement("img")
+                placeholder.className = canvases[0].className
+                canvases[canvases.length - 1].after(placeholder)
+                canvases.push(Charts.replaceImage(placeholder, 1000, 380))
+            }
+            Charts.drawDisturbances(canvases, charts)
+        }).catch(loadImage)
+    } else {
+        loadImage()
+    }
+}
+
+// Если расчет еще в очереди, Jobs.runId дождется его завершения
+Jobs.runId().then(show).catch(showUnavailable)
@@ -1,8 +1,7 @@
-const status = sessionStorage.getItem("status")
 const element = document.getElementById("graphic-image")
 const container = document.getElementById("graphic-container")
 
-if (status !== "Выполнено") {
+function showUnavailable() {
     container.innerHTML = `
         <div class="no-data-message">
             <h3>График потерь не доступен</h3>
@@ -10,8 +9,9 @@ if (status !== "Выполнено") {
             <a href="/" class="btn-back">Вернуться к параметрам</a>
         </div>
     `
-} else {
+}
 
+function show(runId) {
     element.onload = function() {
         element.style.display = "block"
     }
@@ -26,6 +26,18 @@ if (status !== "Выполнено") {
         `
     }
     
+    const loadImage = () => {
+        element.src = `/runs/${runId}/${element.dataset.artifact}`
+    }
+
+    if (Charts.mode() === "client") {
+        Charts.load(runId).then(charts => {
+            Charts.drawCharacteristics(Charts.replaceImage(element, 1200, 600), charts)
+        }).catch(loadImage)
+    } else {
+        loadImage()
+    }
+}
 
-    element.src = element.src.split('?')[0] + '?t=' + new Date().getTime()
-}
\ No newline at end of file
+// Если расчет еще в очереди, Jobs.runId дождется его завершения
+Jobs.runId().then(show).catch(showUnavailable)
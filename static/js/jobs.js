@@ -0,0 +1,60 @@
+// jobs.js - расчеты через очередь задач: POST /jobs и опрос GET /jobs/<job_id>
+const Jobs = (() => {
+    const pollInterval = 500
+
+    const delay = ms => new Promise(resolve => setTimeout(resolve, ms))
+
+    // Ответ {job_id, status} (202) или ошибка; при 429 - error.busy = true
+    async function submit(payload) {
+        const response = await fetch('/jobs', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(payload)
+        })
+        const result = await response.json()
+        if (!response.ok) {
+            const error = new Error(result.error || result.status)
+            error.busy = response.status === 429
+            throw error
+        }
+        return result
+    }
+
+    // Ожидание завершения задачи; onStatus вызывается при каждом опросе
+    async function wait(jobId, onStatus) {
+        while (true) {
+            const response = await fetch(`/jobs/${jobId}`)
+            if (!response.ok) throw new Error("Задача не найдена")
+            const job = await response.json()
+            if (onStatus) onStatus(job)
+            if (job.status === "done") return job
+            if (job.status === "failed") throw new Error(job.error || "Ошибка")
+            await delay(pollInterval)
+        }
+    }
+
+    // run_id последнего расчета; если его задача еще выполняется - после ее завершения
+    async function runId(onStatus) {
+        const jobId = sessionStorage.getItem("job_id")
+        if (jobId) {
+            try {
+                const job = await wait(jobId, onStatus)
+                sessionStorage.setItem("status", "Выполнено")
+                sessionStorage.setItem("run_id", job.result.run_id)
+                return job.result.run_id
+            } catch (error) {
+                sessionStorage.setItem("status", "Ошибка")
+                sessionStorage.removeItem("run_id")
+                throw error
+            } finally {
+                sessionStorage.removeItem("job_id")
+            }
+        }
+
+        const runId = sessionStorage.getItem("run_id")
+        if (sessionStorage.getItem("status") === "Выполнено" && runId) return runId
+        throw new Error("Нет данных расчета")
+    }
+
+    return {submit, wait, runId}
+})()
@@ -2,6 +2,14 @@
 const input = document.getElementById("status-input")
 input.value = sessionStorage.getItem("status") || ""
 
+// Расчет, отправленный до перезагрузки страницы, может еще выполняться
+if (sessionStorage.getItem("job_id")) {
+    input.value = "Расчет выполняется..."
+    Jobs.runId()
+        .then(() => { input.value = "Выполнено" })
+        .catch(error => { input.value = "Ошибка: " + error.message })
+}
+
 
 function randomInRange() {
     let value
@@ -437,6 +445,9 @@ async function process() {
     if (!isValid) return
 
     sessionStorage.setItem("time-value", timeValue)
+
+    const renderMode = document.getElementById("render-mode")?.value || "png"
+    sessionStorage.setItem("render_mode", renderMode)
     
     for (let i=1; i<15; i++) {
         for (let j=1; j<=2; j++) {
@@ -470,38 +481,38 @@ async function process() {
     }
 
     try {
-        const response = await fetch('/draw_graphics', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                "faks": faks,
-                "initial_equations": init_eq,
-                "restrictions": restrictions,
-                "equations": equations,
-                "time_value": timeValue
-            })
+        const job = await Jobs.submit({
+            "faks": faks,
+            "initial_equations": init_eq,
+            "restrictions": restrictions,
+            "equations": equations,
+            "time_value": timeValue,
+            "output": renderMode === "client" ? "json" : "png"
         })
 
-        const result = await response.json()
-        input.value = result.status + " (t=" + timeValue + ")"
-        sessionStorage.setItem("status", result.status)
-        
-        setTimeout(() => {
-            window.location.reload()
-        }, 1000)
+        // Страницы результатов дождутся задачи сами (Jobs.runId)
+        sessionStorage.setItem("job_id", job.job_id)
+        sessionStorage.setItem("status", "В очереди")
+        sessionStorage.removeItem("run_id")
+        input.value = "Расчет выполняется... (t=" + timeValue + ")"
+
+        await Jobs.runId()
+        input.value = "Выполнено (t=" + timeValue + ")"
     } catch (error) {
-        input.value = "Ошибка соединения"
+        input.value = error.busy ? "Сервер занят, повторите позже" : "Ошибка: " + error.message
         console.error("Error:", error)
     }
 }
 
-
 const timeInput = document.getElementById("time-value")
 if (timeInput) {
     const savedTime = sessionStorage.getItem("time-value")
     if (savedTime) {
         timeInput.value = savedTime
     }
+}
+
+const renderModeInput = document.getElementById("render-mode")
+if (renderModeInput) {
+    renderModeInput.value = sessionStorage.getItem("render_mode") || "png"
 }
\ No newline at end of file
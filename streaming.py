@@ -0,0 +1,130 @@
+# streaming.py
+"""
+Потоковая выдача результатов длинных расчетов: каждое завершенное решение -
+отдельное событие NDJSON (строка JSON) или Server-Sent Events.
+События строятся генераторами поверх process_ecology.iter_series и
+sweep.evaluate и сразу отдаются клиенту, поэтому память сервера не растет
+с размером задачи
+"""
+import json
+import logging
+import math
+import os
+
+import numpy as np
+
+import metrics
+from functions import calculate_total_loss
+from process_ecology import iter_series
+from schema import ValidationError, as_lists
+from solvers import SOLVER_METHODS
+from sweep import evaluate, parse_parameter
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "application/x-ndjson"
+SSE = "text/event-stream"
+
+MAX_SWEEP_SAMPLES = 100000
+
+# Число процессов перебора (1 - в процессе сервера)
+STREAM_WORKERS = int(os.environ.get('ECOLOGY_STREAM_WORKERS', 1))
+
+
+def _finite_list(values):
+    """Список float; NaN (сбой решателя) -> None, чтобы JSON оставался корректным"""
+    return [None if math.isnan(v) else v for v in np.asarray(values, dtype=float).tolist()]
+
+
+def _result(id_, final_values, **fields):
+    final = _finite_list(final_values)
+    total = None if None in final else calculate_total_loss(final)
+    return dict(fields, event="result", id=id_, final_values=final, total_loss=total)
+
+
+def series_events(inputs):
+    """
+    События по сетке времени inputs["time_values"] (schema.parse_payload):
+    id - номер момента, time_value, final_values (Cf при C = 1), total_loss
+    """
+    failed = 0
+    for k, t, data, success in iter_series(*as_lists(inputs), inputs["time_values"],
+                                           inputs["method"]):
+        failed += not success
+        yield _result(k, data[-1] if success else np.full(5, np.nan), time_value=t)
+    yield {"event": "done", "count": len(inputs["time_values"]), "failed": failed}
+
+
+def parse_sweep(data):
+    """
+    Параметры перебора из тела запроса: parameters (например, "faks[3][0]")
+    и samples [n x k] - значения параметров. Возвращает (params, samples, method);
+    method - метод solve или "batch" (sweep.evaluate)
+    """
+    params = data.get("parameters")
+    if not isinstance(params, list) or not params:
+        raise ValidationError("Не заданы параметры перебора (parameters)")
+    try:
+        params = [parse_parameter(p) for p in params]
+    except (TypeError, ValueError) as e:
+        raise ValidationError(str(e))
+
+    try:
+        samples = np.array(data.get("samples"), dtype=float)
+    except (TypeError, ValueError):
+        raise ValidationError("Значения параметров (samples) должны быть числами")
+    if samples.ndim != 2 or samples.shape[1] != len(params) or not len(samples):
+        raise ValidationError(f"samples - таблица из строк по {len(params)} значений")
+    if len(samples) > MAX_SWEEP_SAMPLES:
+        raise ValidationError(f"Наборов должно быть не больше {MAX_SWEEP_SAMPLES}")
+    if not np.isfinite(samples).all():
+        raise ValidationError("Значения параметров должны быть конечными числами")
+
+    method = data.get("method", "odeint")
+    if method not in SOLVER_METHODS + ("batch",):
+        raise ValidationError(f"Неизвестный метод {method!r}")
+    return params, samples, method
+
+
+def sweep_events(inputs, params, samples, method, workers=None):
+    """
+    События перебора: id - номер строки samples, values - значения параметров,
+    final_values (Cf при C = 1), total_loss; порядок - по готовности
+    """
+    initial_equations, faks, equations, _ = as_lists(inputs)
+    base = {"initial_equations": initial_equations, "faks": faks, "equations": equations,
+            "time_value": inputs["time_value"]}
+    failed = 0
+    parts = evaluate(base, params, samples, method, workers or STREAM_WORKERS)
+    try:
+        for part in parts:
+            for index, values, final in zip(part["index"], part["values"], part["final_values"]):
+                failed += bool(np.isnan(final).any())
+                yield _result(int(index), final, values=values.tolist())
+    finally:
+        # При отключении клиента перебор останавливается сразу (неначатые части отменяются)
+        parts.close()
+    yield {"event": "done", "count": len(samples), "failed": failed}
+
+
+def guarded(events, endpoint):
+    """События с перехватом ошибки: поток завершается событием error, а не обрывом"""
+    try:
+        yield from events
+    except Exception as e:
+        logger.exception(f"Error in {endpoint}: {e}")
+        metrics.ERRORS.inc(endpoint=endpoint, error=type(e).__name__)
+        yield {"event": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+def format_ndjson(events):
+    for event in events:
+        yield json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def format_sse(events):
+    for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+FORMATS = {NDJSON: format_ndjson, SSE: format_sse}
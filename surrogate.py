@@ -0,0 +1,334 @@
+# surrogate.py
+"""
+Суррогатная модель: значения Cf1-Cf5 на срезах лепестковых диаграмм без решения системы.
+
+Модель строится заранее по решениям на случайных наборах параметров:
+    python surrogate.py --samples 20000 --output surrogate.npz
+Это ансамбль небольших нейросетей (два скрытых слоя tanh), обученных
+на одних данных с разной инициализацией. Прогноз - среднее по ансамблю,
+оценка ошибки - разброс прогнозов, умноженный на коэффициент, подобранный
+на отложенной выборке (так, чтобы 95% ошибок были не больше оценки).
+Наборы вне области обучения суррогат не оценивает - для них нужен решатель
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from functions import (CompiledPend, DisturbanceContext, EQUATION_ARITY, EQUATION_DEFAULTS,
+                       LINEAR_FUNCS)
+from grid import DIAGRAM_C
+from solvers import integrate
+
+logger = logging.getLogger(__name__)
+
+# Срезы траектории, как в process_ecology.diagram_panels
+SLICE_C = DIAGRAM_C
+
+# Допуск оценки ошибки по умолчанию (наибольшее отклонение Cf на срезах)
+DEFAULT_TOLERANCE = 0.05
+# Доля ошибок отложенной выборки, не превышающих оценку
+COVERAGE = 0.95
+# Запас границ области обучения (доля диапазона признака)
+BOX_MARGIN = 0.02
+
+XM = np.ones(5)
+
+
+def features(initial_equations, faks, equations, equation_lengths, time_value):
+    """
+    Признаки модели [N x 53] по пакету наборов: начальные Cf [5], возмущения x1-x6
+    в момент time_value [6], нормированные коэффициенты x7-x14 [16] и линейных
+    функций f₂, f₄, f₅, f₈, f₁₀, f₁₂ [12] (модель от масштаба (a, b) не зависит),
+    коэффициенты f₁ [2], f₃ [3], f₆, f₇ [4], f₁₁ [3], f₉ [2].
+    Недостающие коэффициенты функций - значения по умолчанию, как в pend
+    """
+    initial_equations = np.asarray(initial_equations, dtype=float)
+    faks = np.asarray(faks, dtype=float)
+    context = DisturbanceContext(faks, np.full(faks.shape[:-1], 2), time_value)
+    params = np.where((np.asarray(equation_lengths) >= EQUATION_ARITY)[..., None],
+                      equations, EQUATION_DEFAULTS)
+
+    a = params[:, LINEAR_FUNCS, 0]
+    b = params[:, LINEAR_FUNCS, 1]
+    denominator = np.abs(a) + np.abs(b)
+    degenerate = denominator <= 0
+    denominator = np.where(degenerate, 1.0, denominator)
+
+    return np.hstack([
+        initial_equations,
+        context.time_values,
+        context.slope[:, 6:],
+        context.intercept[:, 6:],
+        np.where(degenerate, 0.0, a / denominator),
+        np.where(degenerate, 0.5, b / denominator),
+        params[:, 0, :2],
+        params[:, 2, :],
+        params[:, 5, :2],
+        params[:, 6, :2],
+        params[:, 10, :],
+        params[:, 8, :2],
+    ])
+
+
+def sample_inputs(n, rng):
+    """
+    Случайные наборы из области обучения: как "Заполнить случайно" на форме
+    (коэффициенты в (0, 1), пороги f₃ по возрастанию), но b дробных функций
+    и c f₁₁ - до значений по умолчанию и чуть дальше, f₉ - вокруг (10, 5).
+    Возвращает initial_equations [n x 5], faks [n x 14 x 2],
+    equations [n x 12 x 3], time_value [n]
+    """
+    initial_equations = rng.uniform(0.01, 0.99, (n, 5))
+    faks = rng.uniform(0.0, 1.0, (n, 14, 2))
+
+    equations = np.zeros((n, 12, 3))
+    equations[:, :, :2] = rng.uniform(0.0, 1.0, (n, 12, 2))
+    equations[:, 2] = np.sort(rng.uniform(0.0, 1.0, (n, 3)), axis=1)
+    for i in (5, 6, 10):
+        wide = rng.random(n) < 0.5
+        equations[:, i, 1] = np.where(wide, rng.uniform(1.0, 15.0, n), equations[:, i, 1])
+    equations[:, 10, 2] = rng.uniform(0.0, 2.5, n)
+    equations[:, 8, 0] = rng.uniform(0.0, 12.0, n)
+    equations[:, 8, 1] = rng.uniform(0.0, 6.0, n)
+
+    time_value = rng.uniform(0.0, 1.0, n)
+    return initial_equations, faks, equations, time_value
+
+
+def _solve_chunk(initial_equations, faks, equations, time_value, method):
+    """Срезы [n x 5 x 5] по решениям решателем; NaN - сбой решателя"""
+    slices = np.full((len(initial_equations), len(SLICE_C), 5), np.nan)
+    for k in range(len(initial_equations)):
+        context = DisturbanceContext(faks[k], np.full(14, 2), time_value[k])
+        rhs = CompiledPend(context, equations[k], EQUATION_ARITY, XM)
+        solution = integrate(rhs, initial_equations[k], SLICE_C, method=method,
+                             rate=rhs.rate, lower=rhs.eps, upper=rhs.upper,
+                             jac=rhs.jacobian, rate_jac=rhs.rate_jacobian)
+        if solution["success"]:
+            slices[k] = np.clip(solution["y"], 0.0, 1.0)
+    return slices
+
+
+def solve_samples(initial_equations, faks, equations, time_value, method="LSODA",
+                  workers=None, chunk_size=256):
+    """Срезы для выборки sample_inputs; workers - число процессов (1 - в текущем)"""
+    workers = workers or os.cpu_count() or 1
+    chunks = [slice(start, start + chunk_size)
+              for start in range(0, len(initial_equations), chunk_size)]
+    args = [(initial_equations[c], faks[c], equations[c], time_value[c], method) for c in chunks]
+    if workers == 1:
+        return np.concatenate([_solve_chunk(*a) for a in args])
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        return np.concatenate(list(executor.map(_solve_chunk, *zip(*args))))
+
+
+def train_network(Z, Y, hidden=128, epochs=300, batch_size=128, learning_rate=2e-3, seed=0):
+    """
+    Обучение сети Z -> Y (два скрытых слоя tanh, линейный выход) методом Adam
+    с косинусным снижением шага по среднеквадратичной ошибке.
+    Возвращает список весов [W1, W2, W3, b1, b2, b3]
+    """
+    rng = np.random.default_rng(seed)
+    sizes = [Z.shape[1], hidden, hidden, Y.shape[1]]
+    weights = [rng.normal(0.0, 1.0 / np.sqrt(n_in), (n_in, n_out))
+               for n_in, n_out in zip(sizes[:-1], sizes[1:])]
+    params = weights + [np.zeros(n_out) for n_out in sizes[1:]]
+    moment = [np.zeros_like(p) for p in params]
+    velocity = [np.zeros_like(p) for p in params]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+    step = 0
+    for epoch in range(epochs):
+        rate = learning_rate * 0.5 * (1 + np.cos(np.pi * epoch / epochs))
+        order = rng.permutation(len(Z))
+        for start in range(0, len(Z), batch_size):
+            batch = order[start:start + batch_size]
+            layers = [Z[batch]]
+            for W, b in zip(params[:2], params[3:5]):
+                layers.append(np.tanh(layers[-1] @ W + b))
+            grad = 2 * (layers[-1] @ params[2] + params[5] - Y[batch]) / len(batch)
+
+            grads = [None] * 6
+            for k in (2, 1, 0):
+                grads[k] = layers[k].T @ grad
+                grads[k + 3] = grad.sum(axis=0)
+                if k:
+                    grad = (grad @ params[k].T) * (1 - layers[k] ** 2)
+
+            step += 1
+            for p, g, m, v in zip(params, grads, moment, velocity):
+                m *= beta1
+                m += (1 - beta1) * g
+                v *= beta2
+                v += (1 - beta2) * g * g
+                p -= rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+    return params
+
+
+class Surrogate:
+    """
+    Ансамбль сетей: W1 [M x 53 x H], W2 [M x H x H], W3 [M x H x 20], b1-b3.
+    mean, scale - нормировка признаков; lower, upper - их границы в обучающей выборке;
+    kappa - множитель разброса ансамбля в оценке ошибки
+    """
+
+    FIELDS = ("mean", "scale", "lower", "upper", "w1", "w2", "w3", "b1", "b2", "b3", "kappa")
+
+    def __init__(self, mean, scale, lower, upper, w1, w2, w3, b1, b2, b3, kappa, info=None):
+        self.mean = mean
+        self.scale = scale
+        self.lower = lower
+        self.upper = upper
+        self.w1, self.w2, self.w3 = w1, w2, w3
+        self.b1, self.b2, self.b3 = b1[:, None], b2[:, None], b3[:, None]
+        self.kappa = float(kappa)
+        self.info = info or {}
+
+    def _ensemble(self, X):
+        """Прогнозы всех сетей [M x N x 20] по признакам X [N x 53]"""
+        h = np.tanh(np.matmul((X - self.mean) / self.scale, self.w1) + self.b1)
+        h = np.tanh(np.matmul(h, self.w2) + self.b2)
+        return np.matmul(h, self.w3) + self.b3
+
+    def predict_batch(self, initial_equations, faks, equations, equation_lengths, time_value):
+        """
+        Прогноз для пакета наборов: срезы [N x 5 x 5] (первый - начальные значения),
+        оценка наибольшей ошибки [N] и признак inside [N] - набор в области обучения
+        """
+        X = features(initial_equations, faks, equations, equation_lengths, time_value)
+        predictions = self._ensemble(X)
+        slices = np.empty((len(X), len(SLICE_C), 5))
+        slices[:, 0] = X[:, :5]
+        slices[:, 1:] = np.clip(predictions.mean(axis=0), 0.0, 1.0).reshape(len(X), -1, 5)
+        error = self.kappa * predictions.std(axis=0).max(axis=1)
+        inside = np.all((X >= self.lower) & (X <= self.upper), axis=1)
+        return slices, error, inside
+
+    def predict(self, inputs):
+        """
+        Прогноз для одного набора (словарь schema.parse_payload):
+        {"slices" [5 x 5], "error", "inside"}
+        """
+        slices, error, inside = self.predict_batch(
+            inputs["initial_equations"][None], inputs["faks"][None], inputs["equations"][None],
+            inputs["equation_lengths"][None], np.array([inputs["time_value"]])
+        )
+        return {"slices": slices[0], "error": float(error[0]), "inside": bool(inside[0])}
+
+    def save(self, path):
+        arrays = {name: getattr(self, name) for name in self.FIELDS}
+        for name in ("b1", "b2", "b3"):
+            arrays[name] = arrays[name][:, 0]
+        info = {f"info_{name}": value for name, value in self.info.items()}
+        np.savez(path, **arrays, **info)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            info = {name[5:]: data[name].item() for name in data.files
+                    if name.startswith("info_")}
+            return cls(*(data[name] for name in cls.FIELDS), info=info)
+
+
+def load_surrogate(path):
+    """Модель из файла или None, если файла нет (суррогат не обязателен)"""
+    if not path or not os.path.exists(path):
+        return None
+    model = Surrogate.load(path)
+    logger.info(f"Суррогатная модель загружена из {path}: {model.info}")
+    return model
+
+
+def build(samples=20000, members=4, hidden=128, epochs=300, holdout=0.1, seed=0,
+          method="LSODA", workers=None):
+    """
+    Построение модели: samples решений методом method, обучение members сетей,
+    подбор kappa на отложенной доле holdout. Метрики отложенной выборки - в info
+    """
+    rng = np.random.default_rng(seed)
+    initial_equations, faks, equations, time_value = sample_inputs(samples, rng)
+
+    started = time.perf_counter()
+    slices = solve_samples(initial_equations, faks, equations, time_value, method, workers)
+    solve_time = time.perf_counter() - started
+    ok = ~np.isnan(slices).any(axis=(1, 2))
+    logger.info(f"Решения: {samples} наборов за {solve_time:.1f} с, сбоев {int((~ok).sum())}")
+
+    lengths = np.tile(EQUATION_ARITY, (samples, 1))
+    X = features(initial_equations, faks, equations, lengths, time_value)[ok]
+    Y = slices[ok, 1:].reshape(int(ok.sum()), -1)
+
+    n_test = int(len(X) * holdout)
+    X_train, Y_train, X_test, Y_test = X[n_test:], Y[n_test:], X[:n_test], Y[:n_test]
+    mean = X_train.mean(axis=0)
+    scale = np.where(X_train.std(axis=0) > 0, X_train.std(axis=0), 1.0)
+
+    started = time.perf_counter()
+    networks = []
+    for member in range(members):
+        networks.append(train_network((X_train - mean) / scale, Y_train, hidden, epochs,
+                                      seed=seed + member))
+        logger.info(f"Сеть {member + 1} из {members} обучена")
+    train_time = time.perf_counter() - started
+
+    # Область обучения - границы признаков с небольшим запасом (например, t = 1 при
+    # обучении на t < 1)
+    lower, upper = X_train.min(axis=0), X_train.max(axis=0)
+    margin = BOX_MARGIN * (upper - lower)
+    w1, w2, w3, b1, b2, b3 = (np.stack(p) for p in zip(*networks))
+    model = Surrogate(mean, scale, lower - margin, upper + margin,
+                      w1, w2, w3, b1, b2, b3, kappa=1.0)
+
+    # kappa: доля COVERAGE ошибок отложенной выборки не больше kappa * разброс
+    predictions = model._ensemble(X_test)
+    error = np.abs(np.clip(predictions.mean(axis=0), 0.0, 1.0) - Y_test).max(axis=1)
+    spread = predictions.std(axis=0).max(axis=1)
+    model.kappa = float(np.quantile(error / np.maximum(spread, 1e-12), COVERAGE))
+    accepted = model.kappa * spread <= DEFAULT_TOLERANCE
+
+    model.info = {
+        "samples": samples,
+        "members": members,
+        "hidden": hidden,
+        "epochs": epochs,
+        "method": method,
+        "solve_time": solve_time,
+        "train_time": train_time,
+        "holdout": n_test,
+        "holdout_mean_error": float(np.abs(predictions.mean(axis=0) - Y_test).mean()),
+        "holdout_max_error_p95": float(np.quantile(error, COVERAGE)),
+        "accepted_at_default_tolerance": float(accepted.mean()),
+    }
+    logger.info(f"Модель построена: {model.info}")
+    return model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Построение суррогатной модели срезов Cf")
+    parser.add_argument("--output", default="surrogate.npz", help="файл модели")
+    parser.add_argument("--samples", type=int, default=20000, help="число решений для обучения")
+    parser.add_argument("--members", type=int, default=4, help="число сетей в ансамбле")
+    parser.add_argument("--hidden", type=int, default=128, help="нейронов в скрытом слое")
+    parser.add_argument("--epochs", type=int, default=300, help="эпох обучения")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--method", default="LSODA", help="метод решения для обучающей выборки")
+    parser.add_argument("--workers", type=int, help="число процессов для решений")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    model = build(args.samples, args.members, args.hidden, args.epochs, seed=args.seed,
+                  method=args.method, workers=args.workers)
+    model.save(args.output)
+    print(f"Модель сохранена в {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+# sweep.py
+import copy
+import itertools
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from functions import (EQUATION_ARITY, EQUATION_DEFAULTS, calculate_total_loss,
+                       compile_pend)
+from process_ecology import cast_to_float, process_batch
+from solvers import integrate
+
+logger = logging.getLogger(__name__)
+
+PARAMETER_GROUPS = ("faks", "equations")
+PARAMETER_PATTERN = re.compile(r'^(faks|equations)\[(\d+)\]\[(\d+)\]$')
+
+C_GRID = np.linspace(0, 1, 100)
+XM = [1.0, 1.0, 1.0, 1.0, 1.0]
+
+# Частей перебора в работе на один процесс (evaluate)
+WINDOW = 2
+
+
+def parse_parameter(spec):
+    """
+    Параметр перебора: кортеж (группа, i, j) или строка вида "faks[3][0]",
+    где группа - faks (коэффициенты возмущений) или equations (внутренние функции).
+    Индексы проверяются по числу возмущений (14 x 2) и коэффициентов функции (EQUATION_ARITY)
+    """
+    if isinstance(spec, str):
+        match = PARAMETER_PATTERN.match(spec.replace(" ", ""))
+        if match is None:
+            raise ValueError(f"Некорректный параметр: {spec}")
+        group, i, j = match.group(1), int(match.group(2)), int(match.group(3))
+    else:
+        group, i, j = spec
+        if group not in PARAMETER_GROUPS:
+            raise ValueError(f"Некорректная группа параметров: {group}")
+        i, j = int(i), int(j)
+
+    if group == "faks":
+        valid = 0 <= i < 14 and 0 <= j < 2
+    else:
+        valid = 0 <= i < len(EQUATION_ARITY) and 0 <= j < EQUATION_ARITY[i]
+    if not valid:
+        raise ValueError(f"Параметр {group}[{i}][{j}] вне диапазона")
+    return group, i, j
+
+
+def parameter_name(param):
+    group, i, j = param
+    return f"{group}[{i}][{j}]"
+
+
+def prepare_base(base):
+    """
+    Базовый набор параметров: словарь initial_equations, faks, equations,
+    time_value (как у solve). Значения приводятся к float
+    """
+    initial_equations, faks, equations, _ = cast_to_float(
+        copy.deepcopy(base["initial_equations"]), copy.deepcopy(base["faks"]),
+        copy.deepcopy(base["equations"]), []
+    )
+    return {
+        "initial_equations": initial_equations,
+        "faks": faks,
+        "equations": equations,
+        "time_value": float(base.get("time_value", 0.0)),
+    }
+
+
+def apply_values(base, params, values):
+    """
+    Копии faks и equations с подставленными значениями параметров.
+    Если у функции меньше коэффициентов, чем нужно (например, пустой f₉),
+    недостающие берутся из значений по умолчанию, как в pend
+    """
+    faks = copy.deepcopy(base["faks"])
+    equations = copy.deepcopy(base["equations"])
+    for (group, i, j), value in zip(params, values):
+        if group == "faks":
+            faks[i][j] = float(value)
+        else:
+            if len(equations[i]) < EQUATION_ARITY[i]:
+                equations[i] = EQUATION_DEFAULTS[i][:EQUATION_ARITY[i]].tolist()
+            equations[i][j] = float(value)
+    return faks, equations
+
+
+def base_values(base, params):
+    """Значения параметров в базовом наборе (с учетом значений по умолчанию)"""
+    faks, equations = apply_values(base, [], [])
+    values = []
+    for group, i, j in params:
+        if group == "faks":
+            values.append(faks[i][j])
+        elif len(equations[i]) < EQUATION_ARITY[i]:
+            values.append(float(EQUATION_DEFAULTS[i][j]))
+        else:
+            values.append(equations[i][j])
+    return np.array(values)
+
+
+def grid(ranges, points):
+    """Прямоугольная сетка: ranges - список (min, max), points - число точек по каждой оси"""
+    axes = [np.linspace(lo, hi, points) for lo, hi in ranges]
+    return np.array(list(itertools.product(*axes)))
+
+
+def latin_hypercube(ranges, n, seed=None):
+    """Латинский гиперкуб из n точек в прямоугольнике ranges"""
+    rng = np.random.default_rng(seed)
+    k = len(ranges)
+    strata = np.argsort(rng.random((n, k)), axis=0)
+    unit = (strata + rng.random((n, k))) / n
+    lo = np.array([r[0] for r in ranges], dtype=float)
+    hi = np.array([r[1] for r in ranges], dtype=float)
+    return lo + unit * (hi - lo)
+
+
+def final_state(initial_equations, faks, equations, time_value, method="odeint"):
+    """Значения Cf при C = 1 без построения графиков и кэширования; None при сбое решателя"""
+    rhs = compile_pend(faks, equations, XM, time_value)
+    solution = integrate(rhs, initial_equations, C_GRID, method=method,
+                         rate=rhs.rate, lower=rhs.eps, upper=rhs.upper,
+                         jac=rhs.jacobian, rate_jac=rhs.rate_jacobian)
+    if not solution["success"]:
+        return None
+    return np.clip(solution["y"][-1], 0.0, 1.0)
+
+
+def _evaluate_chunk(base, params, start, rows, method):
+    """Расчет части выборки; возвращает (start, конечные значения [n x 5])"""
+    if method == "batch":
+        faks, equations = zip(*(apply_values(base, params, values) for values in rows))
+        equation_lengths = np.array([[len(e) for e in eqs] for eqs in equations])
+        padded = np.full((len(rows), 12, 3), np.nan)
+        for n, eqs in enumerate(equations):
+            for i, coefficients in enumerate(eqs):
+                padded[n, i, :len(coefficients)] = coefficients[:3]
+        initial = np.tile(base["initial_equations"], (len(rows), 1))
+        data = process_batch(initial, np.array(faks), padded, base["time_value"],
+                             equation_lengths)
+        return start, data[:, -1]
+
+    finals = np.full((len(rows), 5), np.nan)
+    for n, values in enumerate(rows):
+        faks, equations = apply_values(base, params, values)
+        final = final_state(base["initial_equations"], faks, equations,
+                            base["time_value"], method)
+        if final is not None:
+            finals[n] = final
+    return start, finals
+
+
+def evaluate(base, params, samples, method="odeint", workers=None, chunk_size=32):
+    """
+    Расчет конечных значений для каждой строки samples (значения параметров params).
+    Результаты выдаются по мере готовности частями: словари с номерами
+    строк index, значениями values, final_values [n x 5] и total_loss [n].
+    method - метод solvers.integrate или "batch" (векторизованный RK4, process_batch).
+    workers - число процессов (по умолчанию - число ядер; 1 - в текущем процессе)
+    """
+    base = prepare_base(base)
+    params = [parse_parameter(p) for p in params]
+    samples = np.atleast_2d(np.asarray(samples, dtype=float))
+    workers = workers or os.cpu_count() or 1
+
+    chunks = ((start, samples[start:start + chunk_size])
+              for start in range(0, len(samples), chunk_size))
+
+    def package(start, finals):
+        index = np.arange(start, start + len(finals))
+        return {
+            "index": index,
+            "values": samples[index],
+            "final_values": finals,
+            "total_loss": np.array([calculate_total_loss(f) for f in finals]),
+        }
+
+    if workers == 1:
+        for start, rows in chunks:
+            yield package(*_evaluate_chunk(base, params, start, rows, method))
+        return
+
+    # В работе не больше WINDOW частей на процесс: новые отправляются по мере выдачи
+    # готовых, выданные не хранятся. Если потребитель бросил генератор (клиент
+    # отключился), неначатые части отменяются, а не досчитываются
+    executor = ProcessPoolExecutor(max_workers=workers,
+                                   mp_context=multiprocessing.get_context('spawn'))
+    finished = False
+    try:
+        pending = set()
+        for start, rows in itertools.islice(chunks, WINDOW * workers):
+            pending.add(executor.submit(_evaluate_chunk, base, params, start, rows, method))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for start, rows in itertools.islice(chunks, len(done)):
+                pending.add(executor.submit(_evaluate_chunk, base, params, start, rows, method))
+            while done:
+                yield package(*done.pop().result())
+        finished = True
+    finally:
+        executor.shutdown(wait=finished, cancel_futures=True)
+
+
+def run_sweep(base, params, samples, method="odeint", workers=None, chunk_size=32):
+    """
+    Полный перебор: собирает результаты evaluate в массивы
+    samples [n x k], final_values [n x 5], total_loss [n] (NaN - сбой решателя)
+    """
+    samples = np.atleast_2d(np.asarray(samples, dtype=float))
+    final_values = np.full((len(samples), 5), np.nan)
+    total_loss = np.full(len(samples), np.nan)
+    for part in evaluate(base, params, samples, method, workers, chunk_size):
+        final_values[part["index"]] = part["final_values"]
+        total_loss[part["index"]] = part["total_loss"]
+
+    logger.info(f"Перебор завершен: {len(samples)} наборов, "
+                f"сбоев {int(np.isnan(total_loss).sum())}")
+    return {
+        "parameters": [parameter_name(parse_parameter(p)) for p in params],
+        "samples": samples,
+        "final_values": final_values,
+        "total_loss": total_loss,
+    }
+
+
+def one_at_a_time(base, params, step=0.05, method="odeint", workers=None):
+    """
+    Чувствительность по одному параметру: центральные разности конечных
+    значений и суммарных потерь при изменении параметра на ±step (абсолютно).
+    Для каждого параметра - производные d_final [5], d_total_loss и
+    эластичность потерь (относительное изменение потерь к относительному изменению параметра)
+    """
+    base = prepare_base(base)
+    params = [parse_parameter(p) for p in params]
+    center = base_values(base, params)
+
+    rows = [center]
+    for k in range(len(params)):
+        for sign in (1.0, -1.0):
+            row = center.copy()
+            row[k] += sign * step
+            rows.append(row)
+
+    sweep = run_sweep(base, params, np.array(rows), method, workers)
+    final, loss = sweep["final_values"], sweep["total_loss"]
+
+    result = []
+    for k, param in enumerate(params):
+        plus, minus = 1 + 2 * k, 2 + 2 * k
+        d_loss = (loss[plus] - loss[minus]) / (2 * step)
+        elasticity = d_loss * center[k] / loss[0] if loss[0] else np.nan
+        result.append({
+            "parameter": parameter_name(param),
+            "value": float(center[k]),
+            "d_final": ((final[plus] - final[minus]) / (2 * step)).tolist(),
+            "d_total_loss": float(d_loss),
+            "elasticity": float(elasticity),
+        })
+    return result
+
+
+def sobol_indices(base, params, ranges, n=256, seed=None, method="odeint", workers=None):
+    """
+    Индексы Соболя по схеме Сальтелли: n * (k + 2) расчетов для k параметров,
+    равномерно распределенных в ranges. Для суммарных потерь и каждого Cf при C = 1
+    возвращаются индексы первого порядка S1 и полные ST (оценки Сальтелли 2010 и Янсена)
+    """
+    params = [parse_parameter(p) for p in params]
+    k = len(params)
+    samples = latin_hypercube(ranges * 2 if k else [], n, seed)
+    A, B = samples[:, :k], samples[:, k:]
+    AB = np.repeat(A[None], k, axis=0)
+    for i in range(k):
+        AB[i, :, i] = B[:, i]
+
+    sweep = run_sweep(base, params, np.vstack([A, B, AB.reshape(-1, k)]), method, workers)
+    outputs = np.column_stack([sweep["total_loss"], sweep["final_values"]])
+    f_A, f_B = outputs[:n], outputs[n:2 * n]
+    f_AB = outputs[2 * n:].reshape(k, n, -1)
+
+    variance = np.nanvar(np.concatenate([f_A, f_B]), axis=0)
+    variance = np.where(variance > 0, variance, np.nan)
+    S1 = np.nanmean(f_B[None] * (f_AB - f_A[None]), axis=1) / variance
+    ST = 0.5 * np.nanmean((f_A[None] - f_AB) ** 2, axis=1) / variance
+
+    return {
+        "parameters": [parameter_name(p) for p in params],
+        "S1": S1[:, 0],
+        "ST": ST[:, 0],
+        "S1_final": S1[:, 1:],
+        "ST_final": ST[:, 1:],
+        "evaluations": len(outputs),
+    }
@@ -0,0 +1,120 @@
+# test_app.py
+"""Ответы HTTP-интерфейса: некорректные запросы, очередь задач /jobs"""
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault('ECOLOGY_RUNS_DIR', tempfile.mkdtemp(prefix='ecology-runs-'))
+
+import app as app_module  # noqa: E402
+from app import app  # noqa: E402
+from jobs import JobQueue  # noqa: E402
+from utils import random_parameters  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+def test_stream_rejects_coefficient_beyond_arity(client):
+    # У f₁ два коэффициента: equations[0][2] не существует
+    payload = dict(random_parameters(0), parameters=["equations[0][2]"], samples=[[0.5]])
+    response = client.post('/stream', json=payload)
+    assert response.status_code == 400
+    assert "equations[0][2]" in response.get_json()["error"]
+
+
+@pytest.fixture
+def blocked_jobs(monkeypatch):
+    """
+    Очередь из одного потока и двух мест; задачи ждут release, поэтому
+    остаются незавершенными, пока тест их не отпустит
+    """
+    release = threading.Event()
+    calls = []
+
+    def run(inputs):
+        calls.append(inputs["time_value"])
+        release.wait(10)
+        return {"run_id": "test"}
+
+    queue = JobQueue(workers=1, max_pending=2)
+    monkeypatch.setattr(app_module, "job_queue", queue)
+    monkeypatch.setattr(app_module, "run_draw_job", run)
+    yield release, calls
+    release.set()
+    queue.shutdown()
+
+
+def wait_job(client, job_id, status="done"):
+    for _ in range(200):
+        job = client.get(f"/jobs/{job_id}").get_json()
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Задача {job_id}: {job['status']}")
+
+
+def test_identical_jobs_are_deduplicated(client, blocked_jobs):
+    release, calls = blocked_jobs
+    payload = random_parameters(0)
+    first = client.post('/jobs', json=payload)
+    second = client.post('/jobs', json=payload)
+    assert first.status_code == second.status_code == 202
+    assert first.get_json()["created_now"] and not second.get_json()["created_now"]
+    assert first.get_json()["job_id"] == second.get_json()["job_id"]
+
+    release.set()
+    job = wait_job(client, first.get_json()["job_id"])
+    assert job["result"] == {"run_id": "test"}
+    assert len(calls) == 1
+
+    # После завершения тот же расчет ставится заново
+    third = client.post('/jobs', json=payload)
+    assert third.status_code == 202 and third.get_json()["created_now"]
+    assert third.get_json()["job_id"] != first.get_json()["job_id"]
+
+
+def test_full_queue_returns_429(client, blocked_jobs):
+    release, calls = blocked_jobs
+    payloads = [dict(random_parameters(0), time_value=t) for t in (0.0, 0.5, 1.0)]
+    accepted = [client.post('/jobs', json=payload) for payload in payloads[:2]]
+    assert [r.status_code for r in accepted] == [202, 202]
+
+    rejected = client.post('/jobs', json=payloads[2])
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "2"
+    # Повтор незавершенной задачи при полной очереди - не новая задача, а та же
+    repeated = client.post('/jobs', json=payloads[0])
+    assert repeated.status_code == 202
+    assert repeated.get_json()["job_id"] == accepted[0].get_json()["job_id"]
+
+    release.set()
+    for response in accepted:
+        wait_job(client, response.get_json()["job_id"])
+    assert client.post('/jobs', json=payloads[2]).status_code == 202
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile": "5"}])
+def test_draw_graphics_error_is_json_with_and_without_profiling(client, monkeypatch, headers):
+    def fail(*args, **kwargs):
+        raise ValueError("сбой расчета")
+
+    monkeypatch.setenv("ECOLOGY_PROFILING", "1")
+    monkeypatch.setattr(app_module, "process", fail)
+    monkeypatch.setattr(app_module, "solve", fail)
+    response = client.post('/draw_graphics', json=random_parameters(0), headers=headers)
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "Ошибка", "error": "ValueError: сбой расчета"}
+
+
+def test_profiled_draw_graphics_rejects_invalid_input(client, monkeypatch):
+    monkeypatch.setenv("ECOLOGY_PROFILING", "1")
+    payload = dict(random_parameters(0), restrictions=[1.5] * 5)
+    response = client.post('/draw_graphics', json=payload, headers={"X-Profile": "5"})
+    assert response.status_code == 400
+    assert "Предельное значение Cf1" in response.get_json()["error"]
@@ -0,0 +1,102 @@
+# test_export.py
+"""Архив результатов: записи solve, process_batch и перебора в одном архиве"""
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+os.environ.setdefault('ECOLOGY_RUNS_DIR', tempfile.mkdtemp(prefix='ecology-runs-'))
+
+import export  # noqa: E402
+from functions import calculate_total_losses  # noqa: E402
+from process_ecology import process_batch, solve  # noqa: E402
+from surrogate import sample_inputs  # noqa: E402
+from sweep import evaluate  # noqa: E402
+from utils import random_parameters  # noqa: E402
+
+PARAMS = ["faks[6][0]", "equations[0][1]"]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """Архив с одной записью solve, тремя process_batch и четырьмя перебора"""
+    path = str(tmp_path / "archive")
+    params = random_parameters(0)
+    result = solve(params["initial_equations"], params["faks"], params["equations"],
+                   params["restrictions"], params["time_value"], use_cache=False)
+    export.append_result(path, result)
+
+    initial, faks, equations, time_value = sample_inputs(3, np.random.default_rng(0))
+    batch = process_batch(initial, faks, equations, time_value)
+    export.append_batch(path, initial, faks, equations, time_value, batch)
+
+    samples = np.random.default_rng(1).uniform(0.2, 0.8, (4, len(PARAMS)))
+    parts = list(evaluate(params, PARAMS, samples, workers=1, chunk_size=3))
+    export.append_sweep(path, params, PARAMS, parts)
+    finals = np.full((4, 5), np.nan)
+    for part in parts:
+        finals[part["index"]] = part["final_values"]
+    return path, result, batch, finals
+
+
+def test_records_of_every_kind_share_one_archive(archive):
+    path, result, batch, finals = archive
+    data = export.open_archive(path)
+    assert export.archive_length(path) == 8
+    np.testing.assert_array_equal(np.diff(data["offsets"]),
+                                  [len(result["C"])] + [100] * 3 + [1] * 4)
+
+    C, data_sol = export.trajectory(data, 0)
+    np.testing.assert_array_equal(C, result["C"])
+    np.testing.assert_array_equal(data_sol, result["data_sol"])
+    for k in range(3):
+        C, data_sol = export.trajectory(data, 1 + k)
+        np.testing.assert_array_equal(C, np.linspace(0, 1, 100))
+        np.testing.assert_array_equal(data_sol, batch[k])
+    for k in range(4):
+        C, data_sol = export.trajectory(data, 4 + k)
+        np.testing.assert_array_equal(C, [1.0])
+        np.testing.assert_array_equal(data_sol, finals[k][None])
+
+    np.testing.assert_array_equal(data["final_values"],
+                                  np.vstack([result["data_sol"][-1], batch[:, -1], finals]))
+    np.testing.assert_allclose(data["total_loss"], calculate_total_losses(data["data_sol"]))
+    np.testing.assert_allclose(data["final_loss"], calculate_total_losses(data["final_values"]))
+
+
+def test_interrupted_append_keeps_complete_records(archive):
+    path = archive[0]
+    before = {name: np.array(values) for name, values in export.open_archive(path).items()}
+    # Сбой после записи точек и части столбцов записей: grid_end не дописан
+    export.write_column(os.path.join(path, "data_sol.npy"), np.zeros((7, 5)),
+                        before["offsets"][-1])
+    export.write_column(os.path.join(path, "faks.npy"), np.zeros((1, 14, 2)), 8)
+    after = export.open_archive(path)
+    for name, values in before.items():
+        np.testing.assert_array_equal(after[name], values)
+
+    export.append(path, [0.0, 1.0], np.full((1, 2, 5), 0.5), np.full((1, 5), 0.5),
+                  np.zeros((1, 14, 2)), np.full((1, 12, 3), np.nan), 0.0)
+    data = export.open_archive(path)
+    assert export.archive_length(path) == 9
+    assert len(data["data_sol"]) == before["offsets"][-1] + 2
+    np.testing.assert_array_equal(export.trajectory(data, 8)[1], np.full((2, 5), 0.5))
+
+
+@pytest.mark.parametrize("writer", ["export_parquet", "export_arrow"])
+def test_arrow_round_trip(archive, tmp_path, writer):
+    pytest.importorskip("pyarrow")
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+
+    path, target = archive[0], str(tmp_path / "archive.out")
+    getattr(export, writer)(path, target)
+    table = (parquet if writer == "export_parquet" else feather).read_table(target)
+    assert table.num_rows == 8
+
+    expected = export.open_archive(path)
+    restored = export.from_arrow(table)
+    assert set(restored) == set(expected)
+    for name, values in expected.items():
+        np.testing.assert_array_equal(restored[name], values)
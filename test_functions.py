@@ -0,0 +1,117 @@
+# test_functions.py
+"""Аналитическая матрица Якоби CompiledPend против центральных разностей"""
+import numpy as np
+import pytest
+
+from functions import EQUATION_ARITY, CompiledPend, DisturbanceContext
+from surrogate import sample_inputs
+
+STEP = 1e-6
+XM = np.ones(5)
+
+
+def compile_batch(n, seed):
+    """CompiledPend для пакета из n случайных наборов и случайные состояния [n x 5]"""
+    rng = np.random.default_rng(seed)
+    _, faks, equations, time_value = sample_inputs(n, rng)
+    context = DisturbanceContext(faks, np.full((n, 14), 2), time_value)
+    rhs = CompiledPend(context, equations, np.tile(EQUATION_ARITY, (n, 1)), XM)
+    return rhs, rng.uniform(0.05, 0.95, (n, 5)), rng
+
+
+def compile_single(seed):
+    """CompiledPend одного набора (с таблицей отрезков x7-x14) и состояние [5]"""
+    rng = np.random.default_rng(seed)
+    _, faks, equations, time_value = sample_inputs(1, rng)
+    # Отрицательные свободные члены дают изломы x7-x14 внутри [0, 1]
+    faks[0, 6:, 1] -= rng.uniform(0.0, 1.0, 8)
+    context = DisturbanceContext(faks[0], np.full(14, 2), time_value[0])
+    rhs = CompiledPend(context, equations[0], EQUATION_ARITY, XM)
+    return rhs, rng.uniform(0.05, 0.95, 5)
+
+
+def central_differences(fun, x, C):
+    """Матрица Якоби fun по последней оси x центральными разностями: [..., 5, 5]"""
+    J = np.empty(x.shape + (x.shape[-1],))
+    for j in range(x.shape[-1]):
+        dx = np.zeros_like(x)
+        dx[..., j] = STEP
+        J[..., :, j] = (fun(x + dx, C) - fun(x - dx, C)) / (2 * STEP)
+    return J
+
+
+def held(rhs, x, C):
+    """Компоненты, удерживаемые на границе: производная выводит их за [eps, upper]"""
+    rate = rhs.rate(x, C)
+    return ((x >= rhs.upper) & (rate > 0.0)) | ((x <= rhs.eps) & (rate < 0.0))
+
+
+def smooth(rhs, x):
+    """Маска наборов, у которых Cf₅ не у порога ступенчатой f₃ (там производной нет)"""
+    return np.abs(x[..., 4] - rhs.f3_threshold) > 10 * STEP
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("C", [0.0, 0.3, 0.77, 1.0])
+def test_rate_jacobian_batch(seed, C):
+    rhs, x, _ = compile_batch(64, seed)
+    expected = central_differences(rhs.rate, x, C)
+    actual = rhs.rate_jacobian(x, C)
+    assert actual.shape == (64, 5, 5)
+    mask = smooth(rhs, x)
+    np.testing.assert_allclose(actual[mask], expected[mask], rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_jacobian_inside_bounds_matches_rate_jacobian(seed):
+    rhs, x, rng = compile_batch(64, seed)
+    C = rng.uniform(0.0, 1.0)
+    mask = smooth(rhs, x)
+    np.testing.assert_allclose(rhs.jacobian(x, C)[mask],
+                               central_differences(rhs, x, C)[mask], rtol=1e-5, atol=1e-6)
+    np.testing.assert_array_equal(rhs.jacobian(x, C), rhs.rate_jacobian(x, C))
+
+
+def test_jacobian_zeroes_held_rows():
+    rhs, x, _ = compile_batch(64, 7)
+    C = 0.5
+    rate = rhs.rate(x, C)
+    # Компоненты, которые производная выводит за границу, ставятся на эту границу
+    x = np.where(rate < 0, rhs.eps, np.where(rate > 0, rhs.upper, x))
+    mask = held(rhs, x, C)
+    assert mask.any()
+    J = rhs.jacobian(x, C)
+    assert np.all(J[mask] == 0.0)
+    np.testing.assert_array_equal(J[~mask], rhs.rate_jacobian(x, C)[~mask])
+    assert np.all(rhs(x, C)[mask] == 0.0)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_jacobian_next_to_breakpoints(seed):
+    rhs, x = compile_single(seed)
+    breaks = [b for b in rhs.context.breaks if 0.0 <= b <= 1.0]
+    assert breaks
+    for b in breaks:
+        for C in (b - 1e-9, b, b + 1e-9):
+            actual = rhs.rate_jacobian(x, C)
+            assert np.isfinite(actual).all()
+            if smooth(rhs, x):
+                np.testing.assert_allclose(actual, central_differences(rhs.rate, x, C),
+                                           rtol=1e-5, atol=1e-6)
+            np.testing.assert_array_equal(rhs.jacobian(x, C),
+                                          np.where(held(rhs, x, C)[:, None], 0.0, actual))
+
+
+def test_sums_at_breakpoints_are_not_negative():
+    # Слагаемые x1-x6 равны нулю, x7-x14 проходят через 0 в точках излома
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        faks = rng.uniform(-1.0, 1.0, (14, 2))
+        faks[:6] = [0.0, -1.0]
+        context = DisturbanceContext(faks, np.full(14, 2), 0.5)
+        rhs = CompiledPend(context, np.zeros((12, 3)), np.zeros(12, dtype=int), XM)
+        x = rng.uniform(0.05, 0.95, 5)
+        for b in context.breaks:
+            assert np.all(context.sums(b) >= 0.0)
+            assert np.isfinite(rhs.rate(x, b)).all()
+            assert np.isfinite(rhs.rate_jacobian(x, b)).all()
@@ -0,0 +1,67 @@
+# test_process_ecology.py
+"""Решение на адаптивной сетке C с точками излома x7-x14 и пакетный расчет process_batch"""
+import os
+import tempfile
+import warnings
+
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+
+os.environ.setdefault('ECOLOGY_RUNS_DIR', tempfile.mkdtemp(prefix='ecology-runs-'))
+
+from functions import EQUATION_ARITY, pend  # noqa: E402
+from grid import PLOT_TOLERANCE  # noqa: E402
+from process_ecology import process_batch, solve  # noqa: E402
+from surrogate import sample_inputs  # noqa: E402
+
+
+def breakpoint_inputs(seed):
+    """
+    Набор, в котором слагаемые x1-x6 равны нулю, а x7-x14 растут от нуля
+    с изломом внутри [0, 1] (отрицательные свободные члены): в первой точке
+    излома сумма группы переходит через 0
+    """
+    rng = np.random.default_rng(seed)
+    faks = [[0.0, -1.0]] * 6 + np.column_stack([rng.uniform(0.2, 1.0, 8),
+                                                rng.uniform(-1.0, 0.0, 8)]).tolist()
+    return {
+        "initial_equations": rng.uniform(0.05, 0.95, 5).tolist(),
+        "faks": faks,
+        "equations": [[] for _ in range(12)],
+        "restrictions": [1.0] * 5,
+    }
+
+
+@pytest.mark.parametrize("method", ["rk4", "odeint", "LSODA"])
+@pytest.mark.parametrize("seed", range(10))
+def test_adaptive_grid_through_breakpoints_is_finite(method, seed):
+    params = breakpoint_inputs(seed)
+    result = solve(params["initial_equations"], params["faks"], params["equations"],
+                   params["restrictions"], 0.5, method, use_cache=False)
+    breaks = [b for b in result["context"].breaks if 0.0 < b < 1.0]
+    assert np.isin(breaks, result["C"]).all()
+    assert np.isfinite(result["data_sol"]).all()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_process_batch_matches_odeint(seed):
+    initial, faks, equations, time_value = sample_inputs(16, np.random.default_rng(seed))
+    batch = process_batch(initial, faks, equations, time_value)
+    C = np.linspace(0, 1, 100)
+    assert batch.shape == (16, 100, 5)
+
+    compared = 0
+    for n in range(16):
+        f = [row[:k].tolist() for row, k in zip(equations[n], EQUATION_ARITY)]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            expected, info = odeint(pend, initial[n], C, args=(faks[n], f, np.ones(5),
+                                                              time_value[n]), full_output=True)
+        # odeint на исходной pend не всегда проходит излом на границе: такие наборы не сравниваются
+        if info["message"] != "Integration successful.":
+            continue
+        np.testing.assert_allclose(batch[n], np.clip(expected, 0.0, 1.0), rtol=0,
+                                   atol=PLOT_TOLERANCE)
+        compared += 1
+    assert compared >= 12
@@ -0,0 +1,109 @@
+# test_schema.py
+"""Отклонение некорректных входных данных до расчета (schema.parse_inputs, parse_payload)"""
+import copy
+import re
+
+import numpy as np
+import pytest
+
+from schema import ValidationError, parse_inputs, parse_payload
+from utils import random_parameters, validate_inputs
+
+ARGUMENTS = ("initial_equations", "faks", "equations", "restrictions")
+
+
+def valid_inputs():
+    params = random_parameters(0)
+    return {name: params[name] for name in ARGUMENTS}
+
+
+def broken(path, value):
+    """Корректный набор, в котором значение по пути path заменено на value"""
+    inputs = valid_inputs()
+    target = inputs
+    for key in path[:-1]:
+        target = target[key]
+    target[path[-1]] = value
+    return inputs
+
+
+def test_valid_inputs_become_arrays():
+    inputs = valid_inputs()
+    parsed = parse_inputs(*(inputs[name] for name in ARGUMENTS))
+    assert parsed["initial_equations"].shape == (5,)
+    assert parsed["faks"].shape == (14, 2)
+    assert parsed["equations"].shape == (12, 3)
+    assert parsed["restrictions"].shape == (5,)
+    np.testing.assert_array_equal(parsed["equation_lengths"],
+                                  [len(eq) for eq in inputs["equations"]])
+    assert validate_inputs(*(inputs[name] for name in ARGUMENTS)) == (True, "Данные корректны")
+
+
+@pytest.mark.parametrize("path, value, message", [
+    # Формы
+    (("initial_equations",), [0.5] * 4, "5 начальных значений"),
+    (("initial_equations",), 0.5, "должны быть списком"),
+    (("restrictions",), [0.5] * 6, "5 предельных значений"),
+    (("faks",), [[0.5, 0.5]] * 13, "14 возмущений"),
+    (("faks", 3), [0.5], "x4 должно иметь 2 коэффициента"),
+    (("faks", 3), 0.5, "x4 должно иметь 2 коэффициента"),
+    (("equations",), [[0.5, 0.5]] * 11, "12 внутренних функций"),
+    (("equations", 2), [0.1, 0.2], "f3 должна иметь 3 коэффициента"),
+    (("equations", 0), [0.1, 0.2, 0.3], "f1 должна иметь 2 коэффициента"),
+    # Нечисловые значения
+    (("initial_equations", 1), "abc", "Cf2: ожидается число"),
+    (("restrictions", 4), "0.5x", "Cf5: ожидается число"),
+    (("restrictions", 4), None, "Предельное значение Cf5 должно быть в диапазоне"),
+    (("faks", 6, 1), "x", "Коэффициент 2 возмущения x7: ожидается число"),
+    (("faks", 6, 1), [1.0], "Коэффициент 2 возмущения x7: ожидается число"),
+    (("equations", 10, 2), {}, "функции f11: ожидается число"),
+    (("faks", 0, 0), float("inf"), "Коэффициент 1 возмущения x1: ожидается конечное"),
+    (("equations", 1, 0), float("nan"), "функции f2: ожидается конечное"),
+    # Диапазоны
+    (("initial_equations", 0), 1.5, "Cf1 должно быть в диапазоне [0, 1]"),
+    (("initial_equations", 2), -0.1, "Cf3 должно быть в диапазоне [0, 1]"),
+    (("restrictions", 3), 1.01, "Предельное значение Cf4 должно быть в диапазоне"),
+    (("restrictions", 0), float("nan"), "Предельное значение Cf1 должно быть в диапазоне"),
+])
+def test_invalid_inputs_are_rejected(path, value, message):
+    inputs = broken(path, value)
+    with pytest.raises(ValidationError, match=re.escape(message)):
+        parse_inputs(*(inputs[name] for name in ARGUMENTS))
+    ok, text = validate_inputs(*(inputs[name] for name in ARGUMENTS))
+    assert not ok and message in text
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"time_value": "soon"}, "Время должно быть числом"),
+    ({"time_value": float("inf")}, "конечным числом"),
+    ({"method": "euler"}, "Неизвестный метод"),
+    ({"output": "svg"}, "Неизвестный формат"),
+    ({"C": [0.5, 0.2]}, "строго возрастать"),
+    ({"C": [0.5, 1.5]}, "в диапазоне"),
+    ({"time_values": [0.5]}, "от 2 до"),
+])
+def test_invalid_payload_is_rejected(change, message):
+    payload = dict(random_parameters(0), **change)
+    with pytest.raises(ValidationError, match=message):
+        parse_payload(payload)
+
+
+@pytest.mark.parametrize("payload", [None, [], "text"])
+def test_payload_must_be_object(payload):
+    with pytest.raises(ValidationError, match="объектом JSON"):
+        parse_payload(payload)
+
+
+@pytest.mark.parametrize("name", ARGUMENTS)
+def test_payload_requires_every_field(name):
+    payload = random_parameters(0)
+    del payload[name]
+    with pytest.raises(ValidationError, match=f"Не задано поле {name}"):
+        parse_payload(payload)
+
+
+def test_parse_inputs_does_not_modify_payload():
+    inputs = valid_inputs()
+    snapshot = copy.deepcopy(inputs)
+    parse_inputs(*(inputs[name] for name in ARGUMENTS))
+    assert inputs == snapshot
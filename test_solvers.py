@@ -0,0 +1,40 @@
+# test_solvers.py
+"""Удержание компонент на границах и признак успеха solvers.integrate"""
+import numpy as np
+import pytest
+
+from solvers import integrate
+
+T = np.linspace(0.0, 1.0, 11)
+
+
+def held_at_bounds(rate, y0):
+    fun = lambda y, t: np.where((y <= 0.0) & (rate(y, t) < 0), 0.0, rate(y, t))
+    return integrate(fun, y0, T, method="LSODA", rate=rate, lower=0.0, upper=1.0)
+
+
+@pytest.mark.parametrize("slopes", [(1.0, 1.0), (1.0, 3.0), (2.0, 5.0), (1.1, 3.3)])
+def test_simultaneous_bounds_clamp_every_component(slopes):
+    # Обе компоненты выходят на нижнюю границу в точке t = 0.5
+    a, b = slopes
+    solution = held_at_bounds(lambda y, t: np.array([-a, -b, 0.1]), [a / 2, b / 2, 0.2])
+    assert solution["success"]
+    assert sorted((i, held) for _, i, held in solution["events"]) == [(0, -1), (1, -1)]
+    np.testing.assert_array_equal(solution["y"][T > 0.5, :2], 0.0)
+    np.testing.assert_allclose(solution["y"][:, 2], 0.2 + 0.1 * T)
+
+
+def test_release_after_hold():
+    # Производная первой компоненты разворачивается внутрь при t = 0.8
+    solution = held_at_bounds(lambda y, t: np.array([t - 0.8, 0.0]), [0.2, 0.5])
+    assert solution["success"]
+    assert [(i, held) for _, i, held in solution["events"]] == [(0, -1), (0, 0)]
+    assert np.all(solution["y"][:, 0] >= 0.0)
+
+
+def test_rk4_reports_divergence():
+    with np.errstate(over="ignore", invalid="ignore"):
+        solution = integrate(lambda y, t: y ** 3, [100.0], T, method="rk4")
+    assert not solution["success"]
+    assert solution["message"]
+    assert integrate(lambda y, t: -y, [1.0], T, method="rk4")["success"]
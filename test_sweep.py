@@ -0,0 +1,22 @@
+# test_sweep.py
+"""Разбор параметров перебора"""
+import pytest
+
+from sweep import parse_parameter
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("faks[13][1]", ("faks", 13, 1)),
+    ("equations[2][2]", ("equations", 2, 2)),
+    (("equations", 0, 1), ("equations", 0, 1)),
+])
+def test_parse_parameter(spec, expected):
+    assert parse_parameter(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["faks[14][0]", "faks[0][2]", "equations[0][2]",
+                                  "equations[12][0]", ("equations", 3, 2), ("faks", -1, 0),
+                                  "x[0][0]", ("x", 0, 0)])
+def test_parse_parameter_rejects_out_of_range(spec):
+    with pytest.raises(ValueError):
+        parse_parameter(spec)
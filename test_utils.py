@@ -0,0 +1,18 @@
+# test_utils.py
+"""Генератор случайных наборов для бенчмарка (порт refill() из static/js/script.js)"""
+import pytest
+
+from utils import CF_MIN, random_parameters
+
+
+def test_random_parameters_terminates_on_every_seed():
+    for seed in range(101):
+        params = random_parameters(seed)
+        assert all(limit > CF_MIN for limit in params["restrictions"])
+        assert all(value < limit for value, limit in zip(params["initial_equations"],
+                                                          params["restrictions"]))
+
+
+@pytest.mark.parametrize("seed", [7, 19, 50])
+def test_random_parameters_is_reproducible(seed):
+    assert random_parameters(seed) == random_parameters(seed)
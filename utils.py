@@ -1,7 +1,10 @@
 # utils.py - исправленная версия
+import math
 import os
 import random
 
+from schema import ValidationError, parse_inputs
+
 def get_faks_from_inputs(ui):
     """
     Получение коэффициентов для 14 возмущений
@@ -152,40 +155,89 @@ def get_equations_from_inputs(ui):
     return result
 
 def validate_inputs(initial_equations, faks, equations, restrictions):
-
+    """
+    Проверка входных данных: (True, "Данные корректны") или (False, сообщение).
+    Правила - в schema.parse_inputs, которая заодно приводит данные к массивам
+    """
     try:
-  
-        if len(initial_equations) != 5:
-            return False, "Должно быть 5 начальных значений"
-        
-        for i, val in enumerate(initial_equations):
-            if not (0 <= val <= 1):
-                return False, f"Начальное значение Cf{i+1} должно быть в диапазоне [0, 1]"
-        
-        if len(restrictions) != 5:
-            return False, "Должно быть 5 предельных значений"
-        
-        for i, val in enumerate(restrictions):
-            if not (0 <= val <= 1):
-                return False, f"Предельное значение Cf{i+1} должно быть в диапазоне [0, 1]"
-
-        if len(faks) != 14:
-            return False, "Должно быть 14 возмущений"
-        
-        for i, fak in enumerate(faks):
-            if len(fak) != 2:
-                return False, f"Возмущение x{i+1} должно иметь 2 коэффициента (a и b)"
-        
-     
-        if len(equations) != 12:
-            return False, "Должно быть 12 внутренних функций"
- 
-        expected_lengths = [2, 2, 3, 2, 2, 2, 2, 2, 2, 2, 3, 2]
-        for i, eq in enumerate(equations):
-            if i < len(expected_lengths) and len(eq) != expected_lengths[i]:
-                return False, f"Функция f{i+1} должна иметь {expected_lengths[i]} коэффициента(ов)"
-        
-        return True, "Данные корректны"
-        
+        parse_inputs(initial_equations, faks, equations, restrictions)
+    except ValidationError as e:
+        return False, str(e)
     except Exception as e:
-        return False, f"Ошибка валидации: {str(e)}"
\ No newline at end of file
+        return False, f"Ошибка валидации: {str(e)}"
+    return True, "Данные корректны"
+
+# Генератор случайных параметров - повторяет refill() из static/js/script.js,
+# но с воспроизводимой последовательностью (random.Random(seed))
+
+def _js_round(value):
+    """Округление до сотых как Math.round(value * 100) / 100"""
+    return math.floor(value * 100 + 0.5) / 100
+
+def random_in_range(rng):
+    while True:
+        value = _js_round(rng.random())
+        if 0 < value < 1:
+            return value
+
+def random_for_cf(rng):
+    if rng.random() < 0.8:
+        value = _js_round(0.3 + rng.random() * 0.6)
+        while value <= 0.3 or value >= 0.9:
+            value = _js_round(0.3 + rng.random() * 0.6)
+    elif rng.random() < 0.5:
+        value = _js_round(0.2 + rng.random() * 0.1)
+        while value <= 0.2 or value >= 0.3:
+            value = _js_round(0.2 + rng.random() * 0.1)
+    else:
+        value = _js_round(0.9 + rng.random() * 0.1)
+        while value >= 1:
+            value = _js_round(0.9 + rng.random() * 0.1)
+    return value
+
+def random_time(rng):
+    return rng.choice([0, 0.25, 0.5, 0.75, 1])
+
+# Наименьшее значение, которое может вернуть random_for_cf
+CF_MIN = 0.21
+
+def random_parameters(seed=None):
+    """
+    Случайный набор параметров, как после кнопки "Заполнить случайно":
+    словарь initial_equations, faks, equations, restrictions, time_value
+    (формат запроса /draw_graphics). f₉ на форме не заполняется - пустой список.
+
+    Отличие от refill(): предел, равный CF_MIN, вытягивается заново - начального
+    значения меньше него не бывает, и refill() в этом случае не завершается.
+    Для остальных seed набор совпадает с тем, что дал бы refill()
+    """
+    rng = random.Random(seed)
+    time_value = random_time(rng)
+
+    restrictions = []
+    for _ in range(5):
+        limit = random_for_cf(rng)
+        while limit <= CF_MIN:
+            limit = random_for_cf(rng)
+        restrictions.append(limit)
+    faks = [[random_in_range(rng), random_in_range(rng)] for _ in range(14)]
+
+    initial_equations = []
+    for limit in restrictions:
+        value = random_for_cf(rng)
+        while value >= limit:
+            value = random_for_cf(rng)
+        initial_equations.append(value)
+
+    equations = []
+    for arity in (2, 2, 3, 2, 2, 2, 2, 2, 0, 2, 3, 2):
+        equations.append([random_in_range(rng) for _ in range(arity)])
+    equations[2].sort()
+
+    return {
+        "initial_equations": initial_equations,
+        "faks": faks,
+        "equations": equations,
+        "restrictions": restrictions,
+        "time_value": time_value,
+    }